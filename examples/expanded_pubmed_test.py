@@ -24,7 +24,7 @@ author_search = AuthorSearchQuery.parse_obj({
     'selector': {'preferred_name': {'surname': True}, 'institution_current': {'name': True}}
 })
 async def main():
-
-    return await engine(author_search)
+    async with expanded_pub:
+        return await engine(author_search)
 pub_author_results = asyncio.run(main())
 print(pub_author_results)
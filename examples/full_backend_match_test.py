@@ -45,59 +45,60 @@ def get_author_abstracts(id, papers):
             abstracts.append(paper.abstract)
     return abstracts
 async def main():
-    auth1_res = await author_search(auth1_query)
-    auth2_res = await author_search(auth2_query)
+    async with scopus_backend:
+        auth1_res = await author_search(auth1_query)
+        auth2_res = await author_search(auth2_query)
     
-    auth1_paper_query = PaperSearchQuery.parse_obj({
-        'query':{
-            'tag':'or',
-            'fields_': [
-                {
-                    'tag': 'authorid',
-                    'operator': {
-                        'tag': 'equal',
-                        'value': i.id
-                    }
-                } for i in auth1_res
-            ]
-        },
-        'selector': {'authors':{'id': True}, 'abstract': True}
-    })
+        auth1_paper_query = PaperSearchQuery.parse_obj({
+            'query':{
+                'tag':'or',
+                'fields_': [
+                    {
+                        'tag': 'authorid',
+                        'operator': {
+                            'tag': 'equal',
+                            'value': i.id
+                        }
+                    } for i in auth1_res
+                ]
+            },
+            'selector': {'authors':{'id': True}, 'abstract': True}
+        })
 
-    auth2_paper_query = PaperSearchQuery.parse_obj({
-        'query':{
-            'tag':'or',
-            'fields_': [
-                {
-                    'tag': 'authorid',
-                    'operator': {
-                        'tag': 'equal',
-                        'value': i.id
-                    }
-                } for i in auth2_res
-            ]
-        },
-        'selector': {'authors':{'id': True}, 'abstract': True}
-    })
+        auth2_paper_query = PaperSearchQuery.parse_obj({
+            'query':{
+                'tag':'or',
+                'fields_': [
+                    {
+                        'tag': 'authorid',
+                        'operator': {
+                            'tag': 'equal',
+                            'value': i.id
+                        }
+                    } for i in auth2_res
+                ]
+            },
+            'selector': {'authors':{'id': True}, 'abstract': True}
+        })
 
-    pap1_res = await paper_search(auth1_paper_query)
-    author1_dict = {}
-    for author in auth1_res:
-        abstracts = get_author_abstracts(author.id, pap1_res)
-        if author.preferred_name.given_names is not None:
-            name = author.preferred_name.given_names + ' ' + author.preferred_name.surname
-        else:
-            name = author.preferred_name.surname
-        author1_dict[name] = abstracts
-    pap2_res = await paper_search(auth2_paper_query)
-    author2_dict = {}
-    for author in auth2_res:
-        abstracts = get_author_abstracts(author.id, pap2_res)
-        if author.preferred_name.given_names is not None:
-            name = author.preferred_name.given_names + ' ' + author.preferred_name.surname
-        else:
-            name = author.preferred_name.surname
-        author2_dict[name] = abstracts
-    #return proc_result
+        pap1_res = await paper_search(auth1_paper_query)
+        author1_dict = {}
+        for author in auth1_res:
+            abstracts = get_author_abstracts(author.id, pap1_res)
+            if author.preferred_name.given_names is not None:
+                name = author.preferred_name.given_names + ' ' + author.preferred_name.surname
+            else:
+                name = author.preferred_name.surname
+            author1_dict[name] = abstracts
+        pap2_res = await paper_search(auth2_paper_query)
+        author2_dict = {}
+        for author in auth2_res:
+            abstracts = get_author_abstracts(author.id, pap2_res)
+            if author.preferred_name.given_names is not None:
+                name = author.preferred_name.given_names + ' ' + author.preferred_name.surname
+            else:
+                name = author.preferred_name.surname
+            author2_dict[name] = abstracts
+        #return proc_result
 results = asyncio.run(main())
 
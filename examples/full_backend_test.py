@@ -54,19 +54,20 @@ inst_search = InstitutionSearchQuery.parse_obj({
 pubmed_backend = PubmedBackend(api_key=pubmed_api_key)
 scopus_backend = ScopusBackend(scopus_api_key, scopus_inst_token)
 async def main():
-    pub_paper_searcher = pubmed_backend.paper_search_engine()
-    pub_author_searcher = pubmed_backend.author_search_engine()
-    sco_paper_searcher = scopus_backend.paper_search_engine()
-    sco_author_searcher = scopus_backend.author_search_engine()
-    sco_inst_searcher = scopus_backend.institution_search_engine()
+    async with pubmed_backend, scopus_backend:
+        pub_paper_searcher = pubmed_backend.paper_search_engine()
+        pub_author_searcher = pubmed_backend.author_search_engine()
+        sco_paper_searcher = scopus_backend.paper_search_engine()
+        sco_author_searcher = scopus_backend.author_search_engine()
+        sco_inst_searcher = scopus_backend.institution_search_engine()
 
-    pub_paper_results = await pub_paper_searcher(paper_search)
-    pub_author_results = await pub_author_searcher(author_search)
-    sco_paper_results = await sco_paper_searcher(paper_search)
-    sco_author_results = await sco_author_searcher(author_search)
-    sco_inst_results = await sco_inst_searcher(inst_search)
-    print(sco_author_results[0])
-    print()
-    print(pub_author_results[0])
-    return pub_paper_results
+        pub_paper_results = await pub_paper_searcher(paper_search)
+        pub_author_results = await pub_author_searcher(author_search)
+        sco_paper_results = await sco_paper_searcher(paper_search)
+        sco_author_results = await sco_author_searcher(author_search)
+        sco_inst_results = await sco_inst_searcher(inst_search)
+        print(sco_author_results[0])
+        print()
+        print(pub_author_results[0])
+        return pub_paper_results
 pub_paper_results = asyncio.run(main())
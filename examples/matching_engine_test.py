@@ -181,19 +181,20 @@ def make_filename(name1, keyword1, name2, keyword2):
     return '_'.join([new_name1, new_keyword1, 'vs', new_name2, new_keyword2])+'.csv'
 
 async def main():
-    inst_data1 = await get_institution_data_from_name(name1)
-    inst_data2 = await get_institution_data_from_name(name2)
-    inst_id1 = choose_institution(inst_data1)
-    inst_id2 = choose_institution(inst_data2)
-    author_query1 = get_author_query_from_id(inst_id1, keyword1)
-    author_query2 = get_author_query_from_id(inst_id2, keyword2)
-
-    out = await matching_engine(author_query1, author_query2)
-    stacked_m, author_data1, author_data2 = out
-    # TODO Note:  change, can be author queries *with* selectors as additional data may be required for other reasons.
-    # such as displaying the authors names
-    # Generates superset with this and those required for the correlation functions
-    return process_matches(stacked_m, author_data1, author_data2)
+    async with op_scopus_backend:
+        inst_data1 = await get_institution_data_from_name(name1)
+        inst_data2 = await get_institution_data_from_name(name2)
+        inst_id1 = choose_institution(inst_data1)
+        inst_id2 = choose_institution(inst_data2)
+        author_query1 = get_author_query_from_id(inst_id1, keyword1)
+        author_query2 = get_author_query_from_id(inst_id2, keyword2)
+
+        out = await matching_engine(author_query1, author_query2)
+        stacked_m, author_data1, author_data2 = out
+        # TODO Note:  change, can be author queries *with* selectors as additional data may be required for other reasons.
+        # such as displaying the authors names
+        # Generates superset with this and those required for the correlation functions
+        return process_matches(stacked_m, author_data1, author_data2)
 
 
 results = asyncio.run(main())
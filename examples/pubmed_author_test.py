@@ -28,9 +28,10 @@ pub_searcher = AuthorSearchQueryEngine(pubmed_api_key, rate_limiter)
 
 start = time.time()
 async def main():
-    query = AuthorSearchQuery.parse_obj(d)
-    proc_result = await pub_searcher(query)
-    return proc_result
+    async with pub_searcher:
+        query = AuthorSearchQuery.parse_obj(d)
+        proc_result = await pub_searcher(query)
+        return proc_result
 results = asyncio.run(main())
 print(len(str(results)))
 
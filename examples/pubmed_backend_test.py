@@ -44,9 +44,9 @@ paper_search = PaperSearchQuery.parse_obj({
 })
 
 async def main():
-
-    #sauthor_searcher = pubmed_backend.author_search_engine()
-    paper_results = await paper_searcher(paper_search)
-    #author_results = await author_searcher(author_search)
-    return paper_results
+    async with pubmed_backend:
+        #sauthor_searcher = pubmed_backend.author_search_engine()
+        paper_results = await paper_searcher(paper_search)
+        #author_results = await author_searcher(author_search)
+        return paper_results
 paper_results = asyncio.run(main())
\ No newline at end of file
@@ -36,9 +36,10 @@ pub_searcher = PaperSearchQueryEngine(pubmed_api_key, rate_limiter)
 
 start = time.time()
 async def main():
-    query = PaperSearchQuery.parse_obj(d)
-    proc_result = await pub_searcher(query)
-    return proc_result
+    async with pub_searcher:
+        query = PaperSearchQuery.parse_obj(d)
+        proc_result = await pub_searcher(query)
+        return proc_result
 results = asyncio.run(main())
 #print(results[0])
 print(len(str(results)))
@@ -33,9 +33,10 @@ pub_searcher = AuthorSearchQueryEngine(scopus_api_key,scopus_inst_token, rate_li
 
 start = time.time()
 async def main():
-    query = AuthorSearchQuery.parse_obj(d)
-    proc_result = await pub_searcher(query)
-    return proc_result
+    async with pub_searcher:
+        query = AuthorSearchQuery.parse_obj(d)
+        proc_result = await pub_searcher(query)
+        return proc_result
 results = asyncio.run(main())
 print(results[0])
 print(len(results))
@@ -64,11 +64,12 @@ inst_search = InstitutionSearchQuery.parse_obj({
 
 
 async def main():
-    paper_results = await paper_searcher(paper_search)
+    async with scopus_backend:
+        paper_results = await paper_searcher(paper_search)
     
-    #author_results = await author_searcher(author_search)
+        #author_results = await author_searcher(author_search)
    
-    #inst_results = await inst_searcher(inst_search)
-    return paper_results
+        #inst_results = await inst_searcher(inst_search)
+        return paper_results
 paper_results = asyncio.run(main())
 print(paper_results[0:4])
\ No newline at end of file
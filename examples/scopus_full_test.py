@@ -34,9 +34,10 @@ pub_searcher = PaperSearchQueryEngine(scopus_api_key,scopus_inst_token, rate_lim
 
 start = time.time()
 async def main():
-    query = PaperSearchQuery.parse_obj(d)
-    proc_result = await pub_searcher(query)
-    return proc_result
+    async with pub_searcher:
+        query = PaperSearchQuery.parse_obj(d)
+        proc_result = await pub_searcher(query)
+        return proc_result
 results = asyncio.run(main())
 #print(results[0])
 print(len(str(results)))
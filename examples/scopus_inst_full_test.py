@@ -21,9 +21,10 @@ pub_searcher = InstitutionSearchQueryEngine(scopus_api_key,scopus_inst_token, ra
 
 start = time.time()
 async def main():
-    query = InstitutionSearchQuery.parse_obj(d)
-    proc_result = await pub_searcher(query)
-    return proc_result
+    async with pub_searcher:
+        query = InstitutionSearchQuery.parse_obj(d)
+        proc_result = await pub_searcher(query)
+        return proc_result
 results = asyncio.run(main())
 print(results)
 print(len(str(results)))
@@ -82,11 +82,12 @@ inst_search = InstitutionSearchQuery.parse_obj({
 
 
 async def main():
-    #paper_results = await paper_searcher(paper_search)
+    async with op_scopus_backend:
+        #paper_results = await paper_searcher(paper_search)
     
-    author_results = await author_searcher(author_search)
+        author_results = await author_searcher(author_search)
    
-    #inst_results = await inst_searcher(inst_search)
-    return author_results
+        #inst_results = await inst_searcher(inst_search)
+        return author_results
 author_results = asyncio.run(main())
 print(author_results[0:4])
\ No newline at end of file
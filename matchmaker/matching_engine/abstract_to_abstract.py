@@ -1,8 +1,5 @@
 from collections import defaultdict
-from gensim import corpora
 from typing import List, Set
-from gensim import models
-from gensim import similarities
 from matchmaker import query_engine
 import numpy as np
 
@@ -11,6 +8,9 @@ def produce_similarities(
     abstract_set2: List[str],
     excluded_words: Set[str],
     remove_singleton_words: bool = True) -> np.ndarray:
+    # gensim (and scipy with it) takes a while to import, so it is only
+    # loaded once abstracts are actually compared
+    from gensim import corpora, models, similarities
 
     def generate_texts(abstracts: List[str], excluded_words: Set[str], remove_singleton_words: bool = True) -> List[List[str]]:
         # remove common words and tokenise
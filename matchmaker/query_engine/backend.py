@@ -14,3 +14,12 @@ class Backend:
 
     def institution_search_engine(self) -> AbstractQueryEngine[InstitutionSearchQuery, List[InstitutionData]]:
         raise NotImplementedError('Calling method on abstract base class')
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
@@ -1,11 +1,33 @@
-from asyncio import Future, coroutine, get_running_loop
+from asyncio import AbstractEventLoop, Future, get_running_loop
 import asyncio
-from dataclasses import dataclass
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 import time
-from typing import Awaitable, Callable, Dict, Generic, Optional, Tuple, TypeVar
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Generic, Hashable, List, Mapping, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+import logging
 import uuid
 
-from aiohttp import ClientSession, TCPConnector
+from aiohttp import ClientResponse, ClientSession, TCPConnector
+from aiohttp.client import _RequestContextManager
+from aiohttp.typedefs import StrOrURL
+from matchmaker.query_engine.backends.cache import CachedResponse, ResponseCache
+from matchmaker.query_engine.backends.coalesce import (
+    CREDENTIAL_PARAMS,
+    SingleFlight,
+    normalise_url,
+    request_key,
+)
+from matchmaker.query_engine.backends.instrumentation import Instrumentation, RequestEvent
+from matchmaker.query_engine.backends.scheduler import (
+    Priority,
+    RequestScheduler,
+    current_priority,
+    priority_scope,
+)
+from matchmaker.query_engine.backends.retry import RETRYABLE_EXCEPTIONS, RetryPolicy, endpoint_name
 from matchmaker.query_engine.slightly_less_abstract import (
     AbstractNativeQuery,
     SlightlyLessAbstractQueryEngine,
@@ -17,64 +39,574 @@ from matchmaker.query_engine.types.query import (
     PaperSearchQuery,
 )
 import warnings
+
+logger = logging.getLogger(__name__)
+
+MAX_RESET_PAUSE = 60
+
+def parse_float_header(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    seconds = parse_float_header(value)
+    if seconds is not None:
+        return max(seconds, 0)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0)
+
+
+@dataclass
+class _Waiter:
+    priority: int
+    future: Future
+
+
+class TokenBucket:
+    """
+    Async token bucket. Up to `capacity` requests may go out in a burst, after
+    which tokens refill at `rate` per second. Waiters are served by priority
+    (lowest value first), and in the order they arrived within a priority.
+
+    The rate is adaptive: it drifts towards `max_rate` while the server reports
+    plenty of headroom, is scaled down as the remaining allowance runs low, and
+    is halved (with a pause) when the server starts refusing requests.
+    """
+    rate: float
+    min_rate: float
+    max_rate: float
+    capacity: float
+    tokens: float
+    updated: float
+    blocked_until: float
+    headroom_threshold: float = 0.2
+    smoothing: float = 0.3
+    _waiters: Deque[_Waiter]
+    _granted: Deque[float]
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        max_rate: Optional[float] = None,
+        min_rate: Optional[float] = None
+    ):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        if capacity is None:
+            capacity = max(1.0, rate)
+        self.rate = rate
+        self.max_rate = rate if max_rate is None else max(rate, max_rate)
+        self.min_rate = min(rate, 0.1) if min_rate is None else min(rate, min_rate)
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._waiters = deque()
+        self._granted = deque(maxlen=4096)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def throughput(self, window: float = 10) -> float:
+        """Tokens granted per second over the last `window` seconds."""
+        since = time.monotonic() - window
+        return sum(1 for granted in self._granted if granted >= since) / window
+
+    def utilization(self, window: float = 10) -> float:
+        return self.throughput(window) / self.rate
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate: float):
+        self._refill()
+        self.rate = min(self.max_rate, max(self.min_rate, rate))
+
+    def pause(self, seconds: float):
+        self._refill()
+        self.tokens = 0
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def back_off(self, retry_after: Optional[float] = None):
+        self.set_rate(self.rate / 2)
+        if retry_after is None:
+            retry_after = 1 / self.rate
+        self.pause(retry_after)
+
+    def adapt_to_headroom(self, headroom: float):
+        """Move the rate towards the target implied by the fraction of allowance remaining."""
+        target = self.max_rate * min(1.0, max(0.0, headroom) / self.headroom_threshold)
+        self.set_rate(self.rate + self.smoothing * (target - self.rate))
+
+    def _wake_next(self):
+        if self._waiters and not self._waiters[0].future.done():
+            self._waiters[0].future.set_result(None)
+
+    def _enqueue(self, waiter: '_Waiter'):
+        # FIFO within a priority, ahead of every waiter of lower priority
+        index = len(self._waiters)
+        while index > 0 and self._waiters[index - 1].priority > waiter.priority:
+            index -= 1
+        self._waiters.insert(index, waiter)
+
+    async def acquire(self, tokens: float = 1, priority: int = 0) -> float:
+        """
+        Wait for `tokens` to be available and take them, returning the time
+        waited. Waiters with a lower `priority` value are served first.
+        """
+        started = time.monotonic()
+        loop = get_running_loop()
+        waiter = _Waiter(priority, loop.create_future())
+        self._enqueue(waiter)
+        try:
+            while True:
+                if self._waiters[0] is not waiter:
+                    # Queued behind another waiter, or overtaken by a higher
+                    # priority one while waiting for tokens
+                    await waiter.future
+                    waiter.future = loop.create_future()
+                    continue
+                blocked_for = self.blocked_until - time.monotonic()
+                if blocked_for > 0:
+                    await asyncio.sleep(blocked_for)
+                    continue
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    self._granted.append(time.monotonic())
+                    break
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+        finally:
+            self._waiters.remove(waiter)
+            self._wake_next()
+        return time.monotonic() - started
+
+
 class RateLimiter:
-    bunch_start: Optional[float]
-    max_requests_per_second: int
-    requests_made: int
-    def __init__(self, *args, max_requests_per_second = 9, **kwargs):
+    """
+    Holds one token bucket per host (and optionally per endpoint path on that
+    host). Requests to urls with no matching bucket share the default bucket.
+    """
+    max_requests_per_second: float
+    default_bucket: TokenBucket
+    buckets: Dict[Tuple[str, str], TokenBucket]
+    def __init__(self, *args, max_requests_per_second = 9, burst: Optional[float] = None, **kwargs):
         self.max_requests_per_second = max_requests_per_second
-        self.bunch_start= None
-        self.requests_made = 0
+        self.default_bucket = TokenBucket(max_requests_per_second, burst)
+        self.buckets = {}
         super().__init__(*args, **kwargs)
-    
-    async def rate_limit(self):
-        current_time = time.time()
-        if self.bunch_start is None:
-            self.bunch_start = current_time
-            self.requests_made = 1
-        else:
-            elapsed = current_time - self.bunch_start
-            if elapsed < (1/self.max_requests_per_second):
-                if self.requests_made >= 1:
-                    await asyncio.sleep(1/self.max_requests_per_second)
-                    await self.rate_limit()
-                else:
-                    self.requests_made += 1
-            else:
-                self.bunch_start = current_time
-                self.requests_made = 1
+
+    def add_bucket(
+        self,
+        host: str,
+        requests_per_second: float,
+        burst: Optional[float] = None,
+        endpoint: str = '',
+        max_requests_per_second: Optional[float] = None
+    ) -> TokenBucket:
+        bucket = TokenBucket(requests_per_second, burst, max_rate = max_requests_per_second)
+        self.buckets[(host, endpoint)] = bucket
+        return bucket
+
+    def get_bucket(self, url: Optional[str] = None) -> TokenBucket:
+        if url is None:
+            return self.default_bucket
+        parsed = urlsplit(url)
+        best = None
+        for (host, endpoint), bucket in self.buckets.items():
+            if host == parsed.hostname and parsed.path.startswith(endpoint):
+                if best is None or len(endpoint) > len(best[0]):
+                    best = (endpoint, bucket)
+        if best is None:
+            return self.default_bucket
+        return best[1]
+
+    async def rate_limit(self, url: Optional[str] = None, priority: int = 0) -> float:
+        return await self.get_bucket(url).acquire(priority = priority)
+
+    def update_from_response(self, url: Optional[str], status: int, headers: Mapping[str, str]):
+        bucket = self.get_bucket(url)
+        retry_after = parse_retry_after(headers.get('Retry-After'))
+        if status == 429 or (status == 503 and retry_after is not None):
+            bucket.back_off(retry_after)
+            return
+
+        remaining = parse_float_header(headers.get('X-RateLimit-Remaining'))
+        if remaining is None:
+            return
+        limit = parse_float_header(headers.get('X-RateLimit-Limit'))
+        if limit is None or limit <= 0:
+            limit = bucket.capacity
+        if remaining <= 0:
+            reset = parse_float_header(headers.get('X-RateLimit-Reset'))
+            if reset is not None:
+                # Reset may be sent as an epoch timestamp or as seconds to wait
+                if reset > 1e9:
+                    reset = reset - time.time()
+                bucket.pause(min(max(reset, 0), MAX_RESET_PAUSE))
+        bucket.adapt_to_headroom(remaining / limit)
+
+
+async def iter_body(output, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    # Preloaded and cached responses already hold their body, anything else
+    # is streamed off the connection
+    body = getattr(output, '_body', None)
+    if body is not None:
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+        return
+    async for chunk in output.content.iter_chunked(chunk_size):
+        yield chunk
+
+
+# The native query currently being run, so that the client can attribute
+# per-request accounting (eg. cache hits) to it
+current_native_query: ContextVar[Optional[Any]] = ContextVar('current_native_query', default=None)
+
+def record_call(counter: str, endpoint: str):
+    native_query = current_native_query.get()
+    if native_query is not None:
+        counts = getattr(native_query, counter)
+        counts[endpoint] = counts.get(endpoint, 0) + 1
 
 
 with warnings.catch_warnings():
     warnings.filterwarnings("ignore",category=DeprecationWarning)
     class NewAsyncClient(ClientSession):
         rate_limiter: RateLimiter
+        retry_policy: RetryPolicy
+        single_flight: SingleFlight
+        response_cache: Optional[ResponseCache]
+        instrumentation: Instrumentation
+        scheduler: RequestScheduler
 
-        def __init__(self, rate_limiter: RateLimiter = RateLimiter(), *args, **kwargs):
+        def __init__(
+            self,
+            rate_limiter: Optional[RateLimiter] = None,
+            *args,
+            retry_policy: Optional[RetryPolicy] = None,
+            response_cache: Optional[ResponseCache] = None,
+            instrumentation: Optional[Instrumentation] = None,
+            scheduler: Optional[RequestScheduler] = None,
+            **kwargs
+        ):
+            if rate_limiter is None:
+                rate_limiter = RateLimiter()
+            if retry_policy is None:
+                retry_policy = RetryPolicy()
             self.rate_limiter = rate_limiter
+            self.retry_policy = retry_policy
+            if instrumentation is None:
+                instrumentation = Instrumentation()
+            self.response_cache = response_cache
+            if scheduler is None:
+                scheduler = RequestScheduler()
+            self.instrumentation = instrumentation
+            self.scheduler = scheduler
+            self.single_flight = SingleFlight()
             super().__init__(*args, **kwargs)
-        async def get(self, *args, **kwargs):
-            await self.rate_limiter.rate_limit()
-            output = await super().get(*args, **kwargs)
-            print(int(dict(output.raw_headers)[b'X-RateLimit-Remaining']))
-            return output
 
-        async def post(self, *args, **kwargs):
-            await self.rate_limiter.rate_limit()
-            output = await super().post(*args, **kwargs)
-            print(int(dict(output.raw_headers)[b'X-RateLimit-Remaining']))
+        async def __aenter__(self) -> 'NewAsyncClient':
+            return self
+
+        async def coalesce(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+            return await self.single_flight.do(key, factory)
+
+        async def wait_for_quota(self, url: str, priority: Optional[Priority] = None) -> float:
+            """Take quota for a request made outside the client."""
+            if priority is None:
+                priority = current_priority.get()
+            return await self.rate_limiter.rate_limit(str(url), priority)
+
+        def record_request(
+            self,
+            method: str,
+            url,
+            started: float,
+            status: Optional[int] = None,
+            size: Optional[int] = None,
+            retries: int = 0,
+            rate_limit_wait: float = 0,
+            queue_depth: int = 0,
+            from_cache: bool = False,
+            error: Optional[str] = None
+        ):
+            if not self.instrumentation.subscribers:
+                return
+            now = time.monotonic()
+            self.instrumentation.emit(RequestEvent(
+                method = method.upper(),
+                # Credentials are stripped so events can be written out safely
+                url = normalise_url(str(url), CREDENTIAL_PARAMS),
+                endpoint = endpoint_name(str(url)),
+                status = status,
+                latency = now - started,
+                bytes = size,
+                retries = retries,
+                rate_limit_wait = rate_limit_wait,
+                queue_depth = queue_depth,
+                timestamp = time.time() - (now - started),
+                from_cache = from_cache,
+                error = error
+            ))
+
+        async def send(
+            self,
+            method: str,
+            url,
+            idempotent: Optional[bool] = None,
+            preload: bool = True,
+            **kwargs
+        ) -> ClientResponse:
+            can_coalesce = (
+                self.retry_policy.is_idempotent(method, idempotent)
+                and set(kwargs) <= {'data'}
+            )
+            if can_coalesce and self.response_cache is not None:
+                # Bodies have to be read in full to be cached, so responses are
+                # only streamed when there is no cache
+                preload = True
+            if can_coalesce and preload:
+                # Identical requests already in flight share a single response,
+                # whose body has been read so every caller can consume it
+                key = request_key(method, str(url), kwargs.get('data'))
+                return await self.coalesce(
+                    key,
+                    lambda: self._send_cached(method, url, idempotent, preload, **kwargs)
+                )
+            return await self._send(method, url, idempotent, preload, **kwargs)
+
+        async def _send_cached(
+            self,
+            method: str,
+            url,
+            idempotent: Optional[bool] = None,
+            preload: bool = True,
+            **kwargs
+        ):
+            if self.response_cache is None or not self.response_cache.cacheable(str(url)):
+                return await self._send(method, url, idempotent, preload, **kwargs)
+            started = time.monotonic()
+            endpoint = endpoint_name(str(url))
+            cache_key = self.response_cache.key(method, str(url), kwargs.get('data'))
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                record_call('cache_hits', endpoint)
+                status, headers, body = cached
+                self.record_request(method, url, started, status, len(body), from_cache = True)
+                return CachedResponse(str(url), status, headers, body)
+            record_call('cache_misses', endpoint)
+            output = await self._send(method, url, idempotent, preload, **kwargs)
+            if output.status == 200:
+                body = await output.read()
+                await self.response_cache.put(cache_key, str(url), output.status, output.headers, body)
             return output
-    
+
+        async def _send(
+            self,
+            method: str,
+            url,
+            idempotent: Optional[bool] = None,
+            preload: bool = True,
+            **kwargs
+        ):
+            # Each attempt goes back through the rate limiter, and the body is
+            # read inside the loop so that resets mid-body are retried too
+            can_retry = self.retry_policy.is_idempotent(method, idempotent)
+            attempt = 0
+            started = time.monotonic()
+            rate_limit_wait = 0.0
+            queue_depth = self.rate_limiter.get_bucket(str(url)).queue_depth
+            priority = current_priority.get()
+            try:
+                while True:
+                    # Each attempt takes its own slot, so the slot is free for
+                    # other requests during the backoff
+                    await self.scheduler.acquire(priority)
+                    holding_slot = True
+                    try:
+                        rate_limit_wait += await self.wait_for_quota(url, priority)
+                        try:
+                            output = await super().request(method, url, **kwargs)
+                            self.rate_limiter.update_from_response(str(url), output.status, output.headers)
+                            if output.status not in self.retry_policy.retry_statuses:
+                                if preload:
+                                    size = len(await output.read())
+                                else:
+                                    size = output.content_length
+                                    if output.connection is not None:
+                                        # The slot is held until the streamed
+                                        # body is read or released
+                                        output.connection.add_callback(
+                                            lambda: self.scheduler.release(priority)
+                                        )
+                                        holding_slot = False
+                                self.record_request(
+                                    method, url, started, output.status, size,
+                                    attempt, rate_limit_wait, queue_depth
+                                )
+                                return output
+                            if not (can_retry and self.retry_policy.should_retry(str(url), attempt)):
+                                output.raise_for_status()
+                            output.release()
+                        except RETRYABLE_EXCEPTIONS:
+                            if not (can_retry and self.retry_policy.should_retry(str(url), attempt)):
+                                raise
+                    finally:
+                        if holding_slot:
+                            self.scheduler.release(priority)
+                    await asyncio.sleep(self.retry_policy.backoff(attempt))
+                    attempt += 1
+            except Exception as e:
+                self.record_request(
+                    method, url, started, getattr(e, 'status', None), None,
+                    attempt, rate_limit_wait, queue_depth, error = type(e).__name__
+                )
+                raise
+
+        # Like ClientSession's, the response can be awaited or used as a
+        # context manager that releases it
+        def get(self, url: StrOrURL, *, allow_redirects: bool = True, **kwargs: Any) -> _RequestContextManager:
+            if not allow_redirects:
+                kwargs['allow_redirects'] = False
+            return _RequestContextManager(self.send('GET', url, **kwargs))
+
+        def post(self, url: StrOrURL, *, data: Any = None, **kwargs: Any) -> _RequestContextManager:
+            if data is not None:
+                kwargs['data'] = data
+            return _RequestContextManager(self.send('POST', url, **kwargs))
+
+
+class SessionManager:
+    """
+    Owns a single pooled client for a backend, so that connections (and their
+    TLS sessions) are kept alive and reused across queries rather than being
+    rebuilt for every request.
+    """
+    rate_limiter: RateLimiter
+    retry_policy: RetryPolicy
+    response_cache: Optional[ResponseCache]
+    instrumentation: Instrumentation
+    scheduler: RequestScheduler
+    limit: int
+    limit_per_host: int
+    ttl_dns_cache: Optional[int]
+    keepalive_timeout: float
+    _client: Optional[NewAsyncClient]
+    _loop: Optional[AbstractEventLoop]
+
+    def __init__(
+        self,
+        rate_limiter: Optional[RateLimiter] = None,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        ttl_dns_cache: Optional[int] = 300,
+        keepalive_timeout: float = 30,
+        retry_policy: Optional[RetryPolicy] = None,
+        response_cache: Optional[ResponseCache] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        scheduler: Optional[RequestScheduler] = None
+    ):
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+        if instrumentation is None:
+            instrumentation = Instrumentation()
+        if scheduler is None:
+            scheduler = RequestScheduler()
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.response_cache = response_cache
+        self.instrumentation = instrumentation
+        self.scheduler = scheduler
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self._client = None
+        self._loop = None
+
+    async def get_client(self) -> NewAsyncClient:
+        loop = get_running_loop()
+        if self._client is not None and not self._client.closed and self._loop is not loop:
+            await self._close_on_own_loop()
+        if self._client is None or self._client.closed or self._loop is not loop:
+            # Connectors are bound to the loop they were made in, so a session
+            # left over from a previous loop cannot be reused
+            connector = TCPConnector(
+                limit = self.limit,
+                limit_per_host = self.limit_per_host,
+                use_dns_cache = self.ttl_dns_cache is not None,
+                ttl_dns_cache = self.ttl_dns_cache,
+                keepalive_timeout = self.keepalive_timeout
+            )
+            self._client = NewAsyncClient(
+                connector = connector,
+                rate_limiter = self.rate_limiter,
+                retry_policy = self.retry_policy,
+                response_cache = self.response_cache,
+                instrumentation = self.instrumentation,
+                scheduler = self.scheduler
+            )
+            self._loop = loop
+        return self._client
+
+    async def _close_on_own_loop(self):
+        # A session can only be closed on the loop it was made in
+        client, loop = self._client, self._loop
+        if client is None or loop is None:
+            return
+        if loop.is_running():
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.close(), loop))
+        else:
+            logger.warning('Leaving a session open, as the event loop it was made in has stopped')
+
+    async def close(self):
+        if self._client is not None and not self._client.closed:
+            if self._loop is get_running_loop():
+                await self._client.close()
+            else:
+                await self._close_on_own_loop()
+        self._client = None
+        self._loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
 NativeData = TypeVar('NativeData')
 
 @dataclass
 class BaseNativeQuery(Generic[NativeData], AbstractNativeQuery):
     coroutine_function: Callable[[NewAsyncClient], Awaitable[NativeData]]
     metadata: Dict[str, int]
+    retry_budgets: Dict[str, int] = field(default_factory=dict)
+    cache_hits: Dict[str, int] = field(default_factory=dict)
+    cache_misses: Dict[str, int] = field(default_factory=dict)
+    # Projected response bytes per method, where the engine can estimate them
+    expected_bytes: Dict[str, int] = field(default_factory=dict)
     def count_api_calls(self):
         return sum(self.metadata.values())
     def count_api_calls_by_method(self, method: str):
         return self.metadata[method]
+    def count_expected_bytes(self):
+        return sum(self.expected_bytes.values())
 
 Query = TypeVar('Query')
 Data = TypeVar('Data')
@@ -84,50 +616,105 @@ class BaseBackendQueryEngine(
     Generic[Query, NativeData, Data], 
     SlightlyLessAbstractQueryEngine[Query, BaseNativeQuery[NativeData], NativeData, Data]
 ):
-    def __init__(self, rate_limiter = RateLimiter(), *args, **kwargs):
+    # The endpoint url of each metadata method not named after its endpoint,
+    # as retries are budgeted under the endpoint's name
+    method_endpoints: Dict[str, str] = {}
+
+    def __init__(
+        self,
+        rate_limiter: Optional[RateLimiter] = None,
+        *args,
+        session_manager: Optional[SessionManager] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        **kwargs
+    ):
+        if rate_limiter is None:
+            rate_limiter = RateLimiter()
         self.rate_limiter = rate_limiter
+        self._owns_session_manager = session_manager is None
+        if session_manager is None:
+            session_manager = SessionManager(rate_limiter = rate_limiter, scheduler = scheduler)
+        self.session_manager = session_manager
         super().__init__(*args, **kwargs)
     
     async def _query_to_awaitable(self, query: Query, client: NewAsyncClient) -> Tuple[Callable[[NewAsyncClient], Awaitable[NativeData]], Dict[str, int]]:
         raise NotImplementedError('This method is required for query_to_native')
     async def _query_to_native(self, query: Query) -> BaseNativeQuery[NativeData]:
-        connector = TCPConnector(force_close=True)
-        async with NewAsyncClient(connector = connector, rate_limiter = self.rate_limiter) as client:
-            coro = self._query_to_awaitable(query,  client)
-            awaitable, metadata = await coro
-        return BaseNativeQuery(awaitable, metadata)
+        client = await self.session_manager.get_client()
+        awaitable, metadata = await self._query_to_awaitable(query, client)
+        return self._make_native_query(client, awaitable, metadata)
+
+    def _make_native_query(
+        self,
+        client: NewAsyncClient,
+        awaitable: Callable[[NewAsyncClient], Awaitable[NativeData]],
+        metadata: Dict[str, int],
+        expected_bytes: Optional[Dict[str, int]] = None
+    ) -> BaseNativeQuery[NativeData]:
+        retry_budgets = {
+            method: client.retry_policy.remaining_budget(self.method_endpoints.get(method, method))
+            for method in metadata
+        }
+        return BaseNativeQuery(
+            awaitable, metadata, retry_budgets, expected_bytes = expected_bytes or {}
+        )
 
     async def _run_native_query(self, query: BaseNativeQuery[NativeData]) -> NativeData:
-        connector = TCPConnector(force_close=True)
-        async with NewAsyncClient(connector = connector, rate_limiter = self.rate_limiter) as client:
-            results = await query.coroutine_function(client)
-        return results
+        client = await self.session_manager.get_client()
+        token = current_native_query.set(query)
+        try:
+            return await query.coroutine_function(client)
+        finally:
+            current_native_query.reset(token)
+
+    async def close(self):
+        # Sessions handed in by a backend are closed by that backend
+        if self._owns_session_manager:
+            await self.session_manager.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
     
     async def _post_process(self, query: Query, data: NativeData) -> Data:
         raise NotImplementedError('Calling method on abstract base class')
 
-    async def __call__(self, query: Query) -> Data:
-        nd = await self._run_native_query(await self._query_to_native(query))
-        return await self._post_process(query, nd)
+    async def __call__(self, query: Query, priority: Optional[Priority] = None) -> Data:
+        # Every request made while answering the query is tagged with the priority
+        with priority_scope(priority):
+            nd = await self._run_native_query(await self._query_to_native(query))
+            return await self._post_process(query, nd)
+
+    async def get_data_from_native_query(
+        self,
+        query: Query,
+        native_query: BaseNativeQuery[NativeData],
+        priority: Optional[Priority] = None
+    ) -> Data:
+        with priority_scope(priority):
+            nd = await self._run_native_query(native_query)
+            return await self._post_process(query, nd)
     
     #Put post process as no op
 
 
 class BasePaperSearchQueryEngine(
     Generic[NativeData], 
-    BaseBackendQueryEngine[PaperSearchQuery, NativeData, PaperData]
+    BaseBackendQueryEngine[PaperSearchQuery, NativeData, List[PaperData]]
 ):
     pass
 
 
 class BaseAuthorSearchQueryEngine(
     Generic[NativeData], 
-    BaseBackendQueryEngine[AuthorSearchQuery, NativeData, AuthorData]
+    BaseBackendQueryEngine[AuthorSearchQuery, NativeData, List[AuthorData]]
 ):
     pass
 
 class BaseInstitutionSearchQueryEngine(
     Generic[NativeData], 
-    BaseBackendQueryEngine[InstitutionSearchQuery, NativeData, InstitutionData]
+    BaseBackendQueryEngine[InstitutionSearchQuery, NativeData, List[InstitutionData]]
 ):
     pass
@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+from hashlib import sha256
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from matchmaker.query_engine.backends import RateLimiter
+from matchmaker.query_engine.backends.scheduler import Priority, RequestScheduler
+
+
+def key_id(api_key: Optional[Any]) -> str:
+    # Api keys are never kept in the registry or its reports
+    if api_key is None:
+        return 'anonymous'
+    return sha256(str(api_key).encode('utf8')).hexdigest()[:12]
+
+
+@dataclass
+class Budget:
+    family: str
+    key_id: str
+    rate_limiter: RateLimiter
+    scheduler: RequestScheduler
+
+    def utilization(self, window: float = 10) -> Dict[str, Any]:
+        buckets = {'default': self.rate_limiter.default_bucket}
+        for (host, endpoint), bucket in self.rate_limiter.buckets.items():
+            buckets[host + endpoint] = bucket
+        return {
+            'rate_limits': {
+                name: {
+                    'rate': bucket.rate,
+                    'max_rate': bucket.max_rate,
+                    'throughput': bucket.throughput(window),
+                    'utilization': bucket.utilization(window),
+                    'queue_depth': bucket.queue_depth,
+                }
+                for name, bucket in buckets.items()
+            },
+            'concurrency': {
+                priority.name.lower(): {
+                    'active': self.scheduler.active(priority),
+                    'limit': self.scheduler.concurrency[priority],
+                    'queued': self.scheduler.queue_depth(priority),
+                }
+                for priority in Priority
+            }
+        }
+
+
+class BudgetRegistry:
+    """
+    Process-wide registry of rate limits and concurrency caps, with one
+    Budget per endpoint family (eg. 'pubmed') and api key. Every engine built
+    against the same provider and key draws from the same budget, however
+    many backends or meta engines it was reached through.
+    """
+    _budgets: Dict[Tuple[str, str], Budget]
+    _lock: Lock
+
+    def __init__(self):
+        self._budgets = {}
+        self._lock = Lock()
+
+    def get(
+        self,
+        family: str,
+        api_key: Optional[str],
+        make_rate_limiter: Callable[[], RateLimiter],
+        concurrency: Optional[Dict[Priority, int]] = None
+    ) -> Budget:
+        key = (family, key_id(api_key))
+        with self._lock:
+            if key not in self._budgets:
+                self._budgets[key] = Budget(
+                    family = family,
+                    key_id = key[1],
+                    rate_limiter = make_rate_limiter(),
+                    scheduler = RequestScheduler(concurrency)
+                )
+            return self._budgets[key]
+
+    def clear(self):
+        with self._lock:
+            self._budgets = {}
+
+    def utilization(self, window: float = 10) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            budgets = list(self._budgets.values())
+        return {
+            f'{budget.family}:{budget.key_id}': budget.utilization(window)
+            for budget in budgets
+        }
+
+budget_registry = BudgetRegistry()
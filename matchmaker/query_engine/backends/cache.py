@@ -0,0 +1,207 @@
+import asyncio
+from contextlib import contextmanager
+from hashlib import sha256
+import json
+import os
+import sqlite3
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Mapping, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import zlib
+
+from aiohttp import ClientResponseError
+from multidict import CIMultiDict, CIMultiDictProxy
+from matchmaker.query_engine.backends.coalesce import CREDENTIAL_PARAMS, request_key
+from matchmaker.query_engine.backends.retry import endpoint_name
+
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
+DEFAULT_TTL = 24 * 60 * 60
+# Only the headers that callers or the rate limiter look at are stored. Bodies
+# are stored decoded, so Content-Encoding and Content-Length are never kept
+STORED_HEADERS = ('Content-Type',)
+
+
+class CachedStream:
+    _body: bytes
+
+    def __init__(self, body: bytes):
+        self._body = body
+
+    async def read(self, n: int = -1) -> bytes:
+        return self._body
+
+    async def iter_chunked(self, n: int) -> AsyncIterator[bytes]:
+        for start in range(0, len(self._body), n):
+            yield self._body[start:start + n]
+
+
+class CachedResponse:
+    """Stands in for an aiohttp ClientResponse whose body came from the cache."""
+    status: int
+    headers: 'CIMultiDictProxy[str]'
+    content: CachedStream
+    from_cache: bool = True
+    _body: bytes
+
+    def __init__(self, url: str, status: int, headers: Mapping[str, str], body: bytes):
+        self.url = url
+        self.status = status
+        self.headers = CIMultiDictProxy(CIMultiDict(headers))
+        self.content = CachedStream(body)
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: Optional[str] = None) -> str:
+        return self._body.decode(encoding or 'utf8')
+
+    def release(self):
+        pass
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise ClientResponseError(None, (), status = self.status)  # type: ignore[arg-type]
+
+
+class ResponseCache:
+    """
+    On-disk, content-addressed cache of response bodies.
+
+    Entries are keyed by a hash of the canonical request (with credentials
+    such as api keys removed), stored zlib-compressed in SQLite, expire after
+    a per-endpoint TTL and are evicted least-recently-used first once the
+    cache grows past `max_size_bytes`. SQLite's locking makes the cache safe
+    to share between processes. Requests carrying any of `uncached_params`
+    are neither served from nor stored in the cache.
+    """
+    path: str
+    max_size_bytes: int
+    default_ttl: float
+    ttl_by_endpoint: Dict[str, float]
+    drop_params: Tuple[str, ...]
+    uncached_params: Tuple[str, ...]
+    compression_level: int
+
+    def __init__(
+        self,
+        path: str,
+        max_size_bytes: int = DEFAULT_CACHE_SIZE,
+        default_ttl: float = DEFAULT_TTL,
+        ttl_by_endpoint: Optional[Dict[str, float]] = None,
+        drop_params: Tuple[str, ...] = CREDENTIAL_PARAMS,
+        uncached_params: Tuple[str, ...] = (),
+        compression_level: int = 6
+    ):
+        self.path = path
+        self.max_size_bytes = max_size_bytes
+        self.default_ttl = default_ttl
+        self.ttl_by_endpoint = ttl_by_endpoint or {}
+        self.drop_params = drop_params
+        self.uncached_params = uncached_params
+        self.compression_level = compression_level
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, '
+                'endpoint TEXT, '
+                'status INTEGER, '
+                'headers TEXT, '
+                'body BLOB, '
+                'size INTEGER, '
+                'expires REAL, '
+                'accessed REAL)'
+            )
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)'
+            )
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        # A fresh connection per operation keeps the cache usable from worker
+        # threads and forked processes alike
+        connection = sqlite3.connect(self.path, timeout = 30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def key(self, method: str, url: str, data: Optional[Any] = None) -> str:
+        canonical = json.dumps(request_key(method, url, data, self.drop_params))
+        return sha256(canonical.encode('utf8')).hexdigest()
+
+    def cacheable(self, url: str) -> bool:
+        params = parse_qs(urlsplit(str(url)).query, keep_blank_values=True)
+        return not any(param in params for param in self.uncached_params)
+
+    def ttl_for(self, url: str) -> float:
+        return self.ttl_by_endpoint.get(endpoint_name(url), self.default_ttl)
+
+    def _get(self, key: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        now = time.time()
+        with self._connection() as connection:
+            row = connection.execute(
+                'SELECT status, headers, body, expires FROM responses WHERE key = ?',
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            status, headers, body, expires = row
+            if expires < now:
+                connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+                return None
+            connection.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+        return status, json.loads(headers), zlib.decompress(body)
+
+    def _put(self, key: str, url: str, status: int, headers: Dict[str, str], body: bytes):
+        now = time.time()
+        compressed = zlib.compress(body, self.compression_level)
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    key,
+                    endpoint_name(url),
+                    status,
+                    json.dumps(headers),
+                    compressed,
+                    len(compressed),
+                    now + self.ttl_for(url),
+                    now
+                )
+            )
+            self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection):
+        connection.execute('DELETE FROM responses WHERE expires < ?', (time.time(),))
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_size_bytes:
+            return
+        # Evict down to 90% of the cap so that we do not evict on every write
+        target = self.max_size_bytes * 0.9
+        for key, size in connection.execute(
+            'SELECT key, size FROM responses ORDER BY accessed ASC'
+        ).fetchall():
+            if total <= target:
+                break
+            connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+
+    def size(self) -> int:
+        with self._connection() as connection:
+            return connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM responses')
+
+    async def get(self, key: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def put(self, key: str, url: str, status: int, headers: Mapping[str, str], body: bytes):
+        stored_headers = {k: headers[k] for k in STORED_HEADERS if k in headers}
+        await asyncio.to_thread(self._put, key, url, status, stored_headers, body)
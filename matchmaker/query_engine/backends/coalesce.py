@@ -0,0 +1,104 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Optional, Tuple, TypeVar
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from matchmaker.query_engine.backends.scheduler import Priority, current_priority
+
+Result = TypeVar('Result')
+# Query parameters that carry credentials rather than identify a request
+CREDENTIAL_PARAMS = ('api_key', 'apiKey', 'insttoken')
+
+def normalise_url(url: str, drop_params: Tuple[str, ...] = ()) -> str:
+    parts = urlsplit(str(url))
+    params = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in drop_params
+    )
+    return urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path,
+        urlencode(params),
+        ''
+    ))
+
+def normalise_body(data: Optional[Any], drop_params: Tuple[str, ...] = ()) -> str:
+    if data is None:
+        return ''
+    if isinstance(data, Mapping):
+        items = []
+        for k, v in data.items():
+            if k in drop_params:
+                continue
+            if isinstance(v, (list, tuple)):
+                v = ','.join(str(i) for i in v)
+            items.append((str(k), str(v)))
+        return urlencode(sorted(items))
+    if isinstance(data, bytes):
+        return data.decode('utf8', errors='replace')
+    return str(data)
+
+def request_key(
+    method: str,
+    url: str,
+    data: Optional[Any] = None,
+    drop_params: Tuple[str, ...] = ()
+) -> Tuple[str, str, str]:
+    return (
+        method.upper(),
+        normalise_url(url, drop_params),
+        normalise_body(data, drop_params)
+    )
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key, so that only the first one
+    runs and every caller receives its result (or its exception).
+
+    The call runs at the priority of the caller that started it, so a more
+    urgent caller starts a call of its own rather than waiting on it, and
+    callers that joined a call that is cancelled, eg. by cancelling the
+    queued requests of its priority, make the call again themselves.
+    """
+    _in_flight: Dict[Hashable, Tuple['asyncio.Future[Any]', Priority]]
+
+    def __init__(self):
+        self._in_flight = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def _start(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Result]],
+        priority: Priority
+    ) -> 'asyncio.Future[Result]':
+        task = asyncio.ensure_future(factory())
+        self._in_flight[key] = (task, priority)
+
+        def forget(done_task):
+            if self._in_flight.get(key, (None, None))[0] is done_task:
+                del self._in_flight[key]
+            if not done_task.cancelled():
+                # Mark the exception as retrieved even if every caller left
+                done_task.exception()
+        task.add_done_callback(forget)
+        return task
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Result]]) -> Result:
+        priority = current_priority.get()
+        while True:
+            flight = self._in_flight.get(key)
+            if flight is None or flight[0].done() or priority < flight[1]:
+                # Shielded so that this caller giving up does not cancel the
+                # call for everyone who joins it
+                return await asyncio.shield(self._start(key, factory, priority))
+            task = flight[0]
+            try:
+                return await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    # This caller was cancelled, not the call
+                    raise
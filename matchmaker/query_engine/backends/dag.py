@@ -0,0 +1,43 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class TaskGraph:
+    """
+    A small DAG of named async steps. Each step is called with the results
+    of the steps it depends on, and starts as soon as they have all finished,
+    so independent branches run concurrently.
+    """
+    _steps: Dict[str, Tuple[Callable[..., Awaitable[Any]], Tuple[str, ...]]]
+
+    def __init__(self):
+        self._steps = {}
+
+    def add(self, name: str, func: Callable[..., Awaitable[Any]], *dependencies: str):
+        if name in self._steps:
+            raise ValueError(f'Step {name} already added')
+        for dependency in dependencies:
+            if dependency not in self._steps:
+                # Dependencies have to be added first, which rules out cycles
+                raise ValueError(f'Step {name} depends on unknown step {dependency}')
+        self._steps[name] = (func, dependencies)
+
+    async def run(self) -> Dict[str, Any]:
+        tasks: Dict[str, 'asyncio.Task[Any]'] = {}
+
+        async def run_step(name: str) -> Any:
+            func, dependencies = self._steps[name]
+            results = [await tasks[dependency] for dependency in dependencies]
+            return await func(*results)
+
+        for name in self._steps:
+            tasks[name] = asyncio.ensure_future(run_step(name))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            # One failed step fails the graph, so stop the rest
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions = True)
+            raise
+        return {name: task.result() for name, task in tasks.items()}
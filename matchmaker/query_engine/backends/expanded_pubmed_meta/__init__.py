@@ -13,11 +13,9 @@ from asyncio import get_running_loop, gather
 from matchmaker.query_engine.backends.exceptions import QueryNotSupportedError, SearchNotPossible
 from dataclasses import dataclass
 import pdb
-from pybliometrics.scopus.utils.constants import SEARCH_MAX_ENTRIES
 #from matchmaker.query_engine.backends.exceptions import QueryNotSupportedError
 from matchmaker.query_engine.backends.tools import TagNotFound, execute_callback_on_tag
 from matchmaker.query_engine.backends.metas import BaseAuthorSearchQueryEngine
-from pybliometrics.scopus.exception import ScopusQueryError
 from copy import deepcopy
 
 
@@ -244,4 +242,7 @@ class ExpandedPubmedMeta(Backend):
         )
 
     def institution_search_engine(self) -> None:
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    async def close(self):
+        await self.pubmed_backend.close()
\ No newline at end of file
@@ -0,0 +1,129 @@
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass
+import json
+import logging
+import math
+from typing import Callable, Deque, Dict, IO, List, Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RequestEvent:
+    method: str
+    url: str
+    endpoint: str
+    status: Optional[int]
+    # Wall-clock seconds from the first attempt until the response was
+    # returned, including rate limiter waits and retry backoff
+    latency: float
+    bytes: Optional[int]
+    retries: int
+    rate_limit_wait: float
+    queue_depth: int
+    timestamp: float
+    from_cache: bool = False
+    error: Optional[str] = None
+
+Subscriber = Callable[[RequestEvent], None]
+
+
+class Instrumentation:
+    """
+    Fans out a RequestEvent for every request made by a client to any
+    subscribed callbacks.
+    """
+    subscribers: List[Subscriber]
+
+    def __init__(self, subscribers: Optional[List[Subscriber]] = None):
+        self.subscribers = list(subscribers or [])
+
+    def subscribe(self, subscriber: Subscriber) -> Subscriber:
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.remove(subscriber)
+
+    def emit(self, event: RequestEvent):
+        for subscriber in self.subscribers:
+            # A broken subscriber must not fail the request it is observing
+            try:
+                subscriber(event)
+            except Exception:
+                logger.exception('Instrumentation subscriber %r failed', subscriber)
+
+
+def percentile(values: List[float], q: float) -> float:
+    # Nearest-rank percentile
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class LatencyAggregator:
+    """
+    In-memory subscriber that keeps the most recent `window` events per
+    endpoint and summarises their latencies.
+    """
+    window: int
+    latencies: Dict[str, Deque[float]]
+    totals: Dict[str, Dict[str, float]]
+
+    def __init__(self, window: int = 10000):
+        self.window = window
+        self.latencies = defaultdict(lambda: deque(maxlen=self.window))
+        self.totals = defaultdict(lambda: {
+            'requests': 0,
+            'errors': 0,
+            'cache_hits': 0,
+            'retries': 0,
+            'bytes': 0,
+            'rate_limit_wait': 0.0,
+        })
+
+    def __call__(self, event: RequestEvent):
+        self.latencies[event.endpoint].append(event.latency)
+        totals = self.totals[event.endpoint]
+        totals['requests'] += 1
+        totals['errors'] += event.error is not None
+        totals['cache_hits'] += event.from_cache
+        totals['retries'] += event.retries
+        totals['bytes'] += event.bytes or 0
+        totals['rate_limit_wait'] += event.rate_limit_wait
+
+    def percentiles(self, endpoint: str) -> Dict[str, float]:
+        latencies = list(self.latencies[endpoint])
+        if not latencies:
+            return {}
+        return {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+        }
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            endpoint: {**self.totals[endpoint], **self.percentiles(endpoint)}
+            for endpoint in self.latencies
+        }
+
+
+class JsonlSink:
+    """Subscriber that appends every event to a file as a line of JSON."""
+    path: str
+    _file: Optional[IO[str]]
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __call__(self, event: RequestEvent):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf8')
+        self._file.write(json.dumps(asdict(event)) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -8,6 +8,7 @@ from dataclasses import dataclass
 
 from typing import Awaitable, Callable, Dict, Generic, Optional, Tuple, TypeVar
 
+from matchmaker.query_engine.backends.scheduler import Priority, priority_scope
 from matchmaker.query_engine.types.data import AuthorData, PaperData, InstitutionData
 from matchmaker.query_engine.types.query import AuthorSearchQuery, PaperSearchQuery, InstitutionSearchQuery
 from matchmaker.query_engine.slightly_less_abstract import (
@@ -46,9 +47,11 @@ class BaseBackendQueryEngine(
     async def _post_process(self, query: Query, data: NativeData) -> Data:
         raise NotImplementedError('Calling method on abstract base class')
 
-    async def __call__(self, query: Query) -> Data:
-        nd = await self._run_native_query(await self._query_to_native(query))
-        return await self._post_process(query, nd)
+    async def __call__(self, query: Query, priority: Optional[Priority] = None) -> Data:
+        # Propagates to the requests of every engine this one fans out to
+        with priority_scope(priority):
+            nd = await self._run_native_query(await self._query_to_native(query))
+            return await self._post_process(query, nd)
 
 
 class BasePaperSearchQueryEngine(
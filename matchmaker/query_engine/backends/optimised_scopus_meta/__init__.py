@@ -15,10 +15,8 @@ from asyncio import get_running_loop, gather
 from matchmaker.query_engine.backends.exceptions import QueryNotSupportedError, SearchNotPossible
 from dataclasses import dataclass
 import pdb
-from pybliometrics.scopus.utils.constants import SEARCH_MAX_ENTRIES
 #from matchmaker.query_engine.backends.exceptions import QueryNotSupportedError
 from matchmaker.query_engine.backends.tools import TagNotFound, execute_callback_on_tag
-from pybliometrics.scopus.exception import ScopusQueryError
 from copy import deepcopy
 from matchmaker.query_engine.backends.metas import BaseNativeQuery, BasePaperSearchQueryEngine, BaseAuthorSearchQueryEngine
 
@@ -198,6 +196,7 @@ class AuthorSearchQueryEngine(BaseAuthorSearchQueryEngine[List[AuthorData]]):
         scopus_author_search: ScopusAuthorSearchQueryEngine,
         scopus_institution_search: ScopusInstitutionSearchQueryEngine
     ) -> None:
+        from pybliometrics.scopus.utils.constants import SEARCH_MAX_ENTRIES
         self.max_entries = SEARCH_MAX_ENTRIES
         self.scopus_paper_search = scopus_paper_search
         self.scopus_author_search = scopus_author_search
@@ -282,6 +281,8 @@ class AuthorSearchQueryEngine(BaseAuthorSearchQueryEngine[List[AuthorData]]):
         """
         if one of the standard fields is asked for, 
         """
+        from pybliometrics.scopus.exception import ScopusQueryError
+        from pybliometrics.scopus.utils.constants import SEARCH_MAX_ENTRIES
         if query.selector not in self.available_fields:
             overselected_fields = self.available_fields.get_values_overselected(query.selector)
             raise QueryNotSupportedError(overselected_fields)
@@ -558,3 +559,15 @@ class OptimisedScopusBackend(Backend):
     
     def institution_search_engine(self) -> ScopusInstitutionSearchQueryEngine:
         return self.scopus_backend.institution_search_engine()
+
+    async def close(self):
+        await self.scopus_backend.close()
+        await self.pubmed_backend.close()
+
+    def utilization(self) -> Dict[str, Dict[str, Any]]:
+        # Both budgets are process-wide, so this includes load from any other
+        # backend sharing the same api keys
+        return {
+            'scopus': self.scopus_backend.budget.utilization(),
+            'pubmed': self.pubmed_backend.budget.utilization()
+        }
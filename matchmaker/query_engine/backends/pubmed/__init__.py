@@ -1,38 +1,57 @@
-from asyncio import gather, get_running_loop
+from asyncio import get_running_loop
+from concurrent.futures import Executor
 from copy import copy, deepcopy
 from dataclasses import replace
+from datetime import datetime, timedelta
 from pprint import pprint
 from typing import Annotated, Awaitable, Callable, Dict, List, Tuple, Union, Optional, Any
 
-from aiohttp import ClientSession
 from matchmaker.query_engine.backend import Backend
 from matchmaker.query_engine.backends import (
     BaseAuthorSearchQueryEngine,
     BaseBackendQueryEngine,
+    BaseNativeQuery,
     BasePaperSearchQueryEngine,
     NewAsyncClient,
     RateLimiter,
+    SessionManager,
 )
+from matchmaker.query_engine.backends.budget import Budget, BudgetRegistry, budget_registry
+from matchmaker.query_engine.backends.cache import DEFAULT_CACHE_SIZE, ResponseCache
+from matchmaker.query_engine.backends.dag import TaskGraph
+from matchmaker.query_engine.backends.instrumentation import Instrumentation
+from matchmaker.query_engine.backends.retry import RetryPolicy
+from matchmaker.query_engine.backends.scheduler import Priority, RequestScheduler, priority_scope
 from matchmaker.query_engine.backends.exceptions import QueryNotSupportedError
+from matchmaker.query_engine.backends.pubmed.constants import CacheTTL, Estimate, Limit, RateLimit, Sync
 from matchmaker.query_engine.backends.pubmed.api import (
     MeshTopic,
     PubmedAuthor,
+    PubmedDateWindow,
     PubmedEFetchData,
     PubmedEFetchQuery,
     PubmedELinkQuery,
+    PubmedESearchData,
     PubmedESearchQuery,
     PubmedIndividual,
+    SharedPaperIndex,
     efetch_on_id_list,
     elink_on_id_list,
-    esearch_on_query,
+    esearch_all_on_query,
+    esearch_count_on_query,
 )
 from matchmaker.query_engine.backends.pubmed.processors import (
-    ProcessedAuthor,
-    ProcessedData,
-    ProcessedEFetchData,
-    ProcessedIndividual,
-    process_institution,
+    InstitutionParserPool,
+    author_rows,
+    build_author_table,
+    process_paper_institutions,
 )
+from matchmaker.query_engine.backends.pubmed.disambiguation import (
+    AuthorBlocks,
+    authors_match,
+    cluster_authors,
+)
+from matchmaker.query_engine.backends.pubmed.store import PaperStore
 from matchmaker.query_engine.backends.tools import replace_dict_tags
 from matchmaker.query_engine.types.data import AuthorData, PaperData
 from matchmaker.query_engine.types.query import AuthorSearchQuery, PaperSearchQuery
@@ -82,11 +101,72 @@ class PubmedNativeData(PubmedEFetchData):
     references: List[PubmedEFetchData] = []
     cited_by: List[PubmedEFetchData] = []
 
+def native_from_fetched(paper: PubmedEFetchData, **linked: List[PubmedEFetchData]) -> PubmedNativeData:
+    # The fetched paper is already validated, so its fields and author rows
+    # are shared rather than dumped and parsed again
+    values: Dict[str, Any] = {**dict(paper), **linked}
+    native = PubmedNativeData.construct(**values)
+    native._author_rows = paper._author_rows
+    return native
 
-class ProcessedAuthorData(BaseModel):
-    author: ProcessedAuthor
-    papers: List[PubmedNativeData]
-    paper_count: int
+
+def make_pubmed_rate_limiter(api_key: Optional[str] = None) -> RateLimiter:
+    if api_key is None:
+        requests_per_second = RateLimit.WITHOUT_API_KEY
+        max_requests_per_second = RateLimit.MAX_WITHOUT_API_KEY
+    else:
+        requests_per_second = RateLimit.WITH_API_KEY
+        max_requests_per_second = RateLimit.MAX_WITH_API_KEY
+    rate_limiter = RateLimiter(max_requests_per_second = requests_per_second)
+    rate_limiter.add_bucket(
+        RateLimit.EUTILS_HOST,
+        requests_per_second,
+        max_requests_per_second = max_requests_per_second
+    )
+    return rate_limiter
+
+def get_pubmed_budget(api_key: Optional[str] = None, registry: Optional[BudgetRegistry] = None) -> Budget:
+    if registry is None:
+        registry = budget_registry
+    return registry.get('pubmed', api_key, lambda: make_pubmed_rate_limiter(api_key))
+
+def make_pubmed_response_cache(path: str, max_size_bytes: int = DEFAULT_CACHE_SIZE) -> ResponseCache:
+    return ResponseCache(
+        path,
+        max_size_bytes = max_size_bytes,
+        ttl_by_endpoint = {
+            'esearch': CacheTTL.ESEARCH,
+            'elink': CacheTTL.ELINK,
+            'efetch': CacheTTL.EFETCH,
+            'esummary': CacheTTL.ESUMMARY
+        },
+        # History server handles expire within hours, so neither the searches
+        # that create them nor the requests that use them are cached
+        uncached_params = ('usehistory', 'WebEnv')
+    )
+
+
+def selects_processed_institutions(selector: PaperDataSelector) -> bool:
+    processed_selected = {'authors': {'institution_current': {'processed': True}}}
+    return selector.any_of_fields(PaperDataSelector.parse_obj({
+        **processed_selected,
+        'references': processed_selected,
+        'cited_by': processed_selected
+    }))
+
+def chunk_count(n: int, chunk_size: int) -> int:
+    return -(-n // chunk_size)
+
+def search_requests(count: int) -> Dict[str, int]:
+    # The pages esearch_all_on_query needs for `count` results. Pages past
+    # esearch's record limit are listed from the history server by efetch
+    requests = {'esearch': 1, 'efetch': 0}
+    for retstart in range(Limit.ESEARCH_PAGE_SIZE, count, Limit.ESEARCH_PAGE_SIZE):
+        if min(retstart + Limit.ESEARCH_PAGE_SIZE, count) <= Limit.ESEARCH_MAX_RECORDS:
+            requests['esearch'] += 1
+        else:
+            requests['efetch'] += 1
+    return requests
 
 
 def paper_from_native(data):
@@ -156,58 +236,27 @@ def author_query_to_esearch(query: AuthorSearchQuery):
     # convert id.doi to elocation
     return PubmedESearchQuery.parse_obj(query.dict()['query'])
 
-async def process_paper_institutions(i):
-    async def process_authors(authors):
-        new_authors = []
-        for author in authors:
-            inst = author.__root__.institution
-            if inst is not None:
-                proc_inst = process_institution(inst)
-            else:
-                proc_inst = None
-            if isinstance(author.__root__, PubmedIndividual):
-                new_author = ProcessedAuthor.parse_obj({
-                    **author.dict()['__root__'],
-                    'proc_institution': proc_inst
-                })
-            else:
-                new_author = ProcessedAuthor.parse_obj({
-                    **author.dict()['__root__'],
-                    'proc_institution': proc_inst
-                })
-            new_authors.append(new_author)
-        return new_authors
-    authors = i.author_list
-    new_authors = await process_authors(authors)
-    refs = i.references
-    cited_by = i.cited_by
-    new_refs = []
-    if refs is not None:
-        for j in refs:
-            refs_authors = j.author_list
-            new_refs_authors = await process_authors(refs_authors)
-            new_ref = ProcessedEFetchData.parse_obj({**j.dict(), 'author_list': new_refs_authors})
-            new_refs.append(new_ref)
-    new_citeds = []
-    if cited_by is not None:
-        for j in cited_by:
-            cited_authors = j.author_list
-            new_cited_authors = await process_authors(cited_authors)
-            new_cited = ProcessedEFetchData.parse_obj({**j.dict(), 'author_list': new_cited_authors})
-            new_citeds.append(new_cited)
-    i_dict = i.dict()
-    i_dict['author_list'] = new_authors
-    i_dict['references'] = new_refs
-    i_dict['cited_by'] = new_citeds
-    return ProcessedData.parse_obj(i_dict)
-
-
-
 class PaperSearchQueryEngine(
         BasePaperSearchQueryEngine[List[PubmedNativeData]]):
     api_key:str
-    def __init__(self, api_key: str, rate_limiter: RateLimiter = RateLimiter(), *args, **kwargs):
+    def __init__(
+        self,
+        api_key: str,
+        rate_limiter: Optional[RateLimiter] = None,
+        *args,
+        parse_executor: Optional[Executor] = None,
+        institution_pool: Optional[InstitutionParserPool] = None,
+        **kwargs
+    ):
         self.api_key = api_key
+        # Where efetch results are parsed, the event loop if None
+        self.parse_executor = parse_executor
+        # Where affiliations are parsed by libpostal, the event loop if None
+        self.institution_pool = institution_pool
+        if rate_limiter is None:
+            budget = get_pubmed_budget(api_key)
+            rate_limiter = budget.rate_limiter
+            kwargs.setdefault('scheduler', budget.scheduler)
         esearch_field_bools = {'paper_id':{'pubmed_id':True}}
         efetch_field_bools = {
             'paper_id': {
@@ -271,48 +320,127 @@ class PaperSearchQueryEngine(
             'references': efetch_field_bools,
             'cited_by': efetch_field_bools
         })
+        # Selectors within these fields are served by esummary records,
+        # which are far smaller and cheaper to parse than efetch ones
+        esummary_field_bools = {
+            'paper_id': {
+                'doi': True,
+                'pubmed_id': True
+            },
+            'title': True,
+            'authors': {
+                'preferred_name': {
+                    'surname': True,
+                    'initials': True
+                }
+            },
+            'year': True,
+            'source_title': True,
+            'source_title_abr': True
+        }
+        self.esummary_available_fields = PaperDataSelector.parse_obj({
+            **esummary_field_bools,
+            'references': esummary_field_bools,
+            'cited_by': esummary_field_bools
+        })
         super().__init__(rate_limiter, *args, **kwargs)
 
-    async def _query_to_awaitable(self, query: PaperSearchQuery, client: NewAsyncClient) -> Tuple[
+    async def _query_to_native(self, query: PaperSearchQuery) -> BaseNativeQuery[List[PubmedNativeData]]:
+        client = await self.session_manager.get_client()
+        awaitable, metadata, expected_bytes = await self._plan_query(query, client)
+        return self._make_native_query(client, awaitable, metadata, expected_bytes)
+
+    async def _query_to_awaitable(
+        self,
+        query: PaperSearchQuery,
+        client: NewAsyncClient,
+        date_window: Optional[PubmedDateWindow] = None
+    ) -> Tuple[
         Callable[
             [NewAsyncClient], 
             Awaitable[List[PubmedNativeData]]
         ], 
         Dict[str,int]
     ]:
-        metadata = {
-            'esearch': 1,
-            'efetch': 0,
-            'elink': 0
-        }
-        if query.selector in self.available_fields:
-            if query.selector.any_of_fields(self.efetch_fields):
-                metadata['esearch'] += 1
-            
-            if query.selector.any_of_fields(self.elink_refs_fields) or query.selector.any_of_fields(self.elink_refs_details_fields):
-                metadata['elink'] += 1
-                if query.selector.any_of_fields(self.elink_refs_details_fields):
-                    metadata['efetch'] += 1
-            
-            if query.selector.any_of_fields(self.elink_citeds_fields) or query.selector.any_of_fields(self.elink_citeds_details_fields):
-                metadata['elink'] += 1
-                if query.selector.any_of_fields(self.elink_citeds_details_fields):
-                    metadata['efetch'] += 1
-
-        else:
+        awaitable, metadata, _ = await self._plan_query(query, client, date_window)
+        return awaitable, metadata
+
+    async def _plan_query(
+        self,
+        query: PaperSearchQuery,
+        client: NewAsyncClient,
+        date_window: Optional[PubmedDateWindow] = None
+    ) -> Tuple[
+        Callable[
+            [NewAsyncClient], 
+            Awaitable[List[PubmedNativeData]]
+        ], 
+        Dict[str,int],
+        Dict[str,int]
+    ]:
+        if query.selector not in self.available_fields:
             overselected_fields = self.available_fields.get_values_overselected(query.selector)
             raise QueryNotSupportedError(overselected_fields)
         pubmed_search_query = paper_query_to_esearch(query)
 
-        async def make_coroutine(client: ClientSession) -> List[PubmedNativeData]:
+        # The number of requests depends on the number of results, so a
+        # count-only search is run first to project them, and the bytes they
+        # will return
+        count = await esearch_count_on_query(
+            pubmed_search_query, client, api_key=self.api_key, date_window=date_window
+        )
+        use_summary = query.selector in self.esummary_available_fields
+        if use_summary:
+            fetch_endpoint = 'esummary'
+            fetch_chunk_size = Limit.ESUMMARY_CHUNK_SIZE
+            bytes_per_record = Estimate.ESUMMARY_BYTES_PER_RECORD
+        else:
+            fetch_endpoint = 'efetch'
+            fetch_chunk_size = Limit.EFETCH_CHUNK_SIZE
+            bytes_per_record = Estimate.EFETCH_BYTES_PER_RECORD
+        metadata = {
+            'esearch': 0,
+            'efetch': 0,
+            'elink': 0,
+            'esummary': 0
+        }
+        expected_bytes = dict.fromkeys(metadata, 0)
+        for method, requests in search_requests(count).items():
+            metadata[method] += requests
+        expected_bytes['esearch'] += count * Estimate.ESEARCH_BYTES_PER_ID
+
+        def add_fetch(records: int):
+            metadata[fetch_endpoint] += chunk_count(records, fetch_chunk_size)
+            expected_bytes[fetch_endpoint] += records * bytes_per_record
+
+        def add_link(links_per_paper: int, details: bool):
+            metadata['elink'] += chunk_count(count, Limit.ELINK_CHUNK_SIZE)
+            expected_bytes['elink'] += count * links_per_paper * Estimate.ELINK_BYTES_PER_LINK
+            if details:
+                # An upper bound, as papers linked more than once are only
+                # fetched once
+                add_fetch(count * links_per_paper)
+
+        if query.selector.any_of_fields(self.efetch_fields):
+            add_fetch(count)
+        if query.selector.any_of_fields(self.elink_refs_fields) or query.selector.any_of_fields(self.elink_refs_details_fields):
+            add_link(
+                Estimate.REFERENCES_PER_PAPER,
+                query.selector.any_of_fields(self.elink_refs_details_fields)
+            )
+        if query.selector.any_of_fields(self.elink_citeds_fields) or query.selector.any_of_fields(self.elink_citeds_details_fields):
+            add_link(
+                Estimate.CITATIONS_PER_PAPER,
+                query.selector.any_of_fields(self.elink_citeds_details_fields)
+            )
+
+        async def make_coroutine(client: NewAsyncClient) -> List[PubmedNativeData]:
             async def id_mapper_to_unique_list(id_mapper: Dict[str, Optional[List[str]]]) -> List[str]:
-                unique_ids = []
+                unique_ids: Dict[str, None] = {}
                 for linked_ids in id_mapper.values():
                     if linked_ids is not None:
-                        for linked_id in linked_ids:
-                            if linked_id not in unique_ids:
-                                unique_ids.append(linked_id)
-                return unique_ids
+                        unique_ids.update(dict.fromkeys(linked_ids))
+                return list(unique_ids)
             async def get_papers_from_index(
                 id_mapper: Dict[str, Optional[List[str]]], 
                 sub_paper_index: Dict[str, PubmedEFetchData]
@@ -320,7 +448,9 @@ class PaperSearchQueryEngine(
                 id_mapper_papers = {}
                 for search_id, id_list in id_mapper.items():
                     if id_list is not None:
-                        id_mapper_papers[search_id] = [sub_paper_index[sub_id] for sub_id in id_list]
+                        id_mapper_papers[search_id] = [
+                            sub_paper_index[sub_id] for sub_id in id_list if sub_id in sub_paper_index
+                        ]
                     else:
                         id_mapper_papers[search_id] = []
                 return id_mapper_papers
@@ -335,104 +465,147 @@ class PaperSearchQueryEngine(
                 if citeds details: efetch(citeds)
             """
 
-            search_result = await esearch_on_query(pubmed_search_query, client, api_key=self.api_key)
-            if query.selector.any_of_fields(self.efetch_fields):
-                fetch_result_raw = await efetch_on_id_list(PubmedEFetchQuery(pubmed_id_list = search_result.pubmed_id_list), client, api_key=self.api_key)
-                fetch_result = {i.paper_id.pubmed: i for i in fetch_result_raw}
-            else:
-                fetch_result = None
-            if query.selector.any_of_fields(self.elink_refs_fields) or query.selector.any_of_fields(self.elink_refs_details_fields):
-                link_result_refs_raw = await elink_on_id_list(
-                    PubmedELinkQuery(
-                        pubmed_id_list = search_result.pubmed_id_list, 
-                        linkname = 'pubmed_pubmed_refs'
-                    ),
-                    client, 
-                    api_key=self.api_key
+            async def search() -> PubmedESearchData:
+                return await esearch_all_on_query(
+                    pubmed_search_query, client, api_key=self.api_key, date_window=date_window
                 )
-                link_result_refs = link_result_refs_raw.id_mapper
-                if query.selector.any_of_fields(self.elink_refs_details_fields):
-                    ref_unique_fetch_list = await id_mapper_to_unique_list(link_result_refs)
-                    fetch_result_refs_raw = await efetch_on_id_list(PubmedEFetchQuery(pubmed_id_list = ref_unique_fetch_list), client, api_key=self.api_key)
-                    sub_paper_index_refs = {i.paper_id.pubmed: i for i in fetch_result_refs_raw}
-                    fetch_result_refs = await get_papers_from_index(link_result_refs, sub_paper_index_refs)
-                else:
-                    fetch_result_refs = None
-            
-            else:
-                link_result_refs = None
-                fetch_result_refs = None
 
+            # Affiliations are parsed as each chunk of records arrives, so
+            # that parsing overlaps the rest of the fetch
+            on_chunk = (
+                (lambda papers: process_paper_institutions(papers, self.institution_pool))
+                if selects_processed_institutions(query.selector) else None
+            )
+            # One index for the whole query, shared by the primary fetch and
+            # the references and cited_by branches
+            paper_index = SharedPaperIndex(
+                client, api_key=self.api_key, summary=use_summary, executor=self.parse_executor,
+                on_chunk=on_chunk
+            )
 
-            if query.selector.any_of_fields(self.elink_citeds_fields) or query.selector.any_of_fields(self.elink_citeds_details_fields):
-                link_result_citeds_raw = await elink_on_id_list(
-                    PubmedELinkQuery(
-                        pubmed_id_list = search_result.pubmed_id_list, 
-                        linkname = 'pubmed_pubmed_citedin'
-                    ),
-                    client, 
-                    api_key=self.api_key
+            async def fetch(search_result: PubmedESearchData) -> Dict[str, PubmedEFetchData]:
+                return await paper_index.fetch(
+                    search_result.pubmed_id_list,
+                    web_env = search_result.web_env,
+                    query_key = search_result.query_key
                 )
-                link_result_citeds = link_result_citeds_raw.id_mapper
-                if query.selector.any_of_fields(self.elink_citeds_details_fields):
-                    cited_by_unique_fetch_list = await id_mapper_to_unique_list(link_result_citeds)
-                    fetch_result_citeds_raw = await efetch_on_id_list(PubmedEFetchQuery(pubmed_id_list = cited_by_unique_fetch_list), client, api_key=self.api_key)
-                    sub_paper_index_cited = {i.paper_id.pubmed: i for i in fetch_result_citeds_raw}
-                    fetch_result_citeds = await get_papers_from_index(link_result_citeds, sub_paper_index_cited)
-                else:
-                    fetch_result_citeds = None
-            else:
-                link_result_citeds = None
-                fetch_result_citeds = None
 
+            def make_link(linkname: str):
+                async def link(search_result: PubmedESearchData) -> Dict[str, Optional[List[str]]]:
+                    link_result_raw = await elink_on_id_list(
+                        PubmedELinkQuery(
+                            pubmed_id_list = search_result.pubmed_id_list, 
+                            linkname = linkname
+                        ),
+                        client, 
+                        api_key=self.api_key
+                    )
+                    return link_result_raw.id_mapper
+                return link
+
+            async def fetch_linked(id_mapper: Dict[str, Optional[List[str]]]) -> Dict[str, List[PubmedEFetchData]]:
+                unique_fetch_list = await id_mapper_to_unique_list(id_mapper)
+                await paper_index.fetch(unique_fetch_list)
+                return await get_papers_from_index(id_mapper, paper_index.papers)
+
+            # Once the search is done the main fetch and the references and
+            # cited_by branches are independent, so they run concurrently
+            graph = TaskGraph()
+            graph.add('esearch', search)
+            if query.selector.any_of_fields(self.efetch_fields):
+                graph.add('efetch', fetch, 'esearch')
+            if query.selector.any_of_fields(self.elink_refs_fields) or query.selector.any_of_fields(self.elink_refs_details_fields):
+                graph.add('elink_refs', make_link('pubmed_pubmed_refs'), 'esearch')
+                if query.selector.any_of_fields(self.elink_refs_details_fields):
+                    graph.add('efetch_refs', fetch_linked, 'elink_refs')
+            if query.selector.any_of_fields(self.elink_citeds_fields) or query.selector.any_of_fields(self.elink_citeds_details_fields):
+                graph.add('elink_citeds', make_link('pubmed_pubmed_citedin'), 'esearch')
+                if query.selector.any_of_fields(self.elink_citeds_details_fields):
+                    graph.add('efetch_citeds', fetch_linked, 'elink_citeds')
+            results = await graph.run()
+
+            search_result = results['esearch']
+            fetch_result = results.get('efetch')
+            link_result_refs = results.get('elink_refs')
+            fetch_result_refs = results.get('efetch_refs')
+            link_result_citeds = results.get('elink_citeds')
+            fetch_result_citeds = results.get('efetch_citeds')
+
+            def linked_papers(
+                pubmed_id: str,
+                link_result: Dict[str, Optional[List[str]]],
+                fetch_result_linked: Optional[Dict[str, List[PubmedEFetchData]]]
+            ) -> List[PubmedEFetchData]:
+                if fetch_result_linked is None:
+                    relevant_ids = link_result.get(pubmed_id)
+                    if relevant_ids is None:
+                        return []
+                    return [PubmedEFetchData.parse_obj({'paper_id': {'pubmed': i}}) for i in relevant_ids]
+                return list(fetch_result_linked.get(pubmed_id, []))
 
             native_papers = []
             for pubmed_id in search_result.pubmed_id_list:
-                native_data_dict: Dict[str, Any]
-                if fetch_result is None:
-                    native_data_dict = {'paper_id': {'pubmed': pubmed_id}}
-                else:
-                    native_data_dict = fetch_result[pubmed_id].dict()
-                
+                linked: Dict[str, List[PubmedEFetchData]] = {}
                 if link_result_citeds is not None:
-                    if fetch_result_citeds is None:
-                        references = []
-                        relevant_citeds = link_result_citeds[pubmed_id]
-                        if relevant_citeds is not None:
-                            for i in relevant_citeds:
-                                references.append({'paper_id': {'pubmed': i}})
-                            native_data_dict['references'] = references
-                    else:
-                        references = []
-                        relevant_citeds = fetch_result_citeds[pubmed_id]
-                        for i in relevant_citeds:
-                            native_data_dict['references'] = i.dict()
-                    native_data_dict['references'] = references
+                    linked['cited_by'] = linked_papers(
+                        pubmed_id, link_result_citeds, fetch_result_citeds
+                    )
 
                 if link_result_refs is not None:
-                    if fetch_result_refs is None:
-                        references = []
-                        relevant_refs = link_result_refs[pubmed_id]
-                        if relevant_refs is not None:
-                            for i in relevant_refs:
-                                references.append({'paper_id': {'pubmed': i}})
-                            native_data_dict['references'] = references
-                    else:
-                        references = []
-                        relevant_refs = fetch_result_refs[pubmed_id]
-                        for i in relevant_refs:
-                            native_data_dict['references'] = i.dict()
-                    native_data_dict['references'] = references
+                    linked['references'] = linked_papers(
+                        pubmed_id, link_result_refs, fetch_result_refs
+                    )
 
-                native_paper = PubmedNativeData.parse_obj(native_data_dict)
-                native_papers.append(native_paper)
+                if fetch_result is None:
+                    native_papers.append(PubmedNativeData.parse_obj({'paper_id': {'pubmed': pubmed_id}, **linked}))
+                    continue
+                fetched = fetch_result.get(pubmed_id)
+                if fetched is None:
+                    # Withdrawn or not yet available, eg. esummary returns an
+                    # error for the id
+                    continue
+                native_papers.append(native_from_fetched(fetched, **linked))
 
             return native_papers
 
-        return make_coroutine, metadata
+        return make_coroutine, metadata, expected_bytes
+
+    async def sync(
+        self,
+        query: PaperSearchQuery,
+        store: PaperStore,
+        full: bool = False,
+        priority: Optional[Priority] = None
+    ) -> List[PaperData]:
+        """
+        Answer the query from a local store, first fetching only the papers
+        added or modified since the query was last synced and merging them in.
+        Citations of papers that have not themselves changed are only
+        refreshed by a `full` sync.
+        """
+        sync_key = store.sync_key(query)
+        last_sync = None if full else await store.last_sync(sync_key)
+        started = datetime.now().timestamp()
+        date_window = None
+        if last_sync is not None:
+            since = datetime.fromtimestamp(last_sync) - timedelta(days = Sync.OVERLAP_DAYS)
+            date_window = PubmedDateWindow(mindate = since.strftime('%Y/%m/%d'), maxdate = '3000')
+        with priority_scope(priority):
+            client = await self.session_manager.get_client()
+            awaitable, metadata = await self._query_to_awaitable(query, client, date_window)
+            new_papers = await self._run_native_query(BaseNativeQuery(awaitable, metadata))
+        if full:
+            await store.forget(sync_key)
+        await store.merge(
+            sync_key,
+            {paper.paper_id.pubmed: paper.json() for paper in new_papers},
+            started
+        )
+        papers = [PubmedNativeData.parse_raw(paper) for paper in await store.papers(sync_key)]
+        return await self._post_process(query, papers)
 
     async def _post_process(self, query: PaperSearchQuery, data: List[PubmedNativeData]) -> List[PaperData]:
-        def process_sub_paper_data(data_dict, selector: SubPaperDataSelector):
+        def process_sub_paper_data(paper, data_dict, selector: SubPaperDataSelector):
             new_data_dict = {}
 
             if selector.any_of_fields(SubPaperDataSelector.parse_obj(
@@ -473,7 +646,7 @@ class PaperSearchQueryEngine(
                 })
             ):
                 new_authors = []
-                for author in data_dict['author_list']:
+                for author_index, author in enumerate(data_dict['author_list']):
                     author_root = author
                     new_author = {}
                     if selector.any_of_fields(SubPaperDataSelector.parse_obj({
@@ -544,10 +717,7 @@ class PaperSearchQueryEngine(
                                 }
                             }
                         }) in selector:
-                            if institution is None:
-                                new_institution['processed'] = None
-                            else:
-                                new_institution['processed'] = process_institution(institution)
+                            new_institution['processed'] = author_rows(paper)[author_index].proc_institution
                         new_author['institution_current'] = new_institution
                     new_authors += [new_author]
                 new_data_dict['authors'] = new_authors
@@ -600,6 +770,8 @@ class PaperSearchQueryEngine(
             return new_data_dict
         
         selector = query.selector
+        if selects_processed_institutions(selector):
+            await build_author_table(data, self.institution_pool)
         model = PaperData.generate_model_from_selector(selector)
         sub_paper_selector = SubPaperDataSelector.parse_obj(selector.dict())
         if isinstance(selector.references, bool):
@@ -620,7 +792,7 @@ class PaperSearchQueryEngine(
         
         def process_paper_data(data):
             data_dict = data.dict()
-            new_data_dict = process_sub_paper_data(data_dict, sub_paper_selector)
+            new_data_dict = process_sub_paper_data(data, data_dict, sub_paper_selector)
 
             if ref_sub_paper_selector is not None:
                 all_except_refs = deepcopy(PaperDataAllSelected)
@@ -631,8 +803,8 @@ class PaperSearchQueryEngine(
                 # something in references must be selected
                 if selector not in all_except_refs:
                     new_references = []
-                    for j in data_dict['references']:
-                        refs_paper_dict = process_sub_paper_data(j, ref_sub_paper_selector)
+                    for ref, j in zip(data.references, data_dict['references']):
+                        refs_paper_dict = process_sub_paper_data(ref, j, ref_sub_paper_selector)
                         new_references.append(refs_paper_dict)
                     new_data_dict['references'] = new_references
             if cited_sub_paper_selector is not None:
@@ -640,8 +812,8 @@ class PaperSearchQueryEngine(
                 all_except_refs.cited_by = False
                 if selector not in all_except_refs:
                     new_cited_bys = []
-                    for j in data_dict['cited_by']:
-                        cited_by_paper_dict = process_sub_paper_data(data_dict, cited_sub_paper_selector)
+                    for cited_by, j in zip(data.cited_by, data_dict['cited_by']):
+                        cited_by_paper_dict = process_sub_paper_data(cited_by, j, cited_sub_paper_selector)
                         new_cited_bys.append(cited_by_paper_dict)
                     new_data_dict['cited_by'] = new_cited_bys
             return model.parse_obj(new_data_dict)
@@ -659,8 +831,22 @@ class PaperSearchQueryEngine(
 class AuthorSearchQueryEngine(
         BaseAuthorSearchQueryEngine[List[PubmedNativeData]]):
         
-    def __init__(self, api_key, rate_limiter: RateLimiter = RateLimiter(), *args, **kwargs):
+    def __init__(
+        self,
+        api_key,
+        rate_limiter: Optional[RateLimiter] = None,
+        *args,
+        parse_executor: Optional[Executor] = None,
+        institution_pool: Optional[InstitutionParserPool] = None,
+        **kwargs
+    ):
         self.api_key = api_key
+        self.parse_executor = parse_executor
+        self.institution_pool = institution_pool
+        if rate_limiter is None:
+            budget = get_pubmed_budget(api_key)
+            rate_limiter = budget.rate_limiter
+            kwargs.setdefault('scheduler', budget.scheduler)
         self.available_fields = AuthorDataSelector.parse_obj({
             'preferred_name': {
                 'surname': True,
@@ -678,18 +864,25 @@ class AuthorSearchQueryEngine(
         ], 
         Dict[str,int]
     ]:
-        async def make_coroutine(client: ClientSession) -> List[PubmedNativeData]:
-            pubmed_paper_query = author_query_to_esearch(query)
-            output = await esearch_on_query(pubmed_paper_query, client, api_key=self.api_key)
-            id_list = output.pubmed_id_list
-            output = await efetch_on_id_list(PubmedEFetchQuery(pubmed_id_list = id_list), client, api_key = self.api_key)
-
-            native = [PubmedNativeData.parse_obj(i.dict()) for i in output]
-            return native
-        metadata = {
-            'efetch': 1,
-            'esearch': 1
-        }
+        pubmed_paper_query = author_query_to_esearch(query)
+        async def make_coroutine(client: NewAsyncClient) -> List[PubmedNativeData]:
+            search_result = await esearch_all_on_query(pubmed_paper_query, client, api_key=self.api_key)
+            output = await efetch_on_id_list(
+                PubmedEFetchQuery(
+                    pubmed_id_list = search_result.pubmed_id_list,
+                    web_env = search_result.web_env,
+                    query_key = search_result.query_key
+                ),
+                client,
+                api_key = self.api_key,
+                executor = self.parse_executor,
+                on_chunk = lambda papers: process_paper_institutions(papers, self.institution_pool)
+            )
+
+            return [native_from_fetched(i) for i in output]
+        count = await esearch_count_on_query(pubmed_paper_query, client, api_key=self.api_key)
+        metadata = search_requests(count)
+        metadata['efetch'] += chunk_count(count, Limit.EFETCH_CHUNK_SIZE)
         return make_coroutine, metadata
 
 
@@ -729,151 +922,64 @@ class AuthorSearchQueryEngine(
 
             return query_to_term
 
-        def institution_matches(inst1, inst2):
-            match_count = 0
-            if inst1 is None or inst2 is None:
-                if inst2 == inst1:
-                    return True
-                else:
-                    return False
-            for part in inst1:
-
-                if part[1] == 'postcode':
-                    #Extract postcodes from other half
-                    postcodes2 = [i[0] for i in inst2 if i[1] == 'postcode']
-                    #If other half has a postcode, it must match
-                    if len(postcodes2)>0:
-                        if part[0] in postcodes2:
-                            return True
-                        else:
-                            return False
-                if part[1] == 'house':
-                    #Extract houses from other half
-                    houses2 = [i[0] for i in inst2 if i[1] == 'house']
-                    #If other half has a house, it must match
-                    if len(houses2)>0:
-                        for house2 in houses2:
-                            if part[0] in house2 or house2 in part[0]:
-                                return True
-                            else:
-                                return False
-                if part in inst2:
-                    match_count += 1
-            if match_count >= 4:
-                return True
-            else:
-                return False
-
-        def authors_match(author1, author2):
-            proc_institution1 = author1.dict()['__root__']['proc_institution']
-            proc_institution2 = author2.dict()['__root__']['proc_institution']
-            if author1 == author2:
-                return True
-            elif institution_matches(proc_institution1, proc_institution2):
-                return True
-            else:
-                return False
-        def group_by_location(filtered_authors):
-            final_list = []
-            for i in filtered_authors:
-                match_authors = []
-                for j in filtered_authors:
-
-                    if authors_match(i,j) and j not in match_authors:
-                        match_authors.append(j)
-                if match_authors not in final_list:
-                    final_list.append(match_authors)
-            
-            return final_list
-        
-        def pick_largest_from_group(location_groups):
-            finals = []
-            for location_group in location_groups:
-                lens = [len(str(i)) for i in location_group]
-                group_index = lens.index(max(lens))
-                location = location_group[group_index]
-                if location not in finals:
-                    finals.append(location)
-            return finals
-        
-        coroutines = []
-        for i in data:
-            coroutines.append(process_paper_institutions(i))
-        
-        results = await gather(*coroutines)
-
-        combined_authors = []
-        for result in results:
-            combined_authors += result.author_list
+        await build_author_table(data, self.institution_pool)
 
         query_dict = query.dict()['query']
 
         filtered_authors = []
-        for i in combined_authors:
-            author = i.__root__
-            institution = author.institution
-            if isinstance(author, ProcessedIndividual):
-                last_name = author.last_name
-                fore_name = author.fore_name
-                last_is_present = query_to_func(institution, last_name, None)(query_dict)
-                fore_is_present = query_to_func(institution, fore_name, None)(query_dict)
-                is_present = fore_is_present and last_is_present
-            else:
-                collective_name = author.collective_name
-                is_present = query_to_func(institution, collective_name, None)(query_dict)
-            if is_present and i not in filtered_authors:
-                filtered_authors.append(i)
-
-        location_groups = group_by_location(filtered_authors)
-        finals = pick_largest_from_group(location_groups)
-
-        processed_author_data = []
-        for author1 in finals:
-            associated_with_author = []
-            for paper in results:
-                author_list = paper.author_list
-                paper_dict = paper.dict()
-                for author2 in author_list:
-                    if authors_match(author1, author2) and paper_dict not in associated_with_author:
-                        associated_with_author.append(paper_dict)
-            paper_count = len(associated_with_author)
-            processed_author_data.append(
-                ProcessedAuthorData.parse_obj(
-                    {
-                        'author': author1.dict()['__root__'],
-                        'papers': associated_with_author,
-                        'paper_count': paper_count
-                    }
-                )
-            )
-
+        filtered_keys = set()
+        for paper in data:
+            for i in author_rows(paper):
+                author = i.name
+                institution = i.institution
+                if isinstance(author, PubmedIndividual):
+                    last_name = author.last_name
+                    fore_name = author.fore_name
+                    last_is_present = query_to_func(institution, last_name, None)(query_dict)
+                    fore_is_present = query_to_func(institution, fore_name, None)(query_dict)
+                    is_present = fore_is_present and last_is_present
+                else:
+                    collective_name = author.collective_name
+                    is_present = query_to_func(institution, collective_name, None)(query_dict)
+                if is_present and i.key not in filtered_keys:
+                    filtered_keys.add(i.key)
+                    filtered_authors.append(i)
+
+        finals = []
+        for cluster in cluster_authors(filtered_authors):
+            lens = [len(str(i.author())) for i in cluster]
+            finals.append(cluster[lens.index(max(lens))])
+
+        paper_authors = [(paper, author) for paper in data for author in author_rows(paper)]
+        blocks = AuthorBlocks(author for _, author in paper_authors)
         new_data = []
-        for i in processed_author_data:
-            data_dict = i.dict()
-            author_info = data_dict['author']
-            paper_count = data_dict['paper_count']
+        for author1 in finals:
+            # Every paper with an author matching this one
+            papers = {}
+            for candidate in blocks.candidates(author1):
+                paper, author2 = paper_authors[candidate]
+                if authors_match(author1, author2):
+                    papers[id(paper)] = paper
             paper_ids = []
-            for i in data_dict['papers']:
-                paper_id = i['paper_id']
-                doi = paper_id['doi']
-                pubmed_id = paper_id['pubmed']
+            for paper in papers.values():
                 paper_ids.append(
                     {
-                        'doi': doi,
-                        'pubmed_id': pubmed_id
+                        'doi': paper.paper_id.doi,
+                        'pubmed_id': paper.paper_id.pubmed
                     }
                 )
+            author_info = author1.name
             new_data.append(AuthorData.parse_obj({
                 'preferred_name': {
-                    'surname': author_info['last_name'],
-                    'given_names': author_info['fore_name'],
-                    'initials': author_info['initials']
+                    'surname': author_info.last_name,
+                    'given_names': author_info.fore_name,
+                    'initials': author_info.initials
                 },
                 'institution_current': {
-                    'name': author_info['institution'],
-                    'processed': author_info['proc_institution']
+                    'name': author1.institution,
+                    'processed': author1.proc_institution
                 },
-                'paper_count': paper_count,
+                'paper_count': len(paper_ids),
                 'paper_ids': paper_ids
             }))
         return new_data
@@ -881,14 +987,49 @@ class AuthorSearchQueryEngine(
 
 
 class PubmedBackend(Backend):
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        limit_per_host: int = 10,
+        ttl_dns_cache: Optional[int] = 300,
+        retry_policy: Optional[RetryPolicy] = None,
+        response_cache: Optional[ResponseCache] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        budget_registry: Optional[BudgetRegistry] = None,
+        parse_executor: Optional[Executor] = None,
+        institution_pool: Optional[InstitutionParserPool] = None
+    ):
         self.api_key = api_key
-        self.rate_limiter = RateLimiter(max_requests_per_second = 9)
+        # eg. a ProcessPoolExecutor, to parse large efetch results on other
+        # cores. It is not shut down by the backend
+        self.parse_executor = parse_executor
+        # Not closed by the backend either
+        self.institution_pool = institution_pool
+        # NCBI limits apply per api key, so every backend using the key shares them
+        self.budget = get_pubmed_budget(api_key, budget_registry)
+        self.rate_limiter = self.budget.rate_limiter
+        if scheduler is None:
+            scheduler = self.budget.scheduler
+        self.session_manager = SessionManager(
+            rate_limiter = self.rate_limiter,
+            limit_per_host = limit_per_host,
+            ttl_dns_cache = ttl_dns_cache,
+            retry_policy = retry_policy,
+            response_cache = response_cache,
+            instrumentation = instrumentation,
+            scheduler = scheduler
+        )
+        self.instrumentation = self.session_manager.instrumentation
+        self.scheduler = self.session_manager.scheduler
     
     def paper_search_engine(self) -> PaperSearchQueryEngine:
         return PaperSearchQueryEngine(
             api_key = self.api_key, 
-            rate_limiter=self.rate_limiter
+            rate_limiter=self.rate_limiter,
+            session_manager = self.session_manager,
+            parse_executor = self.parse_executor,
+            institution_pool = self.institution_pool
         )
 
     def author_search_engine(self) -> AuthorSearchQueryEngine:
@@ -896,3 +1037,6 @@ class PubmedBackend(Backend):
 
     def institution_search_engine(self) -> None:
         raise NotImplementedError
+
+    async def close(self):
+        await self.session_manager.close()
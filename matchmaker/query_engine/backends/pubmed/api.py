@@ -1,10 +1,14 @@
+import asyncio
+from concurrent.futures import Executor
 import json
-from typing import List, Optional, Union
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, List, Optional, Union, cast
 from typing import Annotated, Dict, Literal, Tuple
 from urllib.parse import quote_plus
 import xml.etree.ElementTree as xml_parse
 
-from aiohttp import ClientSession
+from matchmaker.query_engine.backends import NewAsyncClient, iter_body
+from matchmaker.query_engine.backends.pubmed.constants import Endpoint, Limit
 from matchmaker.query_engine.types.query import (
     Abstract,
     And,
@@ -17,7 +21,8 @@ from matchmaker.query_engine.types.query import (
     Title,
     Year,
 )
-from pydantic import BaseModel, Field
+from aiohttp import ClientPayloadError
+from pydantic import BaseModel, Field, PrivateAttr
 import xmltodict
 
 def inspect_xml_dict(i):
@@ -82,12 +87,27 @@ class PubmedESearchData(BaseModel):
     count: int
     ret_max: int
     ret_start: int
+    web_env: Optional[str] = None
+    query_key: Optional[str] = None
+
+class PubmedDateWindow(BaseModel):
+    # Dates as YYYY/MM/DD, YYYY/MM or YYYY. The default, the modification
+    # date, covers papers that were updated as well as newly added ones
+    mindate: str
+    maxdate: str
+    datetype: str = 'mdat'
 
 # ESearch
 async def esearch_on_query(
     query: PubmedESearchQuery,
-    client: ClientSession,
-    api_key: str = None
+    client: NewAsyncClient,
+    api_key: Optional[str] = None,
+    retmax: int = Limit.ESEARCH_PAGE_SIZE,
+    retstart: int = 0,
+    use_history: bool = False,
+    web_env: Optional[str] = None,
+    date_window: Optional[PubmedDateWindow] = None,
+    count_only: bool = False
 ) -> PubmedESearchData:
     def query_to_term(query):
         def make_year_term(start_year:int = 1000, end_year:int = 3000):
@@ -172,48 +192,205 @@ async def esearch_on_query(
         term, 
         db='pubmed', 
         retmax:int = 10000, 
-        prefix= 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/',
+        prefix= Endpoint.PREFIX,
         api_key = None
     ):
-        if api_key is None:
-            return f'{prefix}esearch.fcgi?db={db}&retmax={retmax}&term={quote_plus(str(term))}'
-        else:
-            return f'{prefix}esearch.fcgi?db={db}&retmax={retmax}&term={quote_plus(str(term))}&api_key={api_key}'
+        url = f'{prefix}esearch.fcgi?db={db}&retmax={retmax}&term={quote_plus(str(term))}'
+        if retstart:
+            url += f'&retstart={retstart}'
+        if count_only:
+            url += '&rettype=count'
+        if use_history:
+            url += '&usehistory=y'
+        if web_env is not None:
+            url += f'&WebEnv={web_env}'
+        if date_window is not None:
+            url += (
+                f'&datetype={date_window.datetype}'
+                f'&mindate={date_window.mindate}&maxdate={date_window.maxdate}'
+            )
+        if api_key is not None:
+            url += f'&api_key={api_key}'
+        return url
 
     term = query_to_term(query.dict()['__root__'])
-    search_url = make_search_given_term(term, api_key=api_key)
-
-    output = await client.get(search_url)
-    print('search')
-    raw_out = await output.text()
-    proc_out = xml_parse.fromstring(raw_out)
-    id_list = []
-    count = None
-    ret_max = None
-    ret_start = None
-    for result in proc_out:
-        if result.tag == 'IdList':
-            id_list = id_list + [i.text for i in result.iterfind('Id')]
-        elif result.tag == 'Count':
-            count = result.text
-        elif result.tag == 'RetMax':
-            ret_max = result.text
-        elif result.tag == 'RetStart':
-            ret_start = result.text
-    if count is None:
-        raise ValueError('Count not found')
-    if ret_max is None:
-        raise ValueError('ret_max not found')
-    if ret_start is None:
-        raise ValueError('ret_start not found')
-    # Get metadata
+    search_url = make_search_given_term(term, retmax=retmax, api_key=api_key)
+
+    async def run_search() -> PubmedESearchData:
+        output = await client.get(search_url)
+        raw_out = await output.text()
+        proc_out = xml_parse.fromstring(raw_out)
+        id_list = []
+        count = None
+        ret_max = None
+        ret_start = None
+        result_web_env = None
+        query_key = None
+        for result in proc_out:
+            if result.tag == 'IdList':
+                id_list = id_list + [i.text for i in result.iterfind('Id')]
+            elif result.tag == 'Count':
+                count = result.text
+            elif result.tag == 'RetMax':
+                ret_max = result.text
+            elif result.tag == 'RetStart':
+                ret_start = result.text
+            elif result.tag == 'WebEnv':
+                result_web_env = result.text
+            elif result.tag == 'QueryKey':
+                query_key = result.text
+        if count is None:
+            raise ValueError('Count not found')
+        if count_only:
+            # Only the count is returned
+            ret_max = ret_max or '0'
+            ret_start = ret_start or '0'
+        if ret_max is None:
+            raise ValueError('ret_max not found')
+        if ret_start is None:
+            raise ValueError('ret_start not found')
+        # Get metadata
+
+
+        return PubmedESearchData(
+            pubmed_id_list = id_list,
+            count = count,
+            ret_max = ret_max,
+            ret_start = ret_start,
+            web_env = result_web_env,
+            query_key = query_key
+        )
+    return await client.coalesce(('esearch', search_url), run_search)
+
+async def esearch_count_on_query(
+    query: PubmedESearchQuery,
+    client: NewAsyncClient,
+    api_key: Optional[str] = None,
+    date_window: Optional[PubmedDateWindow] = None
+) -> int:
+    search = await esearch_on_query(
+        query, client, api_key=api_key, date_window=date_window, count_only=True
+    )
+    return search.count
+
+async def efetch_uilist_from_history(
+    search: PubmedESearchData,
+    client: NewAsyncClient,
+    retstart: int,
+    retmax: int = Limit.ESEARCH_PAGE_SIZE,
+    api_key: Optional[str] = None
+) -> PubmedESearchData:
+    # ESearch will not page past the first 10,000 PubMed records, but the
+    # history server will list the ids of the whole result set
+    url = (
+        f'{Endpoint.PREFIX}efetch.fcgi?db=pubmed&rettype=uilist&retmode=text'
+        f'&WebEnv={search.web_env}&query_key={search.query_key}'
+        f'&retstart={retstart}&retmax={retmax}'
+    )
+    if api_key is not None:
+        url += f'&api_key={api_key}'
+    async def run_fetch() -> PubmedESearchData:
+        output = await client.get(url)
+        id_list = (await output.text()).split()
+        return PubmedESearchData(
+            pubmed_id_list = id_list,
+            count = search.count,
+            ret_max = len(id_list),
+            ret_start = retstart,
+            web_env = search.web_env,
+            query_key = search.query_key
+        )
+    return await client.coalesce(('efetch', url), run_fetch)
+
+async def esearch_pages_on_query(
+    query: PubmedESearchQuery,
+    client: NewAsyncClient,
+    api_key: Optional[str] = None,
+    page_size: int = Limit.ESEARCH_PAGE_SIZE,
+    max_results: Optional[int] = None,
+    date_window: Optional[PubmedDateWindow] = None
+) -> AsyncIterator[PubmedESearchData]:
+    """
+    Pages through every result of `query`, yielding each page as it arrives.
+    The first page gives the total count; the remaining pages are then
+    requested concurrently.
+
+    The search is registered on the history server only where it is read
+    back: by efetch and esummary when there is no response cache, and to list
+    the pages past esearch's record limit. Other pages leave it out, as
+    history server requests are not cached.
+    """
+    use_history = client.response_cache is None
+    first_page = await esearch_on_query(
+        query, client, api_key=api_key, retmax=page_size, use_history=use_history,
+        date_window=date_window
+    )
+    yield first_page
+    total = first_page.count if max_results is None else min(first_page.count, max_results)
 
+    async def register_history() -> PubmedESearchData:
+        if use_history:
+            return first_page
+        return await esearch_on_query(
+            query, client, api_key=api_key, retmax=0, use_history=True,
+            date_window=date_window
+        )
+
+    async def get_page(retstart: int) -> PubmedESearchData:
+        retmax = min(page_size, total - retstart)
+        if retstart + retmax <= Limit.ESEARCH_MAX_RECORDS:
+            return await esearch_on_query(
+                query, client, api_key=api_key, retmax=retmax, retstart=retstart,
+                date_window=date_window
+            )
+        assert history is not None
+        return await efetch_uilist_from_history(
+            await history, client, retstart, retmax, api_key=api_key
+        )
+
+    # Shared by every page listed from the history server
+    history = (
+        asyncio.ensure_future(register_history())
+        if total > Limit.ESEARCH_MAX_RECORDS else None
+    )
+    pages = [
+        asyncio.ensure_future(get_page(retstart))
+        for retstart in range(page_size, total, page_size)
+    ]
+    try:
+        for page in asyncio.as_completed(pages):
+            yield await page
+    finally:
+        if history is not None:
+            history.cancel()
+        for page_task in pages:
+            page_task.cancel()
 
+async def esearch_all_on_query(
+    query: PubmedESearchQuery,
+    client: NewAsyncClient,
+    api_key: Optional[str] = None,
+    page_size: int = Limit.ESEARCH_PAGE_SIZE,
+    max_results: Optional[int] = None,
+    date_window: Optional[PubmedDateWindow] = None
+) -> PubmedESearchData:
+    pages = [
+        page async for page in esearch_pages_on_query(
+            query, client, api_key=api_key, page_size=page_size, max_results=max_results,
+            date_window=date_window
+        )
+    ]
+    pages.sort(key = lambda page: page.ret_start)
+    id_list = [pubmed_id for page in pages for pubmed_id in page.pubmed_id_list]
+    if max_results is not None:
+        id_list = id_list[:max_results]
     return PubmedESearchData(
         pubmed_id_list = id_list,
-        count = count,
-        ret_max = ret_max,
-        ret_start = ret_start
+        count = pages[0].count,
+        ret_max = len(id_list),
+        ret_start = 0,
+        web_env = pages[0].web_env,
+        query_key = pages[0].query_key
     )
 
 class PubmedELinkQuery(BaseModel):
@@ -226,42 +403,97 @@ class PubmedELinkData(BaseModel):
 # Elink
 async def elink_on_id_list(
     query: PubmedELinkQuery, 
-    client: ClientSession,
-    api_key = None
+    client: NewAsyncClient,
+    api_key = None,
+    chunk_size: int = Limit.ELINK_CHUNK_SIZE,
+    max_concurrent_chunks: int = Limit.ELINK_MAX_CONCURRENT_CHUNKS
 ) -> PubmedELinkData:
     def make_elink_url(
             id_list,
             linkname,
-            prefix= 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/',
+            prefix= Endpoint.PREFIX,
             api_key = None,
         ):
             if api_key is None:
                 return f'{prefix}elink.fcgi?dbfrom=pubmed&linkname={linkname}&id='+'&id='.join(id_list)
             else:
                 return f'{prefix}elink.fcgi?dbfrom=pubmed&linkname={linkname}&api_key={api_key}&id='+'&id='.join(id_list)
-    id_list = query.pubmed_id_list
     linkname = query.linkname
-    url = make_elink_url(id_list, linkname, api_key = api_key)
-    output = await client.get(url)
-    print('link')
-    raw_references = await output.text()
-    proc_ref = xmltodict.parse(raw_references)
-    link_set = proc_ref['eLinkResult']['LinkSet']
-
-    id_mapper = {}
-    for link in link_set:
-        id_value = link['IdList']['Id']
-        if 'LinkSetDb' in link:
-            link_set_db = link['LinkSetDb']['Link']
-            link_proc = []
-            if isinstance(link_set_db, list):
-                link_proc = [i['Id'] for i in link_set_db]
+    async def run_link(url: str) -> PubmedELinkData:
+        output = await client.get(url)
+        parser = ELinkStreamParser()
+        async for chunk in iter_body(output):
+            parser.feed(chunk)
+        # Built directly rather than validated, the parser only produces
+        # strings and lists of strings
+        return PubmedELinkData.construct(id_mapper = parser.close())
+
+    async def link_chunk(id_list: List[str]) -> PubmedELinkData:
+        url = make_elink_url(id_list, linkname, api_key = api_key)
+        async with semaphore:
+            return await client.coalesce(('elink', url), lambda: run_link(url))
+
+    # Linking from a history server set would merge every id into a single
+    # LinkSet, so ids are sent in chunks to keep the mapping per id
+    id_list = query.pubmed_id_list
+    chunks = [id_list[i:i + chunk_size] for i in range(0, len(id_list), chunk_size)]
+    semaphore = asyncio.Semaphore(max_concurrent_chunks)
+    chunk_results = await asyncio.gather(*[link_chunk(chunk) for chunk in chunks])
+    return PubmedELinkData.construct(id_mapper = {
+        k: v for chunk_result in chunk_results for k, v in chunk_result.id_mapper.items()
+    })
+
+def element_events(parser: xml_parse.XMLPullParser) -> Iterator[Tuple[str, xml_parse.Element]]:
+    # The stream parsers only ask for start and end events, which always
+    # carry an element
+    return cast(Iterator[Tuple[str, xml_parse.Element]], parser.read_events())
+
+class ELinkStreamParser:
+    """
+    Incrementally parses an eLinkResult fed to it chunk by chunk straight into
+    an id mapper, from each LinkSet's id to the ids it links to (or None when
+    it has no links). Each LinkSet is discarded once read.
+    """
+    id_mapper: Dict[str, Optional[List[str]]]
+    _parser: xml_parse.XMLPullParser
+
+    def __init__(self):
+        self.id_mapper = {}
+        # Only end events, as there are several elements per link and a
+        # start event for each would double the work
+        self._parser = xml_parse.XMLPullParser(events=('end',))
+
+    def _read_events(self):
+        for _, elem in element_events(self._parser):
+            if elem.tag != 'LinkSet':
+                continue
+            id_value = elem.findtext('IdList/Id')
+            link_set_db = elem.find('LinkSetDb')
+            if id_value is None:
+                # Nothing to map the links from
+                pass
+            elif link_set_db is None:
+                self.id_mapper[id_value] = None
             else:
-                link_proc = [link_set_db['Id']]
-            id_mapper[id_value] = link_proc
-        else:
-            id_mapper[id_value] = None
-    return PubmedELinkData(id_mapper = id_mapper)
+                link_ids = (link.findtext('Id') for link in link_set_db.iterfind('Link'))
+                self.id_mapper[id_value] = [i for i in link_ids if i is not None]
+            elem.clear()
+
+    def feed(self, data: Union[str, bytes]):
+        self._parser.feed(data)
+        self._read_events()
+
+    def close(self) -> Dict[str, Optional[List[str]]]:
+        self._parser.close()
+        self._read_events()
+        return self.id_mapper
+
+def parse_elink_result(raw_link_out: Union[str, bytes]) -> Dict[str, Optional[List[str]]]:
+    # Fed in chunks so that LinkSets are dropped as the parse goes
+    parser = ELinkStreamParser()
+    for start in range(0, len(raw_link_out), 64 * 1024):
+        parser.feed(raw_link_out[start:start + 64 * 1024])
+    return parser.close()
 
 
 
@@ -269,6 +501,10 @@ async def elink_on_id_list(
 
 class PubmedEFetchQuery(BaseModel):
     pubmed_id_list: List[str]
+    # The history server set the ids came from, if any, so that they can be
+    # fetched by reference rather than sent back to the server
+    web_env: Optional[str] = None
+    query_key: Optional[str] = None
 
 
 #### E Fetch paper def ####
@@ -314,6 +550,8 @@ class PubmedEFetchData(BaseModel):
     keywords: Optional[List[str]]
     topics: List[PubmedTopic]
     abstract: Optional[Union[str, List[AbstractItem]]]
+    # The paper's author table, see processors.build_author_table
+    _author_rows: Optional[list] = PrivateAttr(default = None)
 
 
 
@@ -323,29 +561,315 @@ class PubmedEFetchData(BaseModel):
 # EFetch
 async def efetch_on_id_list(
     query: PubmedEFetchQuery,
-    client: ClientSession,
-    api_key: str = None
+    client: NewAsyncClient,
+    api_key: Optional[str] = None,
+    chunk_size: int = Limit.EFETCH_CHUNK_SIZE,
+    max_concurrent_chunks: int = Limit.EFETCH_MAX_CONCURRENT_CHUNKS,
+    executor: Optional[Executor] = None,
+    on_chunk: Optional[Callable[[List[PubmedEFetchData]], Awaitable[object]]] = None
 ) -> List[PubmedEFetchData]:
-    def make_fetch_given_ids(
-        id_list,
-        prefix= 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/',
-        api_key: str = None
+    """
+    Fetches the full records of the papers in the query in chunks. Each
+    chunk is parsed as it streams in, or, given an `executor` (eg. a
+    ProcessPoolExecutor), read whole and parsed there, so that parsing large
+    results keeps off the event loop and can use several cores. `on_chunk`
+    is awaited with the papers of each chunk as it arrives, while the other
+    chunks are still being fetched.
+    """
+    def make_fetch_url(prefix= Endpoint.PREFIX, api_key: Optional[str] = None):
+        url = f'{prefix}efetch.fcgi?db=pubmed&retmode=xml'
+        if api_key is not None:
+            url += f'&api_key={api_key}'
+        return url
+    def make_fetch_given_history(
+        retstart: int,
+        retmax: int,
+        prefix= Endpoint.PREFIX,
+        api_key: Optional[str] = None
     ):
-        if api_key is None:
-            return f'{prefix}efetch.fcgi?db=pubmed&retmode=xml&id={",".join(id_list)}'
-        else:
-            return f'{prefix}efetch.fcgi?db=pubmed&retmode=xml&api_key={api_key}&id={",".join(id_list)}'
+        url = (
+            f'{prefix}efetch.fcgi?db=pubmed&retmode=xml'
+            f'&WebEnv={query.web_env}&query_key={query.query_key}'
+            f'&retstart={retstart}&retmax={retmax}'
+        )
+        if api_key is not None:
+            url += f'&api_key={api_key}'
+        return url
+
+    async def request_papers(id_list: List[str], retstart: int):
+        if use_history:
+            return await client.get(
+                make_fetch_given_history(retstart, len(id_list), api_key=api_key),
+                preload = False
+            )
+        if len(id_list)>200:
+            # Given a chunk_size above 200, the ids would not fit in a GET url
+            return await client.post(
+                make_fetch_url(api_key=api_key),
+                data = {'id': ','.join(id_list)},
+                idempotent = True,
+                preload = False
+            )
+        return await client.get(
+            make_fetch_url(api_key=api_key) + f'&id={",".join(id_list)}',
+            preload = False
+        )
+
+    async def read_papers(output) -> List[PubmedEFetchData]:
+        if executor is not None:
+            try:
+                body = b''.join([chunk async for chunk in iter_body(output)])
+            finally:
+                output.release()
+            records = await asyncio.get_running_loop().run_in_executor(
+                executor, parse_efetch_records, body
+            )
+            return [efetch_from_record(record) for record in records]
+        parser = EFetchStreamParser()
+        papers = []
+        try:
+            async for chunk in iter_body(output):
+                papers.extend(parser.feed(chunk))
+        finally:
+            output.release()
+        papers.extend(parser.close())
+        return papers
+
+    async def fetch_papers(id_list: List[str], retstart: int) -> List[PubmedEFetchData]:
+        attempt = 0
+        while True:
+            output = await request_papers(id_list, retstart)
+            try:
+                return await read_papers(output)
+            except (xml_parse.ParseError, ClientPayloadError):
+                # The client retries failed requests, but not a streamed body
+                # cut off part way through, which is retried here under the
+                # same budget
+                if not client.retry_policy.should_retry('efetch', attempt):
+                    raise
+            await asyncio.sleep(client.retry_policy.backoff(attempt))
+            attempt += 1
+
+    async def fetch_chunk(id_list: List[str], retstart: int) -> List[PubmedEFetchData]:
+        async with semaphore:
+            papers = await client.coalesce(
+                ('efetch', tuple(id_list)),
+                lambda: fetch_papers(id_list, retstart)
+            )
+        if on_chunk is not None:
+            # Outside the semaphore, so the next chunk is fetched meanwhile
+            await on_chunk(papers)
+        return papers
+
+    # Each chunk is fetched, parsed and retried on its own, with a bounded
+    # number in flight at once
     id_list = query.pubmed_id_list
-    fetch_url = make_fetch_given_ids(id_list, api_key=api_key)
-    if len(id_list)>200:
-        output = await client.post(make_fetch_given_ids([''], api_key=api_key), data = {'id': id_list})
-    else:
-        output = await client.get(fetch_url)
-    print('fetch')
-    raw_fetch_out = await output.text()
-    proc_out = xml_parse.fromstring(raw_fetch_out)
+    # Requests against the history server are not cached, so with a cache the
+    # records are fetched by id instead
+    use_history = (
+        query.web_env is not None and query.query_key is not None
+        and client.response_cache is None
+    )
+    semaphore = asyncio.Semaphore(max_concurrent_chunks)
+    chunk_results = await asyncio.gather(*[
+        fetch_chunk(id_list[i:i + chunk_size], i)
+        for i in range(0, len(id_list), chunk_size)
+    ])
+    return [paper for papers in chunk_results for paper in papers]
+
+class SharedPaperIndex:
+    """
+    Papers fetched for one query, keyed by PMID. Every branch of the query
+    fetches through the index, so a PMID that turns up in the primary
+    results, the references and the citations is fetched and parsed once,
+    and a branch needing a PMID another branch already has in flight waits
+    for that fetch instead of issuing its own.
+    """
+    papers: Dict[str, PubmedEFetchData]
+    _pending: Dict[str, 'asyncio.Future[None]']
+
+    def __init__(
+        self,
+        client: NewAsyncClient,
+        api_key: Optional[str] = None,
+        summary: bool = False,
+        executor: Optional[Executor] = None,
+        on_chunk: Optional[Callable[[List[PubmedEFetchData]], Awaitable[object]]] = None
+    ):
+        self.client = client
+        self.api_key = api_key
+        self.executor = executor
+        # Passed to efetch_on_id_list for every fetch through the index
+        self.on_chunk = on_chunk
+        # Whether papers are fetched as esummary records rather than full
+        # efetch ones
+        self.summary = summary
+        self.papers = {}
+        self._pending = {}
+
+    async def fetch(
+        self,
+        id_list: List[str],
+        web_env: Optional[str] = None,
+        query_key: Optional[str] = None
+    ) -> Dict[str, PubmedEFetchData]:
+        unique_ids = list(dict.fromkeys(id_list))
+        missing = [i for i in unique_ids if i not in self.papers and i not in self._pending]
+        waiting = [self._pending[i] for i in unique_ids if i in self._pending]
+        if missing:
+            loop = asyncio.get_running_loop()
+            for pubmed_id in missing:
+                self._pending[pubmed_id] = loop.create_future()
+            if len(missing) < len(unique_ids):
+                # The history handle covers the whole id list, not a subset
+                web_env = query_key = None
+            fetch_query = PubmedEFetchQuery(
+                pubmed_id_list = missing,
+                web_env = web_env,
+                query_key = query_key
+            )
+            try:
+                if self.summary:
+                    fetched = await esummary_on_id_list(fetch_query, self.client, api_key = self.api_key)
+                else:
+                    fetched = await efetch_on_id_list(
+                        fetch_query, self.client, api_key = self.api_key, executor = self.executor,
+                        on_chunk = self.on_chunk
+                    )
+            except BaseException as e:
+                for pubmed_id in missing:
+                    future = self._pending.pop(pubmed_id)
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+                        # Mark retrieved, as other branches may never wait on it
+                        future.exception()
+                raise
+            for paper in fetched:
+                self.papers[paper.paper_id.pubmed] = paper
+            for pubmed_id in missing:
+                self._pending.pop(pubmed_id).set_result(None)
+        if waiting:
+            await asyncio.gather(*waiting)
+        return {i: self.papers[i] for i in unique_ids if i in self.papers}
+
+class EFetchStreamParser:
+    """
+    Incrementally parses an efetch PubmedArticleSet fed to it chunk by chunk.
+    Each article is parsed as soon as its closing tag has been read and its
+    subtree is then discarded, so memory use does not grow with the batch.
+    """
+    _parser: xml_parse.XMLPullParser
+    _root: Optional[xml_parse.Element]
+    _depth: int
+
+    def __init__(self):
+        self._parser = xml_parse.XMLPullParser(events=('start', 'end'))
+        self._root = None
+        self._depth = 0
+
+    def _read_events(self) -> List[PubmedEFetchData]:
+        papers = []
+        for event, elem in element_events(self._parser):
+            if event == 'start':
+                if self._root is None:
+                    self._root = elem
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 1 and self._root is not None:
+                    papers.extend(parse_efetch_articles([elem]))
+                    self._root.remove(elem)
+        return papers
+
+    def feed(self, data: Union[str, bytes]) -> List[PubmedEFetchData]:
+        self._parser.feed(data)
+        return self._read_events()
+
+    def close(self) -> List[PubmedEFetchData]:
+        self._parser.close()
+        return self._read_events()
+
+def parse_efetch_result(raw_fetch_out: Union[str, bytes]) -> List[PubmedEFetchData]:
+    parser = EFetchStreamParser()
+    return parser.feed(raw_fetch_out) + parser.close()
+
+# A paper flattened to plain tuples, which are much cheaper than pydantic
+# models to pickle back from an executor's worker processes
+EFetchRecord = Tuple[Any, ...]
+
+def efetch_record(paper: PubmedEFetchData) -> EFetchRecord:
+    def author_record(author: PubmedAuthor) -> Tuple[Optional[str], ...]:
+        person = author.__root__
+        if isinstance(person, PubmedIndividual):
+            return (person.institution, person.last_name, person.fore_name, person.initials)
+        return (person.institution, person.collective_name)
+    ids = paper.paper_id
+    abstract = paper.abstract
+    if isinstance(abstract, list):
+        abstract = [(i.label, i.nlm_category, i.text) for i in abstract]
+    return (
+        (ids.pubmed, ids.doi, ids.pii, ids.pmc, ids.mid),
+        paper.title,
+        paper.year,
+        [author_record(i) for i in paper.author_list],
+        paper.journal_title,
+        paper.journal_title_abr,
+        paper.keywords,
+        [(i.descriptor, i.qualifier) for i in paper.topics],
+        abstract
+    )
+
+def efetch_from_record(record: EFetchRecord) -> PubmedEFetchData:
+    # The record was made from a validated paper, so it is not validated again
+    def author_from_record(author: Tuple[Optional[str], ...]) -> PubmedAuthor:
+        if len(author) == 4:
+            institution, last_name, fore_name, initials = author
+            person: Union[PubmedIndividual, PubmedCollective] = PubmedIndividual.construct(
+                institution = institution,
+                last_name = last_name,
+                fore_name = fore_name,
+                initials = initials
+            )
+        else:
+            institution, collective_name = author
+            person = PubmedCollective.construct(
+                institution = institution,
+                collective_name = collective_name
+            )
+        return PubmedAuthor.construct(__root__ = person)
+    (
+        ids, title, year, authors, journal_title, journal_title_abr,
+        keywords, topics, abstract
+    ) = record
+    pubmed, doi, pii, pmc, mid = ids
+    if isinstance(abstract, list):
+        abstract = [
+            AbstractItem.construct(label = label, nlm_category = nlm_category, text = text)
+            for label, nlm_category, text in abstract
+        ]
+    return PubmedEFetchData.construct(
+        paper_id = IdSet.construct(pubmed = pubmed, doi = doi, pii = pii, pmc = pmc, mid = mid),
+        title = title,
+        year = year,
+        author_list = [author_from_record(i) for i in authors],
+        journal_title = journal_title,
+        journal_title_abr = journal_title_abr,
+        keywords = keywords,
+        topics = [
+            PubmedTopic.construct(descriptor = descriptor, qualifier = qualifier)
+            for descriptor, qualifier in topics
+        ],
+        abstract = abstract
+    )
+
+def parse_efetch_records(raw_fetch_out: Union[str, bytes]) -> List[EFetchRecord]:
+    return [efetch_record(i) for i in parse_efetch_result(raw_fetch_out)]
+
+def parse_efetch_articles(pubmed_articles: Iterable[xml_parse.Element]) -> List[PubmedEFetchData]:
     papers = []
-    for i in proc_out:
+    for i in pubmed_articles:
 
         medline_citation = i.find('MedlineCitation')
         if medline_citation is None:
@@ -536,3 +1060,111 @@ async def efetch_on_id_list(
         )
         papers.append(paper_data)
     return papers
+
+
+# ESummary
+async def esummary_on_id_list(
+    query: PubmedEFetchQuery,
+    client: NewAsyncClient,
+    api_key: Optional[str] = None,
+    chunk_size: int = Limit.ESUMMARY_CHUNK_SIZE,
+    max_concurrent_chunks: int = Limit.ESUMMARY_MAX_CONCURRENT_CHUNKS
+) -> List[PubmedEFetchData]:
+    """
+    Fetches the document summaries of the papers in the query. These are much
+    smaller than full efetch records, but only carry ids, title, year, journal
+    and author names, so the other fields are left empty.
+    """
+    def make_summary_url(prefix = Endpoint.PREFIX, api_key: Optional[str] = None):
+        url = f'{prefix}esummary.fcgi?db=pubmed&retmode=json&version=2.0'
+        if api_key is not None:
+            url += f'&api_key={api_key}'
+        return url
+
+    async def summarise_papers(id_list: List[str], retstart: int) -> List[PubmedEFetchData]:
+        if use_history:
+            output = await client.get(
+                make_summary_url(api_key=api_key) + (
+                    f'&WebEnv={query.web_env}&query_key={query.query_key}'
+                    f'&retstart={retstart}&retmax={len(id_list)}'
+                )
+            )
+        elif len(id_list)>200:
+            output = await client.post(
+                make_summary_url(api_key=api_key),
+                data = {'id': ','.join(id_list)},
+                idempotent = True
+            )
+        else:
+            output = await client.get(make_summary_url(api_key=api_key) + f'&id={",".join(id_list)}')
+        return parse_esummary_result(await output.read())
+
+    async def summarise_chunk(id_list: List[str], retstart: int) -> List[PubmedEFetchData]:
+        async with semaphore:
+            return await client.coalesce(
+                ('esummary', tuple(id_list)),
+                lambda: summarise_papers(id_list, retstart)
+            )
+
+    id_list = query.pubmed_id_list
+    # Requests against the history server are not cached, so with a cache the
+    # records are fetched by id instead
+    use_history = (
+        query.web_env is not None and query.query_key is not None
+        and client.response_cache is None
+    )
+    semaphore = asyncio.Semaphore(max_concurrent_chunks)
+    chunk_results = await asyncio.gather(*[
+        summarise_chunk(id_list[i:i + chunk_size], i)
+        for i in range(0, len(id_list), chunk_size)
+    ])
+    return [paper for papers in chunk_results for paper in papers]
+
+def parse_esummary_result(raw_summary_out: Union[str, bytes]) -> List[PubmedEFetchData]:
+    result = json.loads(raw_summary_out)['result']
+    papers = []
+    for uid in result.get('uids', []):
+        summary = result[uid]
+        if 'error' in summary:
+            # eg. the id no longer exists
+            continue
+        ids_available = {
+            i['idtype']: i['value'] for i in summary.get('articleids', [])
+        }
+        year_match = re.match(r'\d{4}', summary.get('pubdate', ''))
+        author_list = []
+        for author in summary.get('authors', []):
+            if author.get('authtype') == 'CollectiveName':
+                author_list.append(PubmedAuthor.parse_obj({
+                    'collective_name': author['name'],
+                    'institution': None
+                }))
+            else:
+                # Names come as the surname followed by initials, eg. 'Smith JA'
+                last_name, _, initials = author['name'].rpartition(' ')
+                if not last_name:
+                    last_name, initials = initials, ''
+                author_list.append(PubmedAuthor.parse_obj({
+                    'last_name': last_name,
+                    'fore_name': None,
+                    'initials': initials or None,
+                    'institution': None
+                }))
+        papers.append(PubmedEFetchData(
+            paper_id = IdSet(
+                pubmed = uid,
+                doi = ids_available.get('doi'),
+                pii = ids_available.get('pii'),
+                pmc = ids_available.get('pmc'),
+                mid = ids_available.get('mid')
+            ),
+            title = summary.get('title', ''),
+            year = int(year_match.group()) if year_match else None,
+            author_list = author_list,
+            journal_title = summary.get('fulljournalname', ''),
+            journal_title_abr = summary.get('source', ''),
+            keywords = None,
+            topics = [],
+            abstract = None
+        ))
+    return papers
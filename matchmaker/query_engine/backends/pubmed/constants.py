@@ -0,0 +1,51 @@
+class Endpoint:
+    PREFIX = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/'
+
+
+class Limit:
+    # PubMed esearch returns at most 10,000 ids per request and will not page
+    # past the first 10,000 records of a search
+    ESEARCH_PAGE_SIZE = 10000
+    ESEARCH_MAX_RECORDS = 10000
+    # Small enough for a GET url and to bound the memory of each response
+    EFETCH_CHUNK_SIZE = 200
+    EFETCH_MAX_CONCURRENT_CHUNKS = 4
+    ELINK_CHUNK_SIZE = 200
+    ELINK_MAX_CONCURRENT_CHUNKS = 4
+    # Summaries are a fraction of the size of full records
+    ESUMMARY_CHUNK_SIZE = 500
+    ESUMMARY_MAX_CONCURRENT_CHUNKS = 4
+
+
+class RateLimit:
+    EUTILS_HOST = 'eutils.ncbi.nlm.nih.gov'
+    # NCBI allows 10 requests/second with an api key and 3 without
+    WITH_API_KEY = 9
+    WITHOUT_API_KEY = 2
+    MAX_WITH_API_KEY = 10
+    MAX_WITHOUT_API_KEY = 3
+
+
+class Estimate:
+    # Rough averages used to project the cost of a query before running it
+    REFERENCES_PER_PAPER = 35
+    CITATIONS_PER_PAPER = 25
+    ESEARCH_BYTES_PER_ID = 20
+    ELINK_BYTES_PER_LINK = 30
+    EFETCH_BYTES_PER_RECORD = 15000
+    ESUMMARY_BYTES_PER_RECORD = 2500
+
+
+class Sync:
+    # PubMed dates only go down to the day and new records can take a while
+    # to be indexed, so each incremental sync looks back over a few days
+    OVERLAP_DAYS = 2
+
+
+class CacheTTL:
+    # Search results change as new papers are indexed, records and links
+    # change far more rarely
+    ESEARCH = 24 * 60 * 60
+    ELINK = 7 * 24 * 60 * 60
+    EFETCH = 30 * 24 * 60 * 60
+    ESUMMARY = 30 * 24 * 60 * 60
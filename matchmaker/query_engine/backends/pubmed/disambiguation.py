@@ -0,0 +1,265 @@
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+from matchmaker.query_engine.backends.pubmed.processors import AuthorRow, ProcessedInstitution
+
+BlockingKey = Tuple[str, Hashable]
+# Affiliations without a deciding postcode or house match on this many parts
+MIN_SHARED_PARTS = 4
+# Length of the substrings house names are indexed by
+HOUSE_GRAM_SIZE = 3
+
+
+def institution_matches(inst1: ProcessedInstitution, inst2: ProcessedInstitution) -> bool:
+    match_count = 0
+    if inst1 is None or inst2 is None:
+        if inst2 == inst1:
+            return True
+        else:
+            return False
+    for part in inst1:
+
+        if part[1] == 'postcode':
+            #Extract postcodes from other half
+            postcodes2 = [i[0] for i in inst2 if i[1] == 'postcode']
+            #If other half has a postcode, it must match
+            if len(postcodes2)>0:
+                if part[0] in postcodes2:
+                    return True
+                else:
+                    return False
+        if part[1] == 'house':
+            #Extract houses from other half
+            houses2 = [i[0] for i in inst2 if i[1] == 'house']
+            #If other half has a house, it must match
+            if len(houses2)>0:
+                for house2 in houses2:
+                    if part[0] in house2 or house2 in part[0]:
+                        return True
+                    else:
+                        return False
+        if part in inst2:
+            match_count += 1
+    if match_count >= MIN_SHARED_PARTS:
+        return True
+    else:
+        return False
+
+def authors_match(author1: AuthorRow, author2: AuthorRow) -> bool:
+    if author1.key == author2.key:
+        return True
+    elif institution_matches(author1.proc_institution, author2.proc_institution):
+        return True
+    else:
+        return False
+
+def house_grams(house: str) -> Set[str]:
+    return {house[i:i + HOUSE_GRAM_SIZE] for i in range(len(house) - HOUSE_GRAM_SIZE + 1)}
+
+
+class HouseIndex:
+    """
+    Index of house names, to find those that are a substring of a given name
+    or contain it, without comparing against every name.
+    """
+    houses: Set[str]
+    _short: List[str]
+    _by_first_gram: Dict[str, List[str]]
+    _by_gram: Dict[str, Set[str]]
+
+    def __init__(self, houses: Iterable[str]):
+        self.houses = set(houses)
+        self._short = []
+        self._by_first_gram = {}
+        self._by_gram = {}
+        for house in self.houses:
+            if len(house) < HOUSE_GRAM_SIZE:
+                self._short.append(house)
+                continue
+            self._by_first_gram.setdefault(house[:HOUSE_GRAM_SIZE], []).append(house)
+            for gram in house_grams(house):
+                self._by_gram.setdefault(gram, set()).add(house)
+
+    def within(self, house: str) -> Set[str]:
+        """Indexed houses that are substrings of house, itself included."""
+        found = {short for short in self._short if short in house}
+        for gram in house_grams(house):
+            found.update(i for i in self._by_first_gram.get(gram, []) if i in house)
+        return found
+
+    def containing(self, house: str) -> Set[str]:
+        """Indexed houses that house is a substring of, itself included."""
+        grams = house_grams(house)
+        if not grams:
+            return {i for i in self.houses if house in i}
+        postings = min((self._by_gram.get(gram, set()) for gram in grams), key = len)
+        return {i for i in postings if house in i}
+
+
+class AuthorBlocks:
+    """
+    Index of authors by blocking keys, such that authors that match in
+    either direction always share a key:
+    - an identical affiliation, as identical authors match
+    - no processed affiliation, as these all match each other
+    - a postcode, or a house name that is a substring of the other's
+    - for matches on shared parts, a prefix of each affiliation's parts,
+      ordered rarest first. Any two sets with at least MIN_SHARED_PARTS in
+      common share a part among their first len - MIN_SHARED_PARTS + 1.
+      Processed affiliations never repeat a part, so they count as sets.
+    """
+    authors: List[AuthorRow]
+    _blocks: Dict[BlockingKey, List[int]]
+    _part_counts: 'Counter[Tuple[str, str]]'
+    _houses: HouseIndex
+    _within: Dict[str, Set[str]]
+
+    def __init__(self, authors: Iterable[AuthorRow]):
+        self.authors = list(authors)
+        self._part_counts = Counter(
+            part for author in self.authors for part in set(author.proc_institution or [])
+        )
+        self._houses = HouseIndex(
+            value
+            for author in self.authors
+            for value, label in author.proc_institution or []
+            if label == 'house'
+        )
+        self._within = {}
+        self._blocks = {}
+        for index, author in enumerate(self.authors):
+            for key in self.keys(author):
+                self._blocks.setdefault(key, []).append(index)
+
+    def keys(self, author: AuthorRow) -> Set[BlockingKey]:
+        keys: Set[BlockingKey] = {('institution', author.institution)}
+        if author.proc_institution is None:
+            keys.add(('unprocessed', None))
+            return keys
+        for value, label in author.proc_institution:
+            if label == 'postcode':
+                keys.add(('postcode', value))
+            elif label == 'house':
+                # Each house name's block holds the authors with that name and
+                # those whose house name contains it
+                if value not in self._within:
+                    self._within[value] = self._houses.within(value)
+                keys.update(('house', house) for house in self._within[value])
+                if value not in self._houses.houses:
+                    # Not indexed, so not in the blocks of longer names
+                    keys.update(('house', house) for house in self._houses.containing(value))
+        parts = sorted(
+            set(author.proc_institution),
+            key = lambda part: (self._part_counts[part], part)
+        )
+        keys.update(('part', part) for part in parts[:len(parts) - MIN_SHARED_PARTS + 1])
+        return keys
+
+    def blocks(self) -> Iterable[List[int]]:
+        return self._blocks.values()
+
+    def candidates(self, author: AuthorRow) -> List[int]:
+        """Indices of the authors sharing a block with author, in order."""
+        candidates: Set[int] = set()
+        for key in self.keys(author):
+            candidates.update(self._blocks.get(key, []))
+        return sorted(candidates)
+
+
+class UnionFind:
+    """Disjoint sets over 0..n-1, with path halving and union by size."""
+    _parents: List[int]
+    _sizes: List[int]
+
+    def __init__(self, n: int):
+        self._parents = list(range(n))
+        self._sizes = [1] * n
+
+    def find(self, i: int) -> int:
+        parents = self._parents
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    def union(self, i: int, j: int) -> int:
+        i, j = self.find(i), self.find(j)
+        if i == j:
+            return i
+        if self._sizes[i] < self._sizes[j]:
+            i, j = j, i
+        self._parents[j] = i
+        self._sizes[i] += self._sizes[j]
+        return i
+
+
+def cluster_authors(authors: List[AuthorRow]) -> List[List[AuthorRow]]:
+    """
+    Group authors that match in either direction, transitively, comparing
+    only authors that share a block. Identical authors always match, and
+    otherwise whether two authors match depends only on their processed
+    affiliations, so within a block each distinct processed affiliation is
+    compared once with each other one, and with itself. The work grows with
+    the number of distinct affiliations per block rather than its size.
+    Clusters are returned in the order of their first author.
+    """
+    blocks = AuthorBlocks(authors)
+    clusters = UnionFind(len(authors))
+    first_by_key: Dict[Tuple, int] = {}
+    affiliation_ids: Dict[Optional[Tuple[Tuple[str, str], ...]], int] = {}
+    members: List[List[int]] = []
+    author_affiliations: List[int] = []
+    for i, author in enumerate(authors):
+        clusters.union(first_by_key.setdefault(author.key, i), i)
+        affiliation = None if author.proc_institution is None else tuple(author.proc_institution)
+        if affiliation not in affiliation_ids:
+            affiliation_ids[affiliation] = len(members)
+            members.append([])
+        members[affiliation_ids[affiliation]].append(i)
+        author_affiliations.append(affiliation_ids[affiliation])
+    # Whether all the authors with an affiliation are in one cluster, after
+    # which comparing it with an affiliation in that cluster adds nothing
+    merged = [len(i) == 1 for i in members]
+    compared: Set[Tuple[int, int]] = set()
+
+    def join_if_matching(a: int, b: int):
+        pair = (min(a, b), max(a, b))
+        if pair in compared:
+            return
+        compared.add(pair)
+        inst_a = authors[members[a][0]].proc_institution
+        inst_b = authors[members[b][0]].proc_institution
+        if institution_matches(inst_a, inst_b) or institution_matches(inst_b, inst_a):
+            # Every author with one affiliation matches every author with
+            # the other
+            for i in members[a] + members[b]:
+                clusters.union(members[a][0], i)
+            merged[a] = merged[b] = True
+
+    for block in blocks.blocks():
+        # The block's affiliations seen so far, those merged grouped by the
+        # cluster they were in when added
+        block_groups: Dict[int, List[int]] = {}
+        unmerged: List[int] = []
+        for a in dict.fromkeys(author_affiliations[i] for i in block):
+            join_if_matching(a, a)
+            for root, group in block_groups.items():
+                for b in group:
+                    if merged[a] and clusters.find(root) == clusters.find(members[a][0]):
+                        # The rest of the group is already in a's cluster
+                        break
+                    join_if_matching(a, b)
+            for b in unmerged:
+                join_if_matching(a, b)
+            if merged[a]:
+                block_groups.setdefault(clusters.find(members[a][0]), []).append(a)
+            else:
+                unmerged.append(a)
+            # Groups whose clusters have since been joined are merged
+            regrouped: Dict[int, List[int]] = {}
+            for root, group in block_groups.items():
+                regrouped.setdefault(clusters.find(root), []).extend(group)
+            block_groups = regrouped
+    groups: Dict[int, List[AuthorRow]] = {}
+    for i, author in enumerate(authors):
+        groups.setdefault(clusters.find(i), []).append(author)
+    return list(groups.values())
@@ -1,8 +1,24 @@
-from postal.expand import expand_address
-from postal.parser import parse_address
-from typing import Optional, List, Tuple, Union
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from hashlib import sha256
+from importlib.metadata import PackageNotFoundError, version as package_version
+import json
+import os
+import sqlite3
+from threading import Lock
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple, Union
 from pydantic import BaseModel
-from matchmaker.query_engine.backends.pubmed.api import PubmedTopic, AbstractItem, IdSet
+from matchmaker.query_engine.backends.pubmed.api import (
+    AbstractItem,
+    IdSet,
+    PubmedCollective,
+    PubmedEFetchData,
+    PubmedIndividual,
+    PubmedTopic,
+)
 
 class ProcessedAuthorBase(BaseModel):
     institution: Optional[str]
@@ -38,7 +54,373 @@ class ProcessedData(ProcessedEFetchData):
 
 ProcessedEFetchData.update_forward_refs()
 
-def process_institution(institution):
+# Bump whenever the output of process_institution changes, so that results
+# stored by older versions are not reused
+PROCESS_INSTITUTION_VERSION = 1
+PROCESS_INSTITUTION_LRU_SIZE = 100000
+# Where libpostal's installer puts its models unless configured otherwise
+LIBPOSTAL_DATA_DIRS = ('/usr/local/share/libpostal', '/usr/share/libpostal', '/opt/homebrew/share/libpostal')
+# Kept below SQLite's limit on the number of parameters in a statement
+INSTITUTION_CACHE_BATCH_SIZE = 500
+
+ProcessedInstitution = Optional[List[Tuple[str, str]]]
+
+def expand_address(address: str) -> List[str]:
+    # libpostal is imported on first use rather than with the backend, as
+    # loading it is slow and most callers never parse an affiliation
+    from postal.expand import expand_address as postal_expand_address
+    return postal_expand_address(address)
+
+def parse_address(address: str) -> List[Tuple[str, str]]:
+    from postal.parser import parse_address as postal_parse_address
+    return postal_parse_address(address)
+
+def libpostal_data_dir() -> Optional[str]:
+    candidates = [os.environ.get('LIBPOSTAL_DATA_DIR'), *LIBPOSTAL_DATA_DIRS]
+    for candidate in candidates:
+        if candidate and os.path.isdir(candidate):
+            return candidate
+    return None
+
+def libpostal_version() -> str:
+    # The parses come from libpostal's models rather than its Python
+    # bindings, so the version covers the files in the data directory, which
+    # change whenever the models are downloaded again
+    try:
+        bindings = package_version('postal')
+    except PackageNotFoundError:
+        bindings = 'unknown'
+    data_dir = libpostal_data_dir()
+    if data_dir is None:
+        return f'{bindings}:unknown'
+    fingerprint = sha256()
+    for root, dirs, files in os.walk(data_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            stat = os.stat(path)
+            entry = f'{os.path.relpath(path, data_dir)}:{stat.st_size}:{int(stat.st_mtime)};'
+            fingerprint.update(entry.encode('utf8'))
+    return f'{bindings}:{fingerprint.hexdigest()[:16]}'
+
+
+class InstitutionCache:
+    """
+    On-disk store of processed affiliation strings, shared across runs and
+    processes. Entries are keyed by a version made up of the processing
+    logic's version and that of libpostal and its models, and entries from
+    other versions are dropped when the cache is opened. Lookups and inserts
+    are batched, one query or transaction per batch of affiliations.
+    """
+    path: str
+    version: str
+
+    def __init__(self, path: str, version: Optional[str] = None):
+        self.path = path
+        if version is None:
+            version = f'{PROCESS_INSTITUTION_VERSION}:{libpostal_version()}'
+        self.version = version
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS institutions ('
+                'version TEXT, '
+                'institution TEXT, '
+                'processed TEXT, '
+                'PRIMARY KEY (version, institution))'
+            )
+            connection.execute('DELETE FROM institutions WHERE version != ?', (self.version,))
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout = 30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get_many(self, institutions: List[str]) -> Dict[str, ProcessedInstitution]:
+        found: Dict[str, ProcessedInstitution] = {}
+        with self._connection() as connection:
+            for i in range(0, len(institutions), INSTITUTION_CACHE_BATCH_SIZE):
+                batch = institutions[i:i + INSTITUTION_CACHE_BATCH_SIZE]
+                placeholders = ', '.join('?' * len(batch))
+                rows = connection.execute(
+                    'SELECT institution, processed FROM institutions '
+                    f'WHERE version = ? AND institution IN ({placeholders})',
+                    (self.version, *batch)
+                )
+                for institution, processed in rows:
+                    processed = json.loads(processed)
+                    found[institution] = None if processed is None else [tuple(i) for i in processed]
+        return found
+
+    def put_many(self, processed_index: Dict[str, ProcessedInstitution]):
+        with self._connection() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO institutions VALUES (?, ?, ?)',
+                [
+                    (self.version, institution, json.dumps(processed))
+                    for institution, processed in processed_index.items()
+                ]
+            )
+
+    def get(self, institution: str) -> Tuple[bool, ProcessedInstitution]:
+        found = self.get_many([institution])
+        if institution not in found:
+            return False, None
+        return True, found[institution]
+
+    def put(self, institution: str, processed: ProcessedInstitution):
+        self.put_many({institution: processed})
+
+class InstitutionMemo:
+    """In-process LRU of processed affiliation strings."""
+    maxsize: int
+    _entries: 'OrderedDict[str, Optional[Tuple[Tuple[str, str], ...]]]'
+    _lock: Lock
+
+    def __init__(self, maxsize: int = PROCESS_INSTITUTION_LRU_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, institution: str) -> Tuple[bool, ProcessedInstitution]:
+        with self._lock:
+            if institution not in self._entries:
+                return False, None
+            self._entries.move_to_end(institution)
+            processed = self._entries[institution]
+        # Every caller gets its own copy of the stored result
+        return True, None if processed is None else list(processed)
+
+    def put(self, institution: str, processed: ProcessedInstitution):
+        with self._lock:
+            self._entries[institution] = None if processed is None else tuple(
+                (value, label) for value, label in processed
+            )
+            self._entries.move_to_end(institution)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last = False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+institution_memo = InstitutionMemo()
+institution_cache: Optional[InstitutionCache] = None
+
+def set_institution_cache(cache: Optional[InstitutionCache]):
+    global institution_cache
+    institution_cache = cache
+    institution_memo.clear()
+
+def lookup_institution(institution: str) -> Tuple[bool, ProcessedInstitution]:
+    found, processed = institution_memo.get(institution)
+    cache = institution_cache
+    if not found and cache is not None:
+        found, processed = cache.get(institution)
+        if found:
+            institution_memo.put(institution, processed)
+    return found, processed
+
+def remember_institution(institution: str, processed: ProcessedInstitution):
+    institution_memo.put(institution, processed)
+    if institution_cache is not None:
+        institution_cache.put(institution, processed)
+
+def process_institution(institution: str) -> ProcessedInstitution:
+    # Affiliations repeat heavily across a crawl, so each is parsed once per
+    # process, or once across runs given an institution cache
+    found, processed = lookup_institution(institution)
+    if not found:
+        processed = _process_institution(institution)
+        remember_institution(institution, processed)
+        found, processed = institution_memo.get(institution)
+    return processed
+
+def _load_libpostal():
+    # libpostal loads its models on first use, which takes seconds and
+    # gigabytes, so each worker does it once as it starts
+    expand_address('University of Bristol')
+    parse_address('University of Bristol')
+
+def _process_institution_batch(institutions: List[str]) -> List[ProcessedInstitution]:
+    return [_process_institution(institution) for institution in institutions]
+
+
+class InstitutionParserPool:
+    """
+    Long-lived worker processes that each load libpostal once and parse
+    batches of affiliation strings, keeping the blocking libpostal calls off
+    the event loop.
+    """
+    executor: ProcessPoolExecutor
+    batch_size: int
+
+    def __init__(self, max_workers: int = 2, batch_size: int = 256):
+        self.executor = ProcessPoolExecutor(max_workers = max_workers, initializer = _load_libpostal)
+        self.batch_size = batch_size
+
+    async def process(self, institutions: List[str]) -> List[ProcessedInstitution]:
+        loop = asyncio.get_running_loop()
+        batches = await asyncio.gather(*[
+            loop.run_in_executor(
+                self.executor,
+                _process_institution_batch,
+                institutions[i:i + self.batch_size]
+            )
+            for i in range(0, len(institutions), self.batch_size)
+        ])
+        return [processed for batch in batches for processed in batch]
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+async def process_institutions(
+    institutions: Iterable[Optional[str]],
+    pool: Optional[InstitutionParserPool] = None
+) -> Dict[str, ProcessedInstitution]:
+    """
+    Process every distinct affiliation string, each once. Those not already
+    memoized are looked up in the institution cache in one batch, and the
+    rest go to the pool in batches if there is one, or are processed in turn
+    on the calling thread if not.
+    """
+    processed_index: Dict[str, ProcessedInstitution] = {}
+    missing = []
+    for institution in dict.fromkeys(institutions):
+        if institution is None:
+            continue
+        found, processed = institution_memo.get(institution)
+        if found:
+            processed_index[institution] = processed
+        else:
+            missing.append(institution)
+    cache = institution_cache
+    if missing and cache is not None:
+        cached = await asyncio.to_thread(cache.get_many, missing)
+        for institution, processed in cached.items():
+            institution_memo.put(institution, processed)
+            processed_index[institution] = processed
+        missing = [institution for institution in missing if institution not in cached]
+    if pool is not None:
+        missing_processed = await pool.process(missing)
+    else:
+        missing_processed = [_process_institution(institution) for institution in missing]
+    new_index = dict(zip(missing, missing_processed))
+    for institution, processed in new_index.items():
+        institution_memo.put(institution, processed)
+    processed_index.update(new_index)
+    if new_index and cache is not None:
+        await asyncio.to_thread(cache.put_many, new_index)
+    return processed_index
+
+async def process_paper_institutions(
+    papers: Iterable[PubmedEFetchData],
+    pool: Optional[InstitutionParserPool] = None
+):
+    """
+    Process the affiliations of papers as they are fetched, so that building
+    their author table afterwards finds them memoized.
+    """
+    await process_institutions(
+        (author.__root__.institution for paper in papers for author in paper.author_list),
+        pool
+    )
+
+@dataclass(eq = False)
+class AuthorRow:
+    """
+    One author of one paper. The processed affiliation is shared by every row
+    with the same affiliation rather than copied, so it must not be mutated.
+    """
+    name: Union[PubmedIndividual, PubmedCollective]
+    institution: Optional[str]
+    proc_institution: ProcessedInstitution
+
+    @property
+    def key(self) -> Tuple:
+        # Equal exactly when the ProcessedAuthors built from the rows are
+        proc_institution = None if self.proc_institution is None else tuple(self.proc_institution)
+        if isinstance(self.name, PubmedIndividual):
+            return (
+                self.name.last_name,
+                self.name.fore_name,
+                self.name.initials,
+                self.institution,
+                proc_institution
+            )
+        return (self.name.collective_name, self.institution, proc_institution)
+
+    def author(self) -> ProcessedAuthor:
+        if isinstance(self.name, PubmedIndividual):
+            processed = ProcessedIndividual.construct(
+                institution = self.institution,
+                proc_institution = self.proc_institution,
+                last_name = self.name.last_name,
+                fore_name = self.name.fore_name,
+                initials = self.name.initials
+            )
+        else:
+            processed = ProcessedCollective.construct(
+                institution = self.institution,
+                proc_institution = self.proc_institution,
+                collective_name = self.name.collective_name
+            )
+        return ProcessedAuthor.construct(__root__ = processed)
+
+async def build_author_table(
+    papers: Iterable[PubmedEFetchData],
+    pool: Optional[InstitutionParserPool] = None
+):
+    """
+    Build the author rows of the papers and of the papers they link to, and
+    cache them on each paper. The distinct affiliations of papers without
+    rows yet are processed in one batch.
+    """
+    pending: Dict[int, PubmedEFetchData] = {}
+    for paper in papers:
+        linked = [*(getattr(paper, 'references', None) or []), *(getattr(paper, 'cited_by', None) or [])]
+        for sub_paper in [paper, *linked]:
+            if sub_paper._author_rows is None:
+                pending[id(sub_paper)] = sub_paper
+    institution_index = await process_institutions(
+        (
+            author.__root__.institution
+            for paper in pending.values()
+            for author in paper.author_list
+        ),
+        pool
+    )
+    for paper in pending.values():
+        paper._author_rows = [
+            AuthorRow(
+                name = author.__root__,
+                institution = author.__root__.institution,
+                proc_institution = (
+                    None if author.__root__.institution is None
+                    else institution_index.get(author.__root__.institution)
+                )
+            )
+            for author in paper.author_list
+        ]
+
+def author_rows(paper: PubmedEFetchData) -> List[AuthorRow]:
+    if paper._author_rows is None:
+        raise ValueError(f'No author table built for paper {paper.paper_id.pubmed}')
+    return paper._author_rows
+
+def _process_institution(institution):
     def remove_emails_from_phrase(initial_phrase):
         def find_all(a_str, sub):
             start = 0
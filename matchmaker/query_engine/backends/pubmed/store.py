@@ -0,0 +1,115 @@
+import asyncio
+from contextlib import contextmanager
+from hashlib import sha256
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterator, List, Optional
+import zlib
+
+
+class PaperStore:
+    """
+    Persistent local store of PubMed papers for incremental syncs.
+
+    Each synced query (keyed by `sync_key`) keeps the time it was last synced
+    and its papers keyed by PMID, stored as zlib-compressed JSON in SQLite.
+    A sync merges the papers it fetched into the store and moves the sync
+    time forward in one transaction, so an interrupted sync is simply redone.
+    """
+    path: str
+    compression_level: int
+
+    def __init__(self, path: str, compression_level: int = 6):
+        self.path = path
+        self.compression_level = compression_level
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS syncs ('
+                'sync_key TEXT PRIMARY KEY, '
+                'last_sync REAL)'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS papers ('
+                'sync_key TEXT, '
+                'pubmed_id TEXT, '
+                'data BLOB, '
+                'updated REAL, '
+                'PRIMARY KEY (sync_key, pubmed_id))'
+            )
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout = 30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def sync_key(query: Any) -> str:
+        # The selector is part of the key, as it decides which fields the
+        # stored papers hold
+        canonical = json.dumps(query.dict(), sort_keys = True, default = str)
+        return sha256(canonical.encode('utf8')).hexdigest()
+
+    def _last_sync(self, sync_key: str) -> Optional[float]:
+        with self._connection() as connection:
+            row = connection.execute(
+                'SELECT last_sync FROM syncs WHERE sync_key = ?', (sync_key,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def _merge(self, sync_key: str, papers: Dict[str, str], synced_at: float):
+        now = time.time()
+        with self._connection() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO papers VALUES (?, ?, ?, ?)',
+                [
+                    (
+                        sync_key,
+                        pubmed_id,
+                        zlib.compress(data.encode('utf8'), self.compression_level),
+                        now
+                    )
+                    for pubmed_id, data in papers.items()
+                ]
+            )
+            connection.execute(
+                'INSERT OR REPLACE INTO syncs VALUES (?, ?)', (sync_key, synced_at)
+            )
+
+    def _papers(self, sync_key: str) -> List[str]:
+        with self._connection() as connection:
+            rows = connection.execute(
+                # Highest PMID first. PMIDs are assigned in increasing order,
+                # so this is roughly the order records were added to PubMed,
+                # which need not be the order esearch returned them in
+                'SELECT data FROM papers WHERE sync_key = ? '
+                'ORDER BY CAST(pubmed_id AS INTEGER) DESC',
+                (sync_key,)
+            ).fetchall()
+        return [zlib.decompress(row[0]).decode('utf8') for row in rows]
+
+    def _forget(self, sync_key: str):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM papers WHERE sync_key = ?', (sync_key,))
+            connection.execute('DELETE FROM syncs WHERE sync_key = ?', (sync_key,))
+
+    async def last_sync(self, sync_key: str) -> Optional[float]:
+        return await asyncio.to_thread(self._last_sync, sync_key)
+
+    async def merge(self, sync_key: str, papers: Dict[str, str], synced_at: float):
+        """Merge papers, as JSON keyed by PMID, into the store and record the sync."""
+        await asyncio.to_thread(self._merge, sync_key, papers, synced_at)
+
+    async def papers(self, sync_key: str) -> List[str]:
+        return await asyncio.to_thread(self._papers, sync_key)
+
+    async def forget(self, sync_key: str):
+        await asyncio.to_thread(self._forget, sync_key)
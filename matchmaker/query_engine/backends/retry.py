@@ -0,0 +1,108 @@
+import asyncio
+import random
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from aiohttp import ClientConnectionError, ClientPayloadError
+
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+RETRYABLE_EXCEPTIONS = (
+    ClientConnectionError,
+    ClientPayloadError,
+    asyncio.TimeoutError,
+)
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+def endpoint_name(url: str) -> str:
+    # eg. https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi -> efetch
+    path = urlsplit(str(url)).path.rstrip('/')
+    name = path.split('/')[-1]
+    return name.split('.')[0]
+
+
+class RetryBudget:
+    """
+    Caps the number of retries an endpoint may make per `period` seconds, so
+    that a failing endpoint cannot multiply load on the server indefinitely.
+    """
+    max_retries: int
+    period: float
+    remaining: float
+    updated: float
+
+    def __init__(self, max_retries: int, period: float):
+        self.max_retries = max_retries
+        self.period = period
+        self.remaining = max_retries
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        refill = (now - self.updated) * self.max_retries / self.period
+        self.remaining = min(self.max_retries, self.remaining + refill)
+        self.updated = now
+
+    def available(self) -> int:
+        self._refill()
+        return int(self.remaining)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self.remaining >= 1:
+            self.remaining -= 1
+            return True
+        return False
+
+
+class RetryPolicy:
+    """
+    Capped exponential backoff with full jitter for transient failures.
+    Only idempotent requests are retried.
+    """
+    max_attempts: int
+    base_delay: float
+    max_delay: float
+    retry_statuses: Tuple[int, ...]
+    budget_per_endpoint: int
+    budget_period: float
+    budgets: Dict[str, RetryBudget]
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30,
+        retry_statuses: Tuple[int, ...] = RETRYABLE_STATUSES,
+        budget_per_endpoint: int = 100,
+        budget_period: float = 60
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = retry_statuses
+        self.budget_per_endpoint = budget_per_endpoint
+        self.budget_period = budget_period
+        self.budgets = {}
+
+    def get_budget(self, endpoint: str) -> RetryBudget:
+        if endpoint not in self.budgets:
+            self.budgets[endpoint] = RetryBudget(self.budget_per_endpoint, self.budget_period)
+        return self.budgets[endpoint]
+
+    def remaining_budget(self, url: str) -> int:
+        # Keyed like should_retry, so a url or a bare endpoint name will do
+        return self.get_budget(endpoint_name(url)).available()
+
+    def is_idempotent(self, method: str, idempotent: Optional[bool] = None) -> bool:
+        if idempotent is not None:
+            return idempotent
+        return method.upper() in IDEMPOTENT_METHODS
+
+    def should_retry(self, url: str, attempt: int) -> bool:
+        if attempt + 1 >= self.max_attempts:
+            return False
+        return self.get_budget(endpoint_name(url)).try_spend()
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
@@ -0,0 +1,106 @@
+from asyncio import Future, get_running_loop
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import AsyncIterator, Deque, Dict, Iterator, Optional
+
+
+class Priority(IntEnum):
+    # Lower values are served first
+    INTERACTIVE = 0
+    NORMAL = 1
+    BACKGROUND = 2
+
+# The priority that requests made from the current task are tagged with
+current_priority: ContextVar[Priority] = ContextVar('current_priority', default=Priority.NORMAL)
+
+@contextmanager
+def priority_scope(priority: Optional[Priority]) -> Iterator[Priority]:
+    if priority is None:
+        yield current_priority.get()
+        return
+    token = current_priority.set(priority)
+    try:
+        yield priority
+    finally:
+        current_priority.reset(token)
+
+DEFAULT_CONCURRENCY = {
+    Priority.INTERACTIVE: 10,
+    Priority.NORMAL: 8,
+    Priority.BACKGROUND: 4,
+}
+
+
+class RequestScheduler:
+    """
+    Caps the number of requests in flight per priority class. Requests over
+    the cap queue in their class and can be cancelled while queued; once
+    admitted, higher priority requests also jump ahead of lower priority ones
+    waiting on the rate limiter.
+    """
+    concurrency: Dict[Priority, int]
+    _active: Dict[Priority, int]
+    _queued: Dict[Priority, Deque[Future]]
+
+    def __init__(self, concurrency: Optional[Dict[Priority, int]] = None):
+        self.concurrency = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+        self._active = {priority: 0 for priority in Priority}
+        self._queued = {priority: deque() for priority in Priority}
+
+    def active(self, priority: Priority) -> int:
+        return self._active[priority]
+
+    def queue_depth(self, priority: Priority) -> int:
+        return len(self._queued[priority])
+
+    def _wake_next(self, priority: Priority):
+        queued = self._queued[priority]
+        while queued and self._active[priority] < self.concurrency[priority]:
+            waiter = queued.popleft()
+            if not waiter.done():
+                # The slot is handed straight to the waiter
+                self._active[priority] += 1
+                waiter.set_result(None)
+
+    async def acquire(self, priority: Priority):
+        """Take a slot in `priority`, to be given back with `release`."""
+        if self._active[priority] < self.concurrency[priority] and not self._queued[priority]:
+            self._active[priority] += 1
+            return
+        waiter = get_running_loop().create_future()
+        self._queued[priority].append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as we were cancelled, so pass it on
+                self.release(priority)
+            elif waiter in self._queued[priority]:
+                self._queued[priority].remove(waiter)
+            raise
+
+    def release(self, priority: Priority):
+        self._active[priority] -= 1
+        self._wake_next(priority)
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[Priority] = None) -> AsyncIterator[Priority]:
+        if priority is None:
+            priority = current_priority.get()
+        await self.acquire(priority)
+        try:
+            yield priority
+        finally:
+            self.release(priority)
+
+    def cancel_queued(self, priority: Priority = Priority.BACKGROUND) -> int:
+        """Cancel every request still queued in `priority`, returning how many were cancelled."""
+        queued = self._queued[priority]
+        cancelled = 0
+        while queued:
+            waiter = queued.popleft()
+            if waiter.cancel():
+                cancelled += 1
+        return cancelled
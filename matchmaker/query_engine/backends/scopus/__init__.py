@@ -1,5 +1,6 @@
 from html import unescape
-from typing import Awaitable, Callable, Dict, List, Tuple
+from urllib.parse import urlsplit
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from matchmaker import query_engine
 from matchmaker.query_engine.backend import Backend
 from matchmaker.query_engine.backends import (
@@ -8,7 +9,11 @@ from matchmaker.query_engine.backends import (
     BasePaperSearchQueryEngine,
     NewAsyncClient,
     RateLimiter,
+    SessionManager,
 )
+from matchmaker.query_engine.backends.budget import Budget, BudgetRegistry, budget_registry
+from matchmaker.query_engine.backends.retry import RetryPolicy
+from matchmaker.query_engine.backends.scopus.constants import Endpoint, RateLimit
 from matchmaker.query_engine.backends.scopus.api import (
     AffiliationSearchQuery,
     AffiliationSearchResult,
@@ -45,6 +50,25 @@ from matchmaker.query_engine.backends.exceptions import QueryNotSupportedError
 class NotEnoughRequests(Exception):
     pass
 
+def make_scopus_rate_limiter() -> RateLimiter:
+    rate_limiter = RateLimiter(max_requests_per_second = RateLimit.AUTHOR_SEARCH)
+    for url, requests_per_second in [
+        (Endpoint.SCOPUS_SEARCH, RateLimit.SCOPUS_SEARCH),
+        (Endpoint.AUTHOR_SEARCH, RateLimit.AUTHOR_SEARCH),
+        (Endpoint.AFFILIATION_SEARCH, RateLimit.AFFILIATION_SEARCH),
+    ]:
+        rate_limiter.add_bucket(
+            Endpoint.HOST,
+            requests_per_second,
+            endpoint = urlsplit(url).path
+        )
+    return rate_limiter
+
+def get_scopus_budget(api_key: Optional[str] = None, registry: Optional[BudgetRegistry] = None) -> Budget:
+    if registry is None:
+        registry = budget_registry
+    return registry.get('scopus', api_key, make_scopus_rate_limiter)
+
 def convert_author_id(dict_structure):
     operator = dict_structure['operator']
     assert dict_structure['tag'] == 'authorid'
@@ -188,8 +212,13 @@ def institution_query_to_affiliation(query: InstitutionSearchQuery) -> Affiliati
 
 class PaperSearchQueryEngine(
         BasePaperSearchQueryEngine[List[ScopusSearchResult]]):
-    def __init__(self, api_key:str , institution_token: str, rate_limiter: RateLimiter = RateLimiter(max_requests_per_second = 9), *args, **kwargs):
+    method_endpoints = {'scopus_search': Endpoint.SCOPUS_SEARCH}
+    def __init__(self, api_key:str , institution_token: str, rate_limiter: Optional[RateLimiter] = None, *args, **kwargs):
         self.api_key = api_key
+        if rate_limiter is None:
+            budget = get_scopus_budget(api_key)
+            rate_limiter = budget.rate_limiter
+            kwargs.setdefault('scheduler', budget.scheduler)
         self.institution_token = institution_token
         self.available_fields = PaperDataSelector.parse_obj({
             'paper_id': {
@@ -481,8 +510,13 @@ class PaperSearchQueryEngine(
 class AuthorSearchQueryEngine(
     BaseAuthorSearchQueryEngine[List[ScopusAuthorSearchResult]]
 ):
-    def __init__(self, api_key:str , institution_token: str, rate_limiter: RateLimiter = RateLimiter(max_requests_per_second = 2), *args, **kwargs):
+    method_endpoints = {'author_search': Endpoint.AUTHOR_SEARCH}
+    def __init__(self, api_key:str , institution_token: str, rate_limiter: Optional[RateLimiter] = None, *args, **kwargs):
         self.api_key = api_key
+        if rate_limiter is None:
+            budget = get_scopus_budget(api_key)
+            rate_limiter = budget.rate_limiter
+            kwargs.setdefault('scheduler', budget.scheduler)
         self.institution_token = institution_token
         self.available_fields = AuthorDataSelector.parse_obj({
             'id': {
@@ -601,8 +635,13 @@ class AuthorSearchQueryEngine(
 class InstitutionSearchQueryEngine(
     BaseInstitutionSearchQueryEngine[List[AffiliationSearchResult]]
 ):
-    def __init__(self, api_key:str , institution_token: str, rate_limiter: RateLimiter = RateLimiter(max_requests_per_second = 6), *args, **kwargs):
+    method_endpoints = {'affiliation_search': Endpoint.AFFILIATION_SEARCH}
+    def __init__(self, api_key:str , institution_token: str, rate_limiter: Optional[RateLimiter] = None, *args, **kwargs):
         self.api_key = api_key
+        if rate_limiter is None:
+            budget = get_scopus_budget(api_key)
+            rate_limiter = budget.rate_limiter
+            kwargs.setdefault('scheduler', budget.scheduler)
         self.institution_token = institution_token
         self.available_fields = InstitutionDataSelector.parse_obj({
             'id': {
@@ -670,24 +709,50 @@ class InstitutionSearchQueryEngine(
 
 
 class ScopusBackend(Backend):
-    def __init__(self, api_key: str, institution_token: str):
+    def __init__(
+        self,
+        api_key: str,
+        institution_token: str,
+        retry_policy: Optional[RetryPolicy] = None,
+        budget_registry: Optional[BudgetRegistry] = None
+    ):
         self.api_key = api_key
         self.institution_token = institution_token
+        # Scopus limits apply per api key, so every backend using the key shares them
+        self.budget = get_scopus_budget(api_key, budget_registry)
+        self.rate_limiter = self.budget.rate_limiter
+        # pybliometrics makes the requests, so the client is never connected.
+        # It carries the key's rate limiter, scheduler and retry policy, and
+        # is shared by the engines so they take quota from one place
+        self.session_manager = SessionManager(
+            rate_limiter = self.rate_limiter,
+            retry_policy = retry_policy,
+            scheduler = self.budget.scheduler
+        )
     
     def paper_search_engine(self) -> PaperSearchQueryEngine:
         return PaperSearchQueryEngine(
             api_key = self.api_key, 
-            institution_token = self.institution_token
+            institution_token = self.institution_token,
+            rate_limiter = self.rate_limiter,
+            session_manager = self.session_manager
         )
 
     def author_search_engine(self) -> AuthorSearchQueryEngine:
         return AuthorSearchQueryEngine(
             api_key = self.api_key, 
-            institution_token = self.institution_token
+            institution_token = self.institution_token,
+            rate_limiter = self.rate_limiter,
+            session_manager = self.session_manager
         )
 
     def institution_search_engine(self) -> InstitutionSearchQueryEngine:
         return InstitutionSearchQueryEngine(
             api_key = self.api_key, 
-            institution_token = self.institution_token
+            institution_token = self.institution_token,
+            rate_limiter = self.rate_limiter,
+            session_manager = self.session_manager
         )
+
+    async def close(self):
+        await self.session_manager.close()
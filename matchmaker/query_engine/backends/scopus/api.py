@@ -1,7 +1,8 @@
-from typing import Annotated, List, Literal, Optional, Union
+import asyncio
+from typing import Any, Annotated, Callable, List, Literal, Optional, Tuple, TypeVar, Union
 
-from aiohttp import ClientSession
-from matchmaker.query_engine.backends.scopus.constants import Allowance, Length
+from matchmaker.query_engine.backends import NewAsyncClient
+from matchmaker.query_engine.backends.scopus.constants import Allowance, Endpoint, Length
 from matchmaker.query_engine.backends.scopus.quota_cache import (
     get_remaining_in_cache,
     store_quota_in_cache,
@@ -17,7 +18,6 @@ from matchmaker.query_engine.types.query import (
     Title,
     Year,
 )
-from pybliometrics.scopus import AffiliationSearch, AuthorSearch, ScopusSearch
 from pydantic import BaseModel, Field
 
 def query_to_term(query):
@@ -301,16 +301,67 @@ class AffiliationSearchQuery(BaseModel):
 and_int.update_forward_refs()
 or_int.update_forward_refs()
 
+Search = TypeVar('Search')
+
+def is_retryable_search_error(error: Exception, retry_statuses: Tuple[int, ...]) -> bool:
+    from pybliometrics.scopus import exception
+    from requests.exceptions import ConnectionError, HTTPError, Timeout
+    if isinstance(error, (ConnectionError, Timeout)):
+        return True
+    if isinstance(error, HTTPError):
+        # Raised by pybliometrics for statuses it has no exception of its own for
+        return error.response is not None and error.response.status_code in retry_statuses
+    # Which statuses have their own exception depends on the pybliometrics
+    # version, eg. 3.0 has none for 504
+    return any(
+        isinstance(error, getattr(exception, f'Scopus{status}Error', ()))
+        for status in retry_statuses
+    )
+
+async def run_scopus_search(
+    client: NewAsyncClient,
+    endpoint: str,
+    search: Callable[..., Search],
+    *args: Any,
+    **kwargs: Any
+) -> Search:
+    """
+    Run a pybliometrics search, which pages through results with blocking
+    requests of its own, on a worker thread. Each of those requests waits
+    for quota from the endpoint's bucket before it is sent.
+
+    Those requests bypass the client, so transient failures are retried here
+    under the client's retry policy, rerunning the whole search.
+    """
+    from matchmaker.query_engine.backends.scopus.gate import current_gate, install_gate
+    install_gate()
+    gate = current_gate.set((asyncio.get_running_loop(), lambda: client.wait_for_quota(endpoint)))
+    try:
+        attempt = 0
+        while True:
+            try:
+                return await asyncio.to_thread(search, *args, **kwargs)
+            except Exception as e:
+                if not is_retryable_search_error(e, client.retry_policy.retry_statuses):
+                    raise
+                if not client.retry_policy.should_retry(endpoint, attempt):
+                    raise
+            await asyncio.sleep(client.retry_policy.backoff(attempt))
+            attempt += 1
+    finally:
+        current_gate.reset(gate)
+
 async def scopus_search_on_query(
     query: ScopusSearchQuery,
-    client: ClientSession,
+    client: NewAsyncClient,
     view: str,
     api_key: str,
     institution_token: str
 ) -> List[ScopusSearchResult]:
     create_config(api_key, institution_token)
+    from pybliometrics.scopus import ScopusSearch
     term = query_to_term(query.dict()['__root__'])
-    scopus_results = ScopusSearch(term, view = view, verbose = True)
+    scopus_results = await run_scopus_search(client, Endpoint.SCOPUS_SEARCH, ScopusSearch, term, view = view, verbose = True)
     store_quota_in_cache(scopus_results)
     paper_results = scopus_results.results
     new_results =[]
@@ -323,14 +374,15 @@ async def scopus_search_on_query(
 
 async def get_scopus_query_no_requests(
     query: ScopusSearchQuery,
-    client: ClientSession,
+    client: NewAsyncClient,
     view: str,
     api_key: str,
     institution_token: str
 ) -> int:
     create_config(api_key, institution_token)
+    from pybliometrics.scopus import ScopusSearch
     term = query_to_term(query.dict()['__root__'])
-    request_search = ScopusSearch(term, download = False, view = view)
+    request_search = await run_scopus_search(client, Endpoint.SCOPUS_SEARCH, ScopusSearch, term, download = False, view = view)
     store_quota_in_cache(request_search)
     if view == 'COMPLETE':
         return request_search.get_results_size()//Length.SCOPUS_COMPLETE_LENGTH +2
@@ -345,13 +397,14 @@ async def get_scopus_query_remaining_in_cache() -> int:
 
 async def author_search_on_query(
     query: ScopusAuthorSearchQuery,
-    client: ClientSession,
+    client: NewAsyncClient,
     api_key: str,
     institution_token: str
 ) -> List[ScopusAuthorSearchResult]:
     create_config(api_key, institution_token)
+    from pybliometrics.scopus import AuthorSearch
     term = query_to_term(query.dict()['__root__'])
-    author_results = AuthorSearch(term, verbose = True)
+    author_results = await run_scopus_search(client, Endpoint.AUTHOR_SEARCH, AuthorSearch, term, verbose = True)
     store_quota_in_cache(author_results)
     authors = author_results.authors
     new_authors =[]
@@ -363,13 +416,14 @@ async def author_search_on_query(
 
 async def get_author_query_no_requests(
     query: ScopusAuthorSearchQuery,
-    client: ClientSession,
+    client: NewAsyncClient,
     api_key: str,
     institution_token: str
 ) -> int:
     create_config(api_key, institution_token)
+    from pybliometrics.scopus import AuthorSearch
     term = query_to_term(query.dict()['__root__'])
-    request_search = AuthorSearch(term, download = False)
+    request_search = await run_scopus_search(client, Endpoint.AUTHOR_SEARCH, AuthorSearch, term, download = False)
     store_quota_in_cache(request_search)
     return request_search.get_results_size()//Length.AUTHOR_LENGTH +2
 
@@ -381,13 +435,14 @@ async def get_author_query_remaining_in_cache() -> int:
 
 async def affiliation_search_on_query(
     query: AffiliationSearchQuery,
-    client: ClientSession,
+    client: NewAsyncClient,
     api_key: str,
     institution_token: str
 ) -> List[AffiliationSearchResult]:
     create_config(api_key, institution_token)
+    from pybliometrics.scopus import AffiliationSearch
     term = query_to_term(query.dict()['__root__'])
-    affil_results = AffiliationSearch(term, verbose = True)
+    affil_results = await run_scopus_search(client, Endpoint.AFFILIATION_SEARCH, AffiliationSearch, term, verbose = True)
     store_quota_in_cache(affil_results)
     affiliations = affil_results.affiliations
     new_affiliations =[]
@@ -399,13 +454,14 @@ async def affiliation_search_on_query(
 
 async def get_affiliation_query_no_requests(
     query: AffiliationSearchQuery,
-    client: ClientSession,
+    client: NewAsyncClient,
     api_key: str,
     institution_token: str
 ) -> int:
     create_config(api_key, institution_token)
+    from pybliometrics.scopus import AffiliationSearch
     term = query_to_term(query.dict()['__root__'])
-    request_search = AffiliationSearch(term, download = False)
+    request_search = await run_scopus_search(client, Endpoint.AFFILIATION_SEARCH, AffiliationSearch, term, download = False)
     store_quota_in_cache(request_search)
     return request_search.get_results_size()//Length.AFFIL_LENGTH +2
 
@@ -8,3 +8,12 @@ class Allowance:
     SCOPUS_START_ALLOWANCE = 20000
     AUTH_START_ALLOWANCE = 5000
     AFFIL_START_ALLOWANCE = 5000
+class Endpoint:
+    HOST = 'api.elsevier.com'
+    SCOPUS_SEARCH = 'https://api.elsevier.com/content/search/scopus'
+    AUTHOR_SEARCH = 'https://api.elsevier.com/content/search/author'
+    AFFILIATION_SEARCH = 'https://api.elsevier.com/content/search/affiliation'
+class RateLimit:
+    SCOPUS_SEARCH = 9
+    AUTHOR_SEARCH = 2
+    AFFILIATION_SEARCH = 6
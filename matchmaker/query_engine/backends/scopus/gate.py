@@ -0,0 +1,34 @@
+# Imported only once a Scopus search is run, as it loads pybliometrics
+import asyncio
+from contextvars import ContextVar
+import importlib
+from typing import Any, Callable, Coroutine, Optional, Tuple
+
+# The loop to take quota on and how, for the pybliometrics requests made by
+# the current search. asyncio.to_thread copies it into the search's thread
+PageGate = Tuple[asyncio.AbstractEventLoop, Callable[[], Coroutine[Any, Any, object]]]
+current_gate: ContextVar[Optional[PageGate]] = ContextVar('current_gate', default = None)
+
+
+class GatedGetContent:
+    """Waits on the event loop for quota before fetching each page."""
+    get_content: Callable[..., Any]
+
+    def __init__(self, get_content: Callable[..., Any]):
+        self.get_content = get_content
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        gate = current_gate.get()
+        if gate is not None:
+            loop, wait_for_quota = gate
+            asyncio.run_coroutine_threadsafe(wait_for_quota(), loop).result()
+        return self.get_content(*args, **kwargs)
+
+
+def install_gate():
+    # The searches fetch every page through the get_content their base class
+    # imported. It sends with requests.get up to pybliometrics 3.3 and with a
+    # module level session from 3.4, so it is gated here rather than either
+    base = importlib.import_module('pybliometrics.scopus.superclasses.base')
+    if not isinstance(base.get_content, GatedGetContent):
+        base.get_content = GatedGetContent(base.get_content)
@@ -1,10 +1,10 @@
 import csv
 import time
-from pybliometrics.scopus.utils.constants import DEFAULT_PATHS
 from datetime import datetime
 
 # Quote cache invariant - the reset time is the same throughout the file
 def store_quota_in_cache(results):
+    from pybliometrics.scopus.utils.constants import DEFAULT_PATHS
     def store_quota_in_cache_inner(search_name: str, remaining: float, reset: float):
         if search_name not in DEFAULT_PATHS:
             raise NotImplementedError # TODO Implement
@@ -40,6 +40,7 @@ def store_quota_in_cache(results):
         store_quota_in_cache_inner(search_name, remaining, reset)
 
 def _get_quota_in_cache_inner(search_name: str, index:int) -> str:
+    from pybliometrics.scopus.utils.constants import DEFAULT_PATHS
     if search_name not in DEFAULT_PATHS:
         raise NotImplementedError # TODO Implement
     path_new = str(DEFAULT_PATHS[search_name]) + '/quota_cache.csv'
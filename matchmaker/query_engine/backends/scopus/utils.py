@@ -1,9 +1,10 @@
-from pybliometrics.scopus.utils.constants import DEFAULT_PATHS
-from pybliometrics.scopus.utils.startup import config, CONFIG_FILE
-
 # Edited from pybliometrics
 def create_config(key, token = None):
     """Initiates process to generate configuration file."""
+    # pybliometrics reads its configuration on import, so it is only
+    # imported once a Scopus query is actually made
+    from pybliometrics.scopus.utils.constants import DEFAULT_PATHS
+    from pybliometrics.scopus.utils.startup import config, CONFIG_FILE
     #if CONFIG_FILE.exists():
     # Set directories
     if not config.has_section('Directories'):
@@ -1,4 +1,4 @@
-from typing import Dict, Generic, List, Optional, Tuple, TypeVar, Union
+from typing import TYPE_CHECKING, Any, Dict, Generic, List, Optional, Tuple, TypeVar, Union
 from typing import Dict, Generic, TypeVar, Union
 
 from matchmaker.query_engine.types.selector import (
@@ -18,6 +18,10 @@ from pydantic import BaseModel
 SelectorType = TypeVar('SelectorType', bound = BaseSelector)
 
 class BaseData(BaseModel, Generic[SelectorType]):
+    if TYPE_CHECKING:
+        # The fields are only known once a model is generated from a selector
+        def __getattr__(self, name: str) -> Any: ...
+
     @classmethod
     def generate_model_from_selector(
         cls, 
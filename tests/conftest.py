@@ -1,5 +1,10 @@
+import asyncio
+import json
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 from matchmaker.query_engine.backends import exceptions
 from matchmaker.query_engine.backends.pubmed import PubmedBackend
+from matchmaker.query_engine.backends.pubmed.constants import Endpoint
 from matchmaker.query_engine.backends.scopus import ScopusBackend
 import pytest
 
@@ -59,3 +64,159 @@ async def pubmed_author_engine(pubmed_api_key):
 async def pubmed_institution_engine(pubmed_api_key):
     backend = PubmedBackend(pubmed_api_key)
     return backend.institution_search_engine()
+
+
+def make_article(pmid):
+    return f'''
+<PubmedArticle>
+  <MedlineCitation>
+    <PMID>{pmid}</PMID>
+    <Article>
+      <Journal>
+        <JournalIssue><PubDate><Year>2020</Year></PubDate></JournalIssue>
+        <Title>Journal of Tests</Title>
+        <ISOAbbreviation>J Tests</ISOAbbreviation>
+      </Journal>
+      <ArticleTitle>Paper {pmid}</ArticleTitle>
+      <AuthorList>
+        <Author>
+          <LastName>Smith</LastName><ForeName>Jane</ForeName><Initials>J</Initials>
+          <AffiliationInfo><Affiliation>University of Bristol, UK</Affiliation></AffiliationInfo>
+        </Author>
+        <Author><CollectiveName>Test Consortium</CollectiveName></Author>
+      </AuthorList>
+    </Article>
+  </MedlineCitation>
+  <PubmedData>
+    <ArticleIdList>
+      <ArticleId IdType="pubmed">{pmid}</ArticleId>
+      <ArticleId IdType="doi">10.1000/{pmid}</ArticleId>
+    </ArticleIdList>
+  </PubmedData>
+</PubmedArticle>'''
+
+def make_article_set(pmids):
+    return (
+        '<?xml version="1.0" ?>\n<!DOCTYPE PubmedArticleSet>\n<PubmedArticleSet>'
+        + ''.join(make_article(pmid) for pmid in pmids)
+        + '</PubmedArticleSet>'
+    ).encode('utf8')
+
+class FakeEUtils:
+    """
+    A local stand-in for the E-utilities. A search matches `ids`, led by any
+    `new_ids` except within a date window, `links` gives the ids each paper
+    is linked to under each elink linkname, and records are made up from
+    the ids alone.
+    """
+    def __init__(self, monkeypatch, ids = ('1', '2'), links = None, delay = 0.05, missing = ()):
+        self.monkeypatch = monkeypatch
+        self.ids = list(ids)
+        self.new_ids = []
+        self.links = links or {}
+        self.delay = delay
+        self.missing = set(missing)
+        self.requests = []
+        self.fetched = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.server = TestServer(self.app())
+
+    @property
+    def searches(self):
+        return [query for endpoint, query in self.requests if endpoint == 'esearch']
+
+    def matching_ids(self, query):
+        # Only papers added since the last sync fall in a date window
+        return self.new_ids if 'mindate' in query else self.new_ids + self.ids
+
+    def requested_ids(self, request):
+        if 'WebEnv' in request.query:
+            retstart = int(request.query['retstart'])
+            return self.matching_ids(self.searches[-1])[retstart:retstart + int(request.query['retmax'])]
+        return request.query['id'].split(',')
+
+    async def track(self, endpoint, request):
+        self.requests.append((endpoint, dict(request.query)))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+
+    async def esearch(self, request):
+        await self.track('esearch', request)
+        ids = self.matching_ids(request.query)
+        id_list = ''.join(f'<Id>{i}</Id>' for i in ids)
+        return web.Response(text = (
+            f'<eSearchResult><Count>{len(ids)}</Count><RetMax>{len(ids)}</RetMax>'
+            f'<RetStart>0</RetStart><QueryKey>1</QueryKey><WebEnv>env</WebEnv>'
+            f'<IdList>{id_list}</IdList></eSearchResult>'
+        ))
+
+    async def efetch(self, request):
+        await self.track('efetch', request)
+        ids = self.requested_ids(request)
+        self.fetched.extend(ids)
+        return web.Response(body = make_article_set(ids), content_type = 'text/xml')
+
+    async def esummary(self, request):
+        await self.track('esummary', request)
+        ids = self.requested_ids(request)
+        result = {'uids': ids}
+        for i in ids:
+            if i in self.missing:
+                result[i] = {'uid': i, 'error': 'cannot get document summary'}
+                continue
+            result[i] = {
+                'uid': i,
+                'pubdate': '2020 Jan 5',
+                'source': 'J Test',
+                'fulljournalname': 'Journal of Testing',
+                'title': f'Paper {i}',
+                'authors': [
+                    {'name': 'Smith JA', 'authtype': 'Author'},
+                    {'name': 'Test Consortium', 'authtype': 'CollectiveName'}
+                ],
+                'articleids': [
+                    {'idtype': 'pubmed', 'value': i},
+                    {'idtype': 'doi', 'value': f'10.1000/{i}'}
+                ]
+            }
+        return web.Response(text = json.dumps({'result': result}), content_type = 'application/json')
+
+    async def elink(self, request):
+        await self.track('elink', request)
+        links = self.links[request.query['linkname']]
+        link_sets = ''
+        for pubmed_id in request.query.getall('id'):
+            link_ids = ''.join(f'<Link><Id>{i}</Id></Link>' for i in links[pubmed_id])
+            link_sets += (
+                f'<LinkSet><DbFrom>pubmed</DbFrom><IdList><Id>{pubmed_id}</Id></IdList>'
+                f'<LinkSetDb><DbTo>pubmed</DbTo>{link_ids}</LinkSetDb></LinkSet>'
+            )
+        return web.Response(text = f'<eLinkResult>{link_sets}</eLinkResult>')
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/esearch.fcgi', self.esearch)
+        app.router.add_get('/efetch.fcgi', self.efetch)
+        app.router.add_get('/elink.fcgi', self.elink)
+        app.router.add_get('/esummary.fcgi', self.esummary)
+        return app
+
+    async def start(self):
+        await self.server.start_server()
+        self.monkeypatch.setattr(Endpoint, 'PREFIX', str(self.server.make_url('/')))
+
+    async def close(self):
+        await self.server.close()
+
+@pytest.fixture
+def article_set():
+    return make_article_set
+
+@pytest.fixture
+def fake_eutils(monkeypatch):
+    def make(**options):
+        return FakeEUtils(monkeypatch, **options)
+    return make
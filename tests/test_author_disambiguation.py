@@ -0,0 +1,99 @@
+from matchmaker.query_engine.backends.pubmed.api import PubmedIndividual
+from matchmaker.query_engine.backends.pubmed.disambiguation import (
+    AuthorBlocks,
+    UnionFind,
+    authors_match,
+    cluster_authors,
+)
+from matchmaker.query_engine.backends.pubmed.processors import AuthorRow
+
+def make_author(fore_name, institution, proc_institution):
+    return AuthorRow(
+        name = PubmedIndividual(
+            last_name = 'Smith', fore_name = fore_name, initials = fore_name[0], institution = institution
+        ),
+        institution = institution,
+        proc_institution = proc_institution
+    )
+
+def pairwise_clusters(authors):
+    # Connected components of the match rule, comparing every pair
+    sets = UnionFind(len(authors))
+    for i, author1 in enumerate(authors):
+        for j, author2 in enumerate(authors):
+            if authors_match(author1, author2):
+                sets.union(i, j)
+    groups = {}
+    for i, author in enumerate(authors):
+        groups.setdefault(sets.find(i), []).append(author)
+    return list(groups.values())
+
+def assert_blocks_cover_matches(authors):
+    assert cluster_authors(authors) == pairwise_clusters(authors)
+    blocks = AuthorBlocks(authors)
+    for author1 in authors:
+        candidates = [authors[i] for i in blocks.candidates(author1)]
+        for author2 in authors:
+            if authors_match(author1, author2):
+                assert any(author2 is candidate for candidate in candidates)
+
+class TestAuthorDisambiguation:
+    def test_union_find(self):
+        sets = UnionFind(4)
+        sets.union(0, 1)
+        sets.union(3, 1)
+        assert sets.find(0) == sets.find(3)
+        assert sets.find(2) != sets.find(0)
+
+    def test_clusters(self):
+        bristol = make_author('Jane', 'Bristol BS8 1TH', [('bristol', 'city'), ('bs8 1th', 'postcode')])
+        bristol_lab = make_author('John', 'Lab, Bristol BS8 1TH', [('lab', 'house'), ('bs8 1th', 'postcode')])
+        oxford = make_author('Jane', 'Oxford OX1 2JD', [('oxford', 'city'), ('ox1 2jd', 'postcode')])
+        unaffiliated = make_author('Ann', None, None)
+        also_unaffiliated = make_author('Tom', None, None)
+        clusters = cluster_authors([bristol, oxford, unaffiliated, bristol_lab, also_unaffiliated])
+        assert clusters == [[bristol, bristol_lab], [oxford], [unaffiliated, also_unaffiliated]]
+
+    def test_shared_parts_without_postcode_or_house(self):
+        parts = [('bristol', 'city'), ('avon', 'state_district'), ('england', 'state'), ('uk', 'country')]
+        authors = [
+            make_author('Jane', 'Bristol, Avon, England, UK', parts),
+            make_author('John', 'Clifton, Bristol, Avon, England, UK', [('clifton', 'suburb'), *parts]),
+            make_author('Ann', 'Bath, Avon, England, UK', [('bath', 'city'), *parts[1:]]),
+        ]
+        assert_blocks_cover_matches(authors)
+        assert len(cluster_authors(authors)) == 2
+
+    def test_house_names_within_each_other(self):
+        authors = [
+            make_author('Jane', 'Oxford', [('oxford', 'house')]),
+            make_author('John', 'Oxfordshire', [('oxfordshire', 'house')]),
+            make_author('Ann', 'School of Chemistry', [('school of chemistry', 'house')]),
+            make_author('Tom', 'Chemistry', [('chemistry', 'house')]),
+            make_author('Kim', 'Physics', [('physics', 'house')]),
+        ]
+        assert_blocks_cover_matches(authors)
+        assert len(cluster_authors(authors)) == 3
+        # Matches of authors from outside the index are found too
+        blocks = AuthorBlocks(authors)
+        assert blocks.candidates(make_author('Sam', 'Chem', [('chem', 'house')])) == [2, 3]
+        assert 3 in blocks.candidates(make_author('Lee', 'Chemistry Lab', [('chemistry lab', 'house')]))
+
+    def test_unprocessed_affiliations(self):
+        authors = [
+            make_author('Jane', 'Somewhere', None),
+            make_author('John', 'Elsewhere', None),
+            make_author('Ann', None, None),
+        ]
+        assert_blocks_cover_matches(authors)
+        assert len(cluster_authors(authors)) == 1
+
+    def test_matches_through_a_later_member_of_a_cluster(self):
+        # b matches both, but a and c do not match each other
+        authors = [
+            make_author('Jane', 'ABC University', [('abc university', 'house')]),
+            make_author('John', 'University', [('university', 'house')]),
+            make_author('Ann', 'University of X', [('university of x', 'house')]),
+        ]
+        assert_blocks_cover_matches(authors)
+        assert cluster_authors(authors) == [authors]
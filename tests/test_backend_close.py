@@ -0,0 +1,33 @@
+import asyncio
+import threading
+import pytest
+from matchmaker.query_engine.backends import SessionManager
+from matchmaker.query_engine.backends.expanded_pubmed_meta import ExpandedPubmedMeta
+from matchmaker.query_engine.backends.pubmed import PaperSearchQueryEngine, PubmedBackend
+
+@pytest.mark.asyncio
+class TestBackendClose:
+    async def test_meta_closes_wrapped_backend(self):
+        pubmed_backend = PubmedBackend('key')
+        async with ExpandedPubmedMeta(pubmed_backend):
+            client = await pubmed_backend.session_manager.get_client()
+        assert client.closed
+
+    async def test_standalone_engine_closes_its_sessions(self):
+        async with PaperSearchQueryEngine('key') as engine:
+            client = await engine.session_manager.get_client()
+        assert client.closed
+
+    async def test_closes_session_made_on_another_loop(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target = loop.run_forever)
+        thread.start()
+        try:
+            manager = SessionManager()
+            client = asyncio.run_coroutine_threadsafe(manager.get_client(), loop).result()
+            await manager.close()
+            assert client.closed
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
@@ -0,0 +1,38 @@
+import pytest
+from matchmaker.query_engine.backends import RateLimiter
+from matchmaker.query_engine.backends.budget import BudgetRegistry
+from matchmaker.query_engine.backends.pubmed import (
+    PaperSearchQueryEngine,
+    PubmedBackend,
+    get_pubmed_budget,
+)
+
+@pytest.mark.asyncio
+class TestBudgetRegistry:
+    async def test_budgets_are_shared_per_family_and_key(self):
+        registry = BudgetRegistry()
+        budget = registry.get('pubmed', 'key', lambda: RateLimiter(max_requests_per_second = 9))
+        assert registry.get('pubmed', 'key', RateLimiter) is budget
+        assert registry.get('pubmed', 'other', RateLimiter) is not budget
+        assert registry.get('scopus', 'key', RateLimiter) is not budget
+
+    async def test_backends_and_engines_draw_from_one_budget(self):
+        registry = BudgetRegistry()
+        first = PubmedBackend('key', budget_registry = registry)
+        second = PubmedBackend('key', budget_registry = registry)
+        assert first.rate_limiter is second.rate_limiter
+        assert first.scheduler is second.scheduler
+        engine = PaperSearchQueryEngine('global-key')
+        assert engine.rate_limiter is get_pubmed_budget('global-key').rate_limiter
+
+    async def test_utilization_report(self):
+        registry = BudgetRegistry()
+        budget = registry.get('pubmed', 'key', lambda: RateLimiter(max_requests_per_second = 10))
+        for _ in range(5):
+            await budget.rate_limiter.rate_limit()
+        report = registry.utilization(window = 10)
+        assert len(report) == 1
+        (name, usage), = report.items()
+        assert 'key' not in name
+        assert usage['rate_limits']['default']['throughput'] == 0.5
+        assert usage['concurrency']['background']['active'] == 0
@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from matchmaker.query_engine.backends import NewAsyncClient, RateLimiter
+from matchmaker.query_engine.backends.coalesce import SingleFlight, request_key
+from matchmaker.query_engine.backends.scheduler import (
+    Priority,
+    RequestScheduler,
+    current_priority,
+    priority_scope,
+)
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    async def test_concurrent_calls_share_one_result(self):
+        single_flight = SingleFlight()
+        calls = []
+        async def factory():
+            calls.append(None)
+            await asyncio.sleep(0.01)
+            return object()
+        results = await asyncio.gather(*[single_flight.do('key', factory) for _ in range(5)])
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert single_flight.in_flight == 0
+
+    async def test_exceptions_are_shared(self):
+        single_flight = SingleFlight()
+        async def factory():
+            await asyncio.sleep(0.01)
+            raise ValueError('failed')
+        results = await asyncio.gather(
+            *[single_flight.do('key', factory) for _ in range(3)],
+            return_exceptions = True
+        )
+        assert all(isinstance(result, ValueError) for result in results)
+
+    async def test_joiners_outlive_a_cancelled_call(self):
+        scheduler = RequestScheduler({Priority.BACKGROUND: 1})
+        single_flight = SingleFlight()
+        calls = []
+        async def factory():
+            async with scheduler.slot():
+                calls.append(None)
+                return 'done'
+        with priority_scope(Priority.BACKGROUND):
+            async with scheduler.slot():
+                first = asyncio.ensure_future(single_flight.do('key', factory))
+                joiner = asyncio.ensure_future(single_flight.do('key', factory))
+                await asyncio.sleep(0.01)
+                # Cancels the call's queued request, which the first caller made
+                assert scheduler.cancel_queued(Priority.BACKGROUND) == 1
+                await asyncio.sleep(0.01)
+        results = await asyncio.gather(first, joiner, return_exceptions = True)
+        assert isinstance(results[0], asyncio.CancelledError)
+        assert results[1] == 'done'
+        assert len(calls) == 1
+
+    async def test_more_urgent_callers_do_not_wait_on_a_call(self):
+        single_flight = SingleFlight()
+        release = asyncio.Event()
+        async def factory():
+            await release.wait()
+            return current_priority.get()
+        with priority_scope(Priority.BACKGROUND):
+            background = asyncio.ensure_future(single_flight.do('key', factory))
+        with priority_scope(Priority.INTERACTIVE):
+            interactive = asyncio.ensure_future(single_flight.do('key', factory))
+        # Later callers join the more urgent call
+        normal = asyncio.ensure_future(single_flight.do('key', factory))
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(background, interactive, normal) == \
+            [Priority.BACKGROUND, Priority.INTERACTIVE, Priority.INTERACTIVE]
+
+    async def test_request_key_is_normalised(self):
+        assert request_key('get', 'https://Example.com/a?b=2&a=1') == \
+            request_key('GET', 'https://example.com/a?a=1&b=2')
+        assert request_key('POST', 'https://example.com/', {'id': ['1', '2']}) != \
+            request_key('POST', 'https://example.com/', {'id': ['1', '3']})
+
+    async def test_client_coalesces_identical_requests(self):
+        calls = {'count': 0}
+        async def handler(request):
+            calls['count'] += 1
+            await asyncio.sleep(0.05)
+            return web.Response(text = 'ok')
+        app = web.Application()
+        app.router.add_get('/esearch.fcgi', handler)
+        server = TestServer(app)
+        await server.start_server()
+        async with NewAsyncClient(rate_limiter = RateLimiter(max_requests_per_second = 100)) as client:
+            url = server.make_url('/esearch.fcgi?term=a')
+            outputs = await asyncio.gather(*[client.get(url) for _ in range(4)])
+            assert [await output.text() for output in outputs] == ['ok'] * 4
+        assert calls['count'] == 1
+        await server.close()
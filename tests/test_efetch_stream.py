@@ -0,0 +1,204 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from xml.etree.ElementTree import ParseError
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from matchmaker.query_engine.backends import NewAsyncClient, RateLimiter
+from matchmaker.query_engine.backends.retry import RetryPolicy
+from matchmaker.query_engine.backends.pubmed.constants import Endpoint
+from matchmaker.query_engine.backends.pubmed.api import (
+    AbstractItem,
+    EFetchStreamParser,
+    PubmedEFetchData,
+    PubmedEFetchQuery,
+    PubmedIndividual,
+    efetch_from_record,
+    efetch_on_id_list,
+    efetch_record,
+    parse_efetch_result,
+)
+
+@pytest.fixture
+def efetch_server(monkeypatch, article_set):
+    # Serves efetch with `handler`, or by default with the articles for the
+    # requested ids, for as long as the context is open
+    async def serve_articles(request):
+        return web.Response(body = article_set(request.query['id'].split(',')), content_type = 'text/xml')
+    @asynccontextmanager
+    async def serve(handler = serve_articles, method = 'GET'):
+        app = web.Application()
+        app.router.add_route(method, '/efetch.fcgi', handler)
+        server = TestServer(app)
+        await server.start_server()
+        monkeypatch.setattr(Endpoint, 'PREFIX', str(server.make_url('/')))
+        try:
+            yield server
+        finally:
+            await server.close()
+    return serve
+
+@pytest.mark.asyncio
+class TestEFetchStream:
+    async def test_articles_are_emitted_as_they_close(self, article_set):
+        body = article_set(['1', '2', '3'])
+        parser = EFetchStreamParser()
+        papers = []
+        emitted = []
+        for start in range(0, len(body), 100):
+            papers.extend(parser.feed(body[start:start + 100]))
+            emitted.append(len(papers))
+        papers.extend(parser.close())
+        assert [paper.paper_id.pubmed for paper in papers] == ['1', '2', '3']
+        assert emitted[0] == 0 and 0 < emitted[len(emitted) // 2] < 3
+        assert papers[0].title == 'Paper 1'
+        assert papers[0].year == 2020
+        assert papers[0].paper_id.doi == '10.1000/1'
+        assert len(papers[0].author_list) == 2
+        # Finished articles are dropped from the tree
+        assert parser._root is not None and len(parser._root) == 0
+
+    async def test_records_round_trip(self, article_set):
+        paper = parse_efetch_result(article_set(['1']))[0]
+        paper = paper.copy(update = {
+            'keywords': ['testing'],
+            'topics': [{'descriptor': 'Humans', 'qualifier': ['methods', 'ethics']}],
+            'abstract': [AbstractItem(label = 'AIMS', nlm_category = 'OBJECTIVE', text = 'To test')]
+        })
+        paper = PubmedEFetchData.parse_obj(paper.dict())
+        rebuilt = efetch_from_record(efetch_record(paper))
+        assert rebuilt == paper
+        assert rebuilt.abstract == [AbstractItem(label = 'AIMS', nlm_category = 'OBJECTIVE', text = 'To test')]
+        assert isinstance(rebuilt.author_list[0].__root__, PubmedIndividual)
+
+    async def test_efetch_streams_response(self, efetch_server):
+        async with efetch_server(), NewAsyncClient(
+            rate_limiter = RateLimiter(max_requests_per_second = 100)
+        ) as client:
+            papers = await efetch_on_id_list(
+                PubmedEFetchQuery(pubmed_id_list = [str(i) for i in range(50)]),
+                client
+            )
+        assert [paper.paper_id.pubmed for paper in papers] == [str(i) for i in range(50)]
+
+    async def test_efetch_parses_in_executor(self, efetch_server, article_set):
+        with ProcessPoolExecutor(max_workers = 2) as executor:
+            async with efetch_server(), NewAsyncClient(
+                rate_limiter = RateLimiter(max_requests_per_second = 100)
+            ) as client:
+                papers = await efetch_on_id_list(
+                    PubmedEFetchQuery(pubmed_id_list = [str(i) for i in range(50)]),
+                    client,
+                    chunk_size = 20,
+                    executor = executor
+                )
+        assert [paper.paper_id.pubmed for paper in papers] == [str(i) for i in range(50)]
+        author = papers[0].author_list[0].__root__
+        assert isinstance(author, PubmedIndividual) and author.last_name == 'Smith'
+        # The models rebuilt from the workers' records match a parse in process
+        assert papers == parse_efetch_result(article_set([str(i) for i in range(50)]))
+
+    async def test_efetch_fetches_chunks_and_retries_failed_chunk(self, efetch_server, article_set):
+        requests = []
+        async def handler(request):
+            pmids = request.query['id'].split(',')
+            requests.append(pmids[0])
+            body = article_set(pmids)
+            if pmids[0] == '20' and requests.count('20') == 1:
+                # Cut the body off part way through
+                body = body[:len(body) // 2]
+            return web.Response(body = body, content_type = 'text/xml')
+        async with efetch_server(handler), NewAsyncClient(
+            rate_limiter = RateLimiter(max_requests_per_second = 100),
+            retry_policy = RetryPolicy(base_delay = 0.01)
+        ) as client:
+            papers = await efetch_on_id_list(
+                PubmedEFetchQuery(pubmed_id_list = [str(i) for i in range(50)]),
+                client,
+                chunk_size = 10,
+                max_concurrent_chunks = 2
+            )
+        assert [paper.paper_id.pubmed for paper in papers] == [str(i) for i in range(50)]
+        assert sorted(requests) == sorted(['0', '10', '20', '20', '30', '40'])
+
+    async def test_efetch_retries_cut_off_bodies_under_the_retry_budget(self, efetch_server, article_set):
+        requests = []
+        async def handler(request):
+            requests.append(request.query['id'])
+            body = article_set(request.query['id'].split(','))
+            return web.Response(body = body[:len(body) // 2], content_type = 'text/xml')
+        async with efetch_server(handler), NewAsyncClient(
+            rate_limiter = RateLimiter(max_requests_per_second = 100),
+            retry_policy = RetryPolicy(max_attempts = 3, base_delay = 0.01)
+        ) as client:
+            with pytest.raises(ParseError):
+                await efetch_on_id_list(PubmedEFetchQuery(pubmed_id_list = ['1', '2']), client)
+            assert client.retry_policy.remaining_budget('efetch') == client.retry_policy.budget_per_endpoint - 2
+        assert len(requests) == 3
+
+    async def test_efetch_posts_chunks_too_long_for_a_url(self, efetch_server, article_set):
+        requests = []
+        async def handler(request):
+            assert 'id' not in request.query
+            pmids = (await request.post())['id'].split(',')
+            requests.append(len(pmids))
+            return web.Response(body = article_set(pmids), content_type = 'text/xml')
+        async with efetch_server(handler, 'POST'), NewAsyncClient(
+            rate_limiter = RateLimiter(max_requests_per_second = 100)
+        ) as client:
+            papers = await efetch_on_id_list(
+                PubmedEFetchQuery(pubmed_id_list = [str(i) for i in range(500)]),
+                client,
+                chunk_size = 250
+            )
+        assert [paper.paper_id.pubmed for paper in papers] == [str(i) for i in range(500)]
+        assert requests == [250, 250]
+
+    async def test_efetch_by_history_does_not_send_ids(self, efetch_server, article_set):
+        history = [str(i) for i in range(25)]
+        requests = []
+        async def handler(request):
+            assert 'id' not in request.query
+            assert request.query['WebEnv'] == 'env' and request.query['query_key'] == '1'
+            retstart = int(request.query['retstart'])
+            retmax = int(request.query['retmax'])
+            requests.append((retstart, retmax))
+            return web.Response(
+                body = article_set(history[retstart:retstart + retmax]),
+                content_type = 'text/xml'
+            )
+        async with efetch_server(handler), NewAsyncClient(
+            rate_limiter = RateLimiter(max_requests_per_second = 100)
+        ) as client:
+            papers = await efetch_on_id_list(
+                PubmedEFetchQuery(pubmed_id_list = history, web_env = 'env', query_key = '1'),
+                client,
+                chunk_size = 10
+            )
+        assert [paper.paper_id.pubmed for paper in papers] == history
+        assert sorted(requests) == [(0, 10), (10, 10), (20, 5)]
+
+    async def test_efetch_hands_over_each_chunk_as_it_arrives(self, efetch_server, article_set):
+        requests = []
+        async def handler(request):
+            pmids = request.query['id'].split(',')
+            requests.append(pmids[0])
+            return web.Response(body = article_set(pmids), content_type = 'text/xml')
+        chunks = []
+        async def on_chunk(papers):
+            chunks.append(([paper.paper_id.pubmed for paper in papers], len(requests)))
+        async with efetch_server(handler), NewAsyncClient(
+            rate_limiter = RateLimiter(max_requests_per_second = 100)
+        ) as client:
+            papers = await efetch_on_id_list(
+                PubmedEFetchQuery(pubmed_id_list = [str(i) for i in range(30)]),
+                client,
+                chunk_size = 10,
+                max_concurrent_chunks = 1,
+                on_chunk = on_chunk
+            )
+        assert sorted(pubmed_id for ids, _ in chunks for pubmed_id in ids) == sorted(
+            paper.paper_id.pubmed for paper in papers
+        )
+        # The first chunk is handed over before the last one has been requested
+        assert chunks[0][1] < 3
@@ -0,0 +1,28 @@
+from matchmaker.query_engine.backends.pubmed.api import ELinkStreamParser, parse_elink_result
+
+LINK_RESULT = (
+    b'<?xml version="1.0" encoding="UTF-8" ?>'
+    b'<eLinkResult>'
+    b'<LinkSet><DbFrom>pubmed</DbFrom><IdList><Id>1</Id></IdList>'
+    b'<LinkSetDb><DbTo>pubmed</DbTo><LinkName>pubmed_pubmed_refs</LinkName>'
+    b'<Link><Id>10</Id></Link><Link><Id>11</Id></Link></LinkSetDb></LinkSet>'
+    b'<LinkSet><DbFrom>pubmed</DbFrom><IdList><Id>2</Id></IdList>'
+    b'<LinkSetDb><DbTo>pubmed</DbTo><LinkName>pubmed_pubmed_refs</LinkName>'
+    b'<Link><Id>12</Id></Link></LinkSetDb></LinkSet>'
+    b'<LinkSet><DbFrom>pubmed</DbFrom><IdList><Id>3</Id></IdList></LinkSet>'
+    b'</eLinkResult>'
+)
+
+class TestELinkParser:
+    def test_parse(self):
+        assert parse_elink_result(LINK_RESULT) == {
+            '1': ['10', '11'],
+            '2': ['12'],
+            '3': None
+        }
+
+    def test_parse_in_chunks(self):
+        parser = ELinkStreamParser()
+        for i in range(0, len(LINK_RESULT), 7):
+            parser.feed(LINK_RESULT[i:i + 7])
+        assert parser.close() == parse_elink_result(LINK_RESULT)
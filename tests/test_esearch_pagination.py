@@ -0,0 +1,136 @@
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from matchmaker.query_engine.backends import NewAsyncClient, RateLimiter
+from matchmaker.query_engine.backends.pubmed.api import (
+    PubmedESearchQuery,
+    esearch_all_on_query,
+    esearch_pages_on_query,
+)
+from matchmaker.query_engine.backends.pubmed import PaperSearchQueryEngine, make_pubmed_response_cache
+from matchmaker.query_engine.backends.pubmed.constants import Endpoint, Estimate, Limit
+from matchmaker.query_engine.types.query import PaperSearchQuery
+
+COUNT = 25
+IDS = [str(1000 + i) for i in range(COUNT)]
+
+async def make_esearch(request):
+    retstart = int(request.query.get('retstart', 0))
+    retmax = int(request.query['retmax'])
+    ids = ''.join(f'<Id>{i}</Id>' for i in IDS[retstart:retstart + retmax])
+    history = ''
+    if request.query.get('usehistory') == 'y':
+        history = '<QueryKey>1</QueryKey><WebEnv>env</WebEnv>'
+    return web.Response(text = (
+        f'<eSearchResult><Count>{COUNT}</Count><RetMax>{retmax}</RetMax>'
+        f'<RetStart>{retstart}</RetStart>{history}<IdList>{ids}</IdList></eSearchResult>'
+    ))
+
+async def make_uilist(request):
+    assert request.query['WebEnv'] == 'env'
+    assert request.query['rettype'] == 'uilist'
+    retstart = int(request.query['retstart'])
+    retmax = int(request.query['retmax'])
+    return web.Response(text = '\n'.join(IDS[retstart:retstart + retmax]))
+
+@pytest.mark.asyncio
+class TestESearchPagination:
+    async def test_pages_cover_whole_result_set(self, monkeypatch):
+        app = web.Application()
+        app.router.add_get('/esearch.fcgi', make_esearch)
+        app.router.add_get('/efetch.fcgi', make_uilist)
+        server = TestServer(app)
+        await server.start_server()
+        monkeypatch.setattr(Endpoint, 'PREFIX', str(server.make_url('/')))
+        # Pages past this point have to come from the history server
+        monkeypatch.setattr(Limit, 'ESEARCH_MAX_RECORDS', 15)
+        query = PubmedESearchQuery.parse_obj({
+            'tag': 'title',
+            'operator': {'tag': 'equal', 'value': 'test'}
+        })
+        async with NewAsyncClient(rate_limiter = RateLimiter(max_requests_per_second = 100)) as client:
+            pages = [
+                page async for page in esearch_pages_on_query(query, client, page_size = 10)
+            ]
+            result = await esearch_all_on_query(query, client, page_size = 10)
+            limited = await esearch_all_on_query(query, client, page_size = 10, max_results = 12)
+        await server.close()
+        assert sorted(page.ret_start for page in pages) == [0, 10, 20]
+        assert pages[0].web_env == 'env' and pages[0].query_key == '1'
+        assert result.pubmed_id_list == IDS
+        assert result.count == COUNT
+        assert limited.pubmed_id_list == IDS[:12]
+
+    async def test_only_history_requests_miss_the_cache(self, monkeypatch, tmp_path):
+        requests = []
+        def recorded(handler):
+            async def record(request):
+                requests.append(dict(request.query))
+                return await handler(request)
+            return record
+        app = web.Application()
+        app.router.add_get('/esearch.fcgi', recorded(make_esearch))
+        app.router.add_get('/efetch.fcgi', recorded(make_uilist))
+        server = TestServer(app)
+        await server.start_server()
+        monkeypatch.setattr(Endpoint, 'PREFIX', str(server.make_url('/')))
+        # Only the last page has to come from the history server
+        monkeypatch.setattr(Limit, 'ESEARCH_MAX_RECORDS', 20)
+        query = PubmedESearchQuery.parse_obj({
+            'tag': 'title',
+            'operator': {'tag': 'equal', 'value': 'test'}
+        })
+        async with NewAsyncClient(
+            rate_limiter = RateLimiter(max_requests_per_second = 100),
+            response_cache = make_pubmed_response_cache(str(tmp_path / 'cache.sqlite'))
+        ) as client:
+            first = await esearch_all_on_query(query, client, page_size = 10)
+            first_requests = len(requests)
+            second = await esearch_all_on_query(query, client, page_size = 10)
+        await server.close()
+        assert first.pubmed_id_list == second.pubmed_id_list == IDS
+        # Two esearch pages, the search registered for the page past the
+        # record limit, and that page
+        assert first_requests == 4
+        # Only the history search and the page listed from it are repeated
+        repeated = requests[first_requests:]
+        assert [request.get('usehistory') for request in repeated] == ['y', None]
+        assert repeated[1]['rettype'] == 'uilist'
+
+    async def test_plan_from_count(self, monkeypatch):
+        counts = []
+        async def count_only(request):
+            assert request.query['rettype'] == 'count'
+            counts.append(request.query['term'])
+            return web.Response(text = '<eSearchResult><Count>25000</Count></eSearchResult>')
+        app = web.Application()
+        app.router.add_get('/esearch.fcgi', count_only)
+        server = TestServer(app)
+        await server.start_server()
+        monkeypatch.setattr(Endpoint, 'PREFIX', str(server.make_url('/')))
+        engine = PaperSearchQueryEngine(
+            'key',
+            rate_limiter = RateLimiter(max_requests_per_second = 100)
+        )
+        native_query = await engine.get_native_query(PaperSearchQuery.parse_obj({
+            'query': {'tag': 'title', 'operator': {'tag': 'equal', 'value': 'test'}},
+            'selector': {
+                'title': True,
+                'abstract': True,
+                'references': {'paper_id': {'doi': True}}
+            }
+        }))
+        await engine.close()
+        await server.close()
+        assert len(counts) == 1
+        # One esearch page and two listed from the history server, 125 efetch
+        # and 125 elink chunks of 200, then the estimated references in
+        # efetch chunks of 200
+        references = 25000 * Estimate.REFERENCES_PER_PAPER
+        assert native_query.metadata == {
+            'esearch': 1,
+            'efetch': 2 + 125 + references // 200,
+            'elink': 125,
+            'esummary': 0
+        }
+        assert native_query.expected_bytes['efetch'] > native_query.expected_bytes['elink'] > 0
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, Sequence
+import pytest
+
+# Loaded only once a query that needs them is run
+HEAVY_MODULES = ['postal', 'gensim', 'scipy', 'pybliometrics']
+MODULES = [
+    'matchmaker.query_engine',
+    'matchmaker.query_engine.backends.pubmed',
+    'matchmaker.query_engine.backends.scopus',
+    'matchmaker.query_engine.backends.expanded_pubmed_meta',
+    'matchmaker.query_engine.backends.optimised_scopus_meta',
+    'matchmaker.matching_engine',
+]
+# Generous enough not to fail on a slow machine, but well short of the
+# seconds gensim alone takes to import
+IMPORT_BUDGET_SECONDS = 3
+
+def cold_import(module: str, path: Sequence[str] = ()) -> Dict[str, Any]:
+    if module == 'matchmaker.matching_engine':
+        pytest.importorskip('numpy')
+        pytest.importorskip('tabulate')
+    script = (
+        'import json, sys, time\n'
+        'started = time.perf_counter()\n'
+        f'import {module}\n'
+        'seconds = time.perf_counter() - started\n'
+        'print(json.dumps({"seconds": seconds, "modules": sorted(sys.modules)}))\n'
+    )
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join([*path, *sys.path])}
+    out = subprocess.run(
+        [sys.executable, '-c', script], capture_output = True, check = True, env = env
+    )
+    return json.loads(out.stdout.decode('utf8').splitlines()[-1])
+
+@pytest.fixture
+def heavy_stubs(tmp_path):
+    # Empty packages found ahead of the real ones, so that an eager import of
+    # a heavy dependency shows up whether or not it is installed
+    for module in HEAVY_MODULES:
+        (tmp_path / module).mkdir()
+        (tmp_path / module / '__init__.py').write_text('')
+    return str(tmp_path)
+
+class TestImportTime:
+    @pytest.mark.parametrize('module', MODULES)
+    def test_loads_no_heavy_dependencies(self, module, heavy_stubs):
+        loaded = {name.split('.')[0] for name in cold_import(module, [heavy_stubs])['modules']}
+        assert loaded.isdisjoint(HEAVY_MODULES)
+
+    @pytest.mark.parametrize('module', MODULES)
+    def test_within_budget(self, module):
+        assert cold_import(module)['seconds'] < IMPORT_BUDGET_SECONDS
@@ -0,0 +1,132 @@
+from typing import Dict
+import pytest
+from matchmaker.query_engine.backends.pubmed import native_from_fetched, processors
+from matchmaker.query_engine.backends.pubmed.api import parse_efetch_result
+from matchmaker.query_engine.backends.pubmed.processors import (
+    InstitutionCache,
+    InstitutionParserPool,
+    ProcessedAuthor,
+    ProcessedInstitution,
+    author_rows,
+    build_author_table,
+    process_institution,
+    process_institutions,
+    set_institution_cache,
+)
+
+@pytest.fixture
+def parse_calls(monkeypatch):
+    # Stands in for libpostal, which takes seconds and gigabytes to load
+    calls = []
+    def fake_parse_address(address):
+        calls.append(address)
+        return [(address.strip().lower(), 'house')]
+    monkeypatch.setattr(processors, 'expand_address', lambda address: [address.strip().lower()])
+    monkeypatch.setattr(processors, 'parse_address', fake_parse_address)
+    set_institution_cache(None)
+    yield calls
+    set_institution_cache(None)
+
+@pytest.fixture
+def libpostal_calls(monkeypatch):
+    # The pool's workers parse with libpostal itself, so these tests need it
+    pytest.importorskip('postal')
+    calls = []
+    parse_address = processors.parse_address
+    def counting_parse_address(address):
+        calls.append(address)
+        return parse_address(address)
+    monkeypatch.setattr(processors, 'parse_address', counting_parse_address)
+    set_institution_cache(None)
+    yield calls
+    set_institution_cache(None)
+
+class TestInstitutionCache:
+    def test_memoized_in_process(self, parse_calls):
+        first = process_institution('University of Bristol, Bristol BS8 1TH')
+        assert first is not None
+        first.append(('mutated', 'house'))
+        second = process_institution('University of Bristol, Bristol BS8 1TH')
+        assert len(parse_calls) == 2
+        assert second is not None and ('mutated', 'house') not in second
+
+    def test_persisted_across_runs(self, parse_calls, tmp_path):
+        path = str(tmp_path / 'institutions.sqlite')
+        set_institution_cache(InstitutionCache(path))
+        processed = process_institution('University of Bristol, Bristol BS8 1TH')
+        # A fresh process starts with an empty in-process memo
+        set_institution_cache(InstitutionCache(path))
+        assert process_institution('University of Bristol, Bristol BS8 1TH') == processed
+        assert len(parse_calls) == 2
+
+    def test_new_version_invalidates(self, parse_calls, tmp_path):
+        path = str(tmp_path / 'institutions.sqlite')
+        set_institution_cache(InstitutionCache(path, version = 'old'))
+        process_institution('University of Bristol')
+        set_institution_cache(InstitutionCache(path, version = 'new'))
+        process_institution('University of Bristol')
+        assert len(parse_calls) == 2
+        assert InstitutionCache(path, version = 'old').get('University of Bristol') == (False, None)
+
+    def test_batched_lookups(self, tmp_path):
+        cache = InstitutionCache(str(tmp_path / 'institutions.sqlite'), version = 'test')
+        stored: Dict[str, ProcessedInstitution] = {
+            f'Department {i}': [(f'department {i}', 'house')] for i in range(1200)
+        }
+        stored['Nowhere'] = None
+        cache.put_many(stored)
+        found = cache.get_many([*stored, 'Unknown'])
+        assert found == stored
+        assert cache.get('Nowhere') == (True, None)
+
+    def test_version_follows_libpostal_data(self, tmp_path, monkeypatch):
+        data_dir = tmp_path / 'libpostal'
+        data_dir.mkdir()
+        (data_dir / 'address_parser.dat').write_bytes(b'model')
+        monkeypatch.setenv('LIBPOSTAL_DATA_DIR', str(data_dir))
+        version = processors.libpostal_version()
+        (data_dir / 'address_parser.dat').write_bytes(b'new model')
+        assert processors.libpostal_version() != version
+
+@pytest.mark.asyncio
+class TestProcessInstitutions:
+    async def test_cached_institutions_are_not_parsed_again(self, parse_calls, tmp_path):
+        path = str(tmp_path / 'institutions.sqlite')
+        set_institution_cache(InstitutionCache(path))
+        first = await process_institutions(['University of Bristol', 'University of Oxford'])
+        set_institution_cache(InstitutionCache(path))
+        assert await process_institutions(['University of Oxford', 'University of Bristol']) == first
+        assert len(parse_calls) == 2
+
+@pytest.mark.asyncio
+class TestInstitutionParserPool:
+    async def test_batches_distinct_institutions(self, libpostal_calls):
+        institutions = [f'Department {i % 5}, University of Bristol' for i in range(20)] + [None]
+        with InstitutionParserPool(max_workers = 2, batch_size = 2) as pool:
+            processed = await process_institutions(institutions, pool)
+        assert set(processed) == set(institutions[:5])
+        # Parsed in the workers, and memoized here afterwards
+        assert libpostal_calls == []
+        assert await process_institutions(institutions) == processed
+        assert libpostal_calls == []
+        # The same as parsing here
+        set_institution_cache(None)
+        assert await process_institutions(institutions) == processed
+
+@pytest.mark.asyncio
+class TestAuthorTable:
+    async def test_built_once_per_paper(self, parse_calls, article_set):
+        fetched = parse_efetch_result(article_set(['1', '2', '3']))
+        papers = [native_from_fetched(fetched[0], references = fetched[1:]), *fetched[1:]]
+        await build_author_table(papers)
+        # One affiliation of two sections, shared by every paper
+        assert len(parse_calls) == 2
+        rows = author_rows(papers[1])
+        assert rows[0].proc_institution is author_rows(papers[2])[0].proc_institution
+        assert rows[0].author() == ProcessedAuthor.parse_obj({
+            **papers[1].author_list[0].dict()['__root__'],
+            'proc_institution': process_institution('University of Bristol, UK')
+        })
+        await build_author_table(papers)
+        assert author_rows(papers[1]) is rows
+        assert len(parse_calls) == 2
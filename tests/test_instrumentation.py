@@ -0,0 +1,68 @@
+import json
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from matchmaker.query_engine.backends import NewAsyncClient, RateLimiter
+from matchmaker.query_engine.backends.instrumentation import (
+    Instrumentation,
+    JsonlSink,
+    LatencyAggregator,
+    RequestEvent,
+)
+from matchmaker.query_engine.backends.retry import RetryPolicy
+
+def make_event(endpoint, latency):
+    return RequestEvent(
+        method = 'GET',
+        url = 'https://a.org/' + endpoint,
+        endpoint = endpoint,
+        status = 200,
+        latency = latency,
+        bytes = 10,
+        retries = 0,
+        rate_limit_wait = 0,
+        queue_depth = 0,
+        timestamp = 0
+    )
+
+@pytest.mark.asyncio
+class TestInstrumentation:
+    async def test_aggregator_percentiles(self):
+        aggregator = LatencyAggregator()
+        for i in range(1, 101):
+            aggregator(make_event('efetch', i / 100))
+        summary = aggregator.summary()['efetch']
+        assert summary['requests'] == 100
+        assert summary['bytes'] == 1000
+        assert (summary['p50'], summary['p95'], summary['p99']) == (0.5, 0.95, 0.99)
+
+    async def test_client_emits_events(self, tmp_path):
+        calls = {'count': 0}
+        async def handler(request):
+            calls['count'] += 1
+            if calls['count'] == 1:
+                return web.Response(status = 503)
+            return web.Response(text = 'result')
+        app = web.Application()
+        app.router.add_get('/esearch.fcgi', handler)
+        server = TestServer(app)
+        await server.start_server()
+        aggregator = LatencyAggregator()
+        sink = JsonlSink(str(tmp_path / 'events.jsonl'))
+        async with NewAsyncClient(
+            rate_limiter = RateLimiter(max_requests_per_second = 100),
+            retry_policy = RetryPolicy(base_delay = 0.01),
+            instrumentation = Instrumentation([aggregator, sink])
+        ) as client:
+            await client.get(server.make_url('/esearch.fcgi?term=a&api_key=secret'))
+        await server.close()
+        sink.close()
+        summary = aggregator.summary()['esearch']
+        assert summary['requests'] == 1
+        assert summary['retries'] == 1
+        assert summary['bytes'] == len('result')
+        with open(tmp_path / 'events.jsonl') as f:
+            events = [json.loads(line) for line in f]
+        assert len(events) == 1
+        assert events[0]['status'] == 200
+        assert 'secret' not in events[0]['url']
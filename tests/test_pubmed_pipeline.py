@@ -0,0 +1,107 @@
+import pytest
+from matchmaker.query_engine.backends import RateLimiter
+from matchmaker.query_engine.backends.pubmed import PaperSearchQueryEngine
+from matchmaker.query_engine.types.query import PaperSearchQuery
+
+SEARCH_IDS = ['1', '2']
+LINKS = {
+    'pubmed_pubmed_refs': {'1': ['10', '11'], '2': ['11']},
+    'pubmed_pubmed_citedin': {'1': ['20'], '2': ['1']}
+}
+
+@pytest.mark.asyncio
+class TestPubmedPipeline:
+    async def test_branches_run_concurrently(self, fake_eutils):
+        eutils = fake_eutils(ids = SEARCH_IDS, links = LINKS)
+        await eutils.start()
+        engine = PaperSearchQueryEngine(
+            'key',
+            rate_limiter = RateLimiter(max_requests_per_second = 100)
+        )
+        sub_paper = {'paper_id': {'doi': True}, 'title': True}
+        results = await engine(PaperSearchQuery.parse_obj({
+            'query': {'tag': 'title', 'operator': {'tag': 'equal', 'value': 'test'}},
+            'selector': {
+                'paper_id': {'pubmed_id': True},
+                'title': True,
+                'references': sub_paper,
+                'cited_by': sub_paper
+            }
+        }))
+        await engine.close()
+        await eutils.close()
+        assert [paper.paper_id.pubmed_id for paper in results] == SEARCH_IDS
+        assert [ref.paper_id.doi for ref in results[0].references] == ['10.1000/10', '10.1000/11']
+        assert [cited.title for cited in results[1].cited_by] == ['Paper 1']
+        # The main fetch and both elinks all follow the search concurrently
+        assert eutils.max_in_flight >= 3
+
+    async def test_each_paper_fetched_once(self, fake_eutils):
+        eutils = fake_eutils(ids = SEARCH_IDS, links = LINKS)
+        await eutils.start()
+        engine = PaperSearchQueryEngine(
+            'key',
+            rate_limiter = RateLimiter(max_requests_per_second = 100)
+        )
+        sub_paper = {'paper_id': {'doi': True}, 'title': True}
+        results = await engine(PaperSearchQuery.parse_obj({
+            'query': {'tag': 'title', 'operator': {'tag': 'equal', 'value': 'test'}},
+            'selector': {
+                'title': True,
+                'abstract': True,
+                'references': sub_paper,
+                'cited_by': sub_paper
+            }
+        }))
+        await engine.close()
+        await eutils.close()
+        # '11' is referenced by both primary papers and '1' is itself a primary paper
+        assert sorted(eutils.fetched) == ['1', '10', '11', '2', '20']
+        assert [ref.title for ref in results[1].references] == ['Paper 11']
+        assert [cited.title for cited in results[1].cited_by] == ['Paper 1']
+
+    async def test_summary_fields_use_esummary(self, fake_eutils):
+        eutils = fake_eutils(ids = SEARCH_IDS, links = LINKS)
+        await eutils.start()
+        engine = PaperSearchQueryEngine(
+            'key',
+            rate_limiter = RateLimiter(max_requests_per_second = 100)
+        )
+        query = PaperSearchQuery.parse_obj({
+            'query': {'tag': 'title', 'operator': {'tag': 'equal', 'value': 'test'}},
+            'selector': {
+                'paper_id': {'doi': True},
+                'title': True,
+                'year': True,
+                'source_title': True,
+                'authors': {'preferred_name': {'surname': True}},
+                'references': {'paper_id': {'doi': True}, 'title': True}
+            }
+        })
+        native_query = await engine.get_native_query(query)
+        assert native_query.count_api_calls_by_method('esummary') == 2
+        assert native_query.count_api_calls_by_method('efetch') == 0
+        results = await engine(query)
+        await engine.close()
+        await eutils.close()
+        assert 'efetch' not in [endpoint for endpoint, _ in eutils.requests]
+        assert results[0].paper_id.doi == '10.1000/1'
+        assert results[0].year == 2020
+        assert results[0].source_title == 'Journal of Testing'
+        assert [author.preferred_name.surname for author in results[0].authors] == ['Smith', 'Test Consortium']
+        assert [ref.title for ref in results[1].references] == ['Paper 11']
+
+    async def test_papers_missing_from_esummary_are_skipped(self, fake_eutils):
+        eutils = fake_eutils(ids = SEARCH_IDS, links = LINKS, missing = ['2'])
+        await eutils.start()
+        engine = PaperSearchQueryEngine(
+            'key',
+            rate_limiter = RateLimiter(max_requests_per_second = 100)
+        )
+        results = await engine(PaperSearchQuery.parse_obj({
+            'query': {'tag': 'title', 'operator': {'tag': 'equal', 'value': 'test'}},
+            'selector': {'paper_id': {'pubmed_id': True}, 'title': True}
+        }))
+        await engine.close()
+        await eutils.close()
+        assert [paper.paper_id.pubmed_id for paper in results] == ['1']
@@ -0,0 +1,38 @@
+import pytest
+from matchmaker.query_engine.backends import RateLimiter
+from matchmaker.query_engine.backends.pubmed import PaperSearchQueryEngine
+from matchmaker.query_engine.backends.pubmed.store import PaperStore
+from matchmaker.query_engine.types.query import PaperSearchQuery
+
+@pytest.mark.asyncio
+class TestPubmedSync:
+    async def test_incremental_sync(self, fake_eutils, tmp_path):
+        eutils = fake_eutils(ids = ['2', '1'])
+        await eutils.start()
+        engine = PaperSearchQueryEngine(
+            'key',
+            rate_limiter = RateLimiter(max_requests_per_second = 100)
+        )
+        store = PaperStore(str(tmp_path / 'papers.sqlite'))
+        query = PaperSearchQuery.parse_obj({
+            'query': {'tag': 'title', 'operator': {'tag': 'equal', 'value': 'test'}},
+            'selector': {'title': True, 'abstract': True}
+        })
+
+        results = await engine.sync(query, store)
+        assert [paper.title for paper in results] == ['Paper 2', 'Paper 1']
+        assert 'mindate' not in eutils.searches[-1]
+
+        eutils.new_ids = ['3']
+        eutils.fetched = []
+        results = await engine.sync(query, store)
+        assert eutils.searches[-1]['datetype'] == 'mdat'
+        assert eutils.fetched == ['3']
+        assert [paper.title for paper in results] == ['Paper 3', 'Paper 2', 'Paper 1']
+
+        eutils.fetched = []
+        results = await engine.sync(query, store, full = True)
+        assert sorted(eutils.fetched) == ['1', '2', '3']
+        assert len(results) == 3
+        await engine.close()
+        await eutils.close()
@@ -0,0 +1,106 @@
+import asyncio
+import time
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from matchmaker.query_engine.backends import NewAsyncClient, RateLimiter, TokenBucket
+from matchmaker.query_engine.backends.scopus.api import run_scopus_search
+
+@pytest.mark.asyncio
+class TestTokenBucket:
+    async def test_burst_is_immediate(self):
+        bucket = TokenBucket(5, capacity = 5)
+        start = time.monotonic()
+        await asyncio.gather(*[bucket.acquire() for _ in range(5)])
+        assert time.monotonic() - start < 0.1
+
+    async def test_refill_rate(self):
+        bucket = TokenBucket(20, capacity = 1)
+        start = time.monotonic()
+        await asyncio.gather(*[bucket.acquire() for _ in range(5)])
+        assert time.monotonic() - start >= 0.19
+
+    async def test_waiters_are_fifo(self):
+        bucket = TokenBucket(50, capacity = 1)
+        order = []
+        async def acquire(i):
+            await bucket.acquire()
+            order.append(i)
+        await asyncio.gather(*[acquire(i) for i in range(10)])
+        assert order == list(range(10))
+
+    async def test_cancelled_waiter_does_not_block_queue(self):
+        bucket = TokenBucket(10, capacity = 1)
+        await bucket.acquire()
+        cancelled = asyncio.ensure_future(bucket.acquire())
+        waiting = asyncio.ensure_future(bucket.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.wait_for(waiting, 1)
+        assert bucket.queue_depth == 0
+
+@pytest.mark.asyncio
+class TestRateLimiter:
+    async def test_buckets_by_host_and_endpoint(self):
+        rate_limiter = RateLimiter(max_requests_per_second = 1)
+        host_bucket = rate_limiter.add_bucket('api.example.com', 5)
+        endpoint_bucket = rate_limiter.add_bucket('api.example.com', 2, endpoint = '/search/author')
+        assert rate_limiter.get_bucket('https://api.example.com/search/author?q=1') is endpoint_bucket
+        assert rate_limiter.get_bucket('https://api.example.com/search/scopus') is host_bucket
+        assert rate_limiter.get_bucket('https://other.example.com/') is rate_limiter.default_bucket
+
+    async def test_backs_off_on_too_many_requests(self):
+        rate_limiter = RateLimiter(max_requests_per_second = 8)
+        bucket = rate_limiter.default_bucket
+        rate_limiter.update_from_response(None, 429, {'Retry-After': '0.2'})
+        assert bucket.rate == 4
+        start = time.monotonic()
+        await rate_limiter.rate_limit()
+        assert time.monotonic() - start >= 0.19
+
+    async def test_slows_near_exhaustion_and_recovers(self):
+        rate_limiter = RateLimiter()
+        bucket = rate_limiter.add_bucket('api.example.com', 9, max_requests_per_second = 10)
+        for _ in range(10):
+            rate_limiter.update_from_response('https://api.example.com/', 200, {
+                'X-RateLimit-Limit': '10',
+                'X-RateLimit-Remaining': '0'
+            })
+        assert bucket.rate < 1
+        for _ in range(20):
+            rate_limiter.update_from_response('https://api.example.com/', 200, {
+                'X-RateLimit-Limit': '10',
+                'X-RateLimit-Remaining': '9'
+            })
+        assert bucket.rate > 9
+
+    async def test_missing_headers_are_ignored(self):
+        rate_limiter = RateLimiter(max_requests_per_second = 5)
+        rate_limiter.update_from_response(None, 200, {})
+        assert rate_limiter.default_bucket.rate == 5
+
+    async def test_scopus_pages_take_quota_as_they_are_sent(self, monkeypatch):
+        pytest.importorskip('pybliometrics')
+        import requests
+        from pybliometrics.scopus.superclasses import base
+        # Stands in for pybliometrics' get_content, which needs a configured key
+        monkeypatch.setattr(base, 'get_content', lambda url, api, *args, **kwargs: requests.get(url))
+        arrivals = []
+        async def handler(request):
+            arrivals.append(time.monotonic())
+            return web.Response(text = 'ok')
+        app = web.Application()
+        app.router.add_get('/search', handler)
+        server = TestServer(app)
+        await server.start_server()
+        url = str(server.make_url('/search'))
+        def search():
+            # Pages are requested back to back, as pybliometrics does
+            for _ in range(3):
+                base.get_content(url, 'ScopusSearch')
+        async with NewAsyncClient(rate_limiter = RateLimiter(max_requests_per_second = 10, burst = 1)) as client:
+            await run_scopus_search(client, url, search)
+        await server.close()
+        assert len(arrivals) == 3
+        assert arrivals[1] - arrivals[0] >= 0.08
+        assert arrivals[2] - arrivals[1] >= 0.08
@@ -0,0 +1,83 @@
+import os
+import time
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from matchmaker.query_engine.backends import NewAsyncClient, RateLimiter
+from matchmaker.query_engine.backends.cache import ResponseCache
+
+@pytest.mark.asyncio
+class TestResponseCache:
+    async def test_keys_ignore_credentials_and_param_order(self, tmp_path):
+        cache = ResponseCache(str(tmp_path / 'cache.sqlite'))
+        assert cache.key('GET', 'https://a.org/efetch.fcgi?id=1&api_key=x') == \
+            cache.key('GET', 'https://a.org/efetch.fcgi?api_key=y&id=1')
+        assert cache.key('GET', 'https://a.org/efetch.fcgi?id=1') != \
+            cache.key('GET', 'https://a.org/efetch.fcgi?id=2')
+
+    async def test_entries_expire_and_are_evicted(self, tmp_path):
+        cache = ResponseCache(
+            str(tmp_path / 'cache.sqlite'),
+            max_size_bytes = 3000,
+            ttl_by_endpoint = {'esearch': -1}
+        )
+        await cache.put('search', 'https://a.org/esearch.fcgi', 200, {}, b'x')
+        assert await cache.get('search') is None
+        bodies = [os.urandom(1000) for _ in range(5)]
+        for i, body in enumerate(bodies):
+            await cache.put(str(i), 'https://a.org/efetch.fcgi', 200, {}, body)
+            time.sleep(0.01)
+        assert cache.size() <= 3000
+        assert await cache.get('0') is None
+        assert await cache.get('4') == (200, {}, bodies[4])
+
+    async def test_stored_body_is_not_described_as_encoded(self, tmp_path):
+        cache = ResponseCache(str(tmp_path / 'cache.sqlite'))
+        await cache.put('fetch', 'https://a.org/efetch.fcgi', 200, {
+            'Content-Type': 'text/xml',
+            'Content-Encoding': 'gzip',
+            'Content-Length': '20'
+        }, b'<xml/>')
+        assert await cache.get('fetch') == (200, {'Content-Type': 'text/xml'}, b'<xml/>')
+
+    async def test_client_serves_repeat_requests_from_cache(self, tmp_path):
+        calls = {'count': 0}
+        async def handler(request):
+            calls['count'] += 1
+            return web.Response(text = 'ok')
+        app = web.Application()
+        app.router.add_get('/efetch.fcgi', handler)
+        server = TestServer(app)
+        await server.start_server()
+        cache = ResponseCache(str(tmp_path / 'cache.sqlite'))
+        async with NewAsyncClient(
+            rate_limiter = RateLimiter(max_requests_per_second = 100),
+            response_cache = cache
+        ) as client:
+            for api_key in ('a', 'b'):
+                url = server.make_url('/efetch.fcgi?id=1&api_key=' + api_key)
+                output = await client.get(url)
+                assert await output.text() == 'ok'
+        await server.close()
+        assert calls['count'] == 1
+
+    async def test_history_requests_are_not_cached(self, tmp_path):
+        calls = {'count': 0}
+        async def handler(request):
+            calls['count'] += 1
+            return web.Response(text = 'ok')
+        app = web.Application()
+        app.router.add_get('/esearch.fcgi', handler)
+        server = TestServer(app)
+        await server.start_server()
+        cache = ResponseCache(str(tmp_path / 'cache.sqlite'), uncached_params = ('usehistory', 'WebEnv'))
+        async with NewAsyncClient(
+            rate_limiter = RateLimiter(max_requests_per_second = 100),
+            response_cache = cache
+        ) as client:
+            for query in ('term=a&usehistory=y', 'term=a&usehistory=y', 'term=a&WebEnv=x'):
+                output = await client.get(server.make_url('/esearch.fcgi?' + query))
+                assert await output.text() == 'ok'
+        await server.close()
+        assert calls['count'] == 3
+        assert cache.size() == 0
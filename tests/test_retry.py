@@ -0,0 +1,125 @@
+import asyncio
+import pytest
+from aiohttp import ClientResponseError, web
+from aiohttp.test_utils import TestServer
+from matchmaker.query_engine.backends import NewAsyncClient, RateLimiter
+from matchmaker.query_engine.backends.retry import RetryPolicy, endpoint_name
+from matchmaker.query_engine.backends.scheduler import Priority, RequestScheduler
+from matchmaker.query_engine.backends.scopus import PaperSearchQueryEngine
+from matchmaker.query_engine.backends.scopus.api import run_scopus_search
+from matchmaker.query_engine.backends.scopus.constants import Endpoint
+
+async def make_flaky_server(failures: int, status: int = 503):
+    calls = {'count': 0}
+    async def handler(request):
+        calls['count'] += 1
+        if calls['count'] <= failures:
+            return web.Response(status = status)
+        return web.Response(text = 'ok')
+    app = web.Application()
+    app.router.add_route('*', '/efetch.fcgi', handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server, calls
+
+def make_client(max_attempts = 5, budget = 100):
+    return NewAsyncClient(
+        rate_limiter = RateLimiter(max_requests_per_second = 1000, burst = 1000),
+        retry_policy = RetryPolicy(
+            max_attempts = max_attempts,
+            base_delay = 0.001,
+            budget_per_endpoint = budget
+        )
+    )
+
+@pytest.mark.asyncio
+class TestRetryPolicy:
+    async def test_endpoint_name(self):
+        assert endpoint_name('https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi?id=1') == 'efetch'
+
+    async def test_transient_errors_are_retried(self):
+        server, calls = await make_flaky_server(2)
+        async with make_client() as client:
+            output = await client.get(server.make_url('/efetch.fcgi'))
+            assert await output.text() == 'ok'
+        assert calls['count'] == 3
+        await server.close()
+
+    async def test_gives_up_after_max_attempts(self):
+        server, calls = await make_flaky_server(10)
+        async with make_client(max_attempts = 3) as client:
+            with pytest.raises(ClientResponseError):
+                await client.get(server.make_url('/efetch.fcgi'))
+        assert calls['count'] == 3
+        await server.close()
+
+    async def test_slot_is_free_during_backoff(self):
+        class SlowBackoff(RetryPolicy):
+            def backoff(self, attempt: int) -> float:
+                return 0.2
+        server, calls = await make_flaky_server(1)
+        scheduler = RequestScheduler({Priority.NORMAL: 1})
+        async with NewAsyncClient(
+            rate_limiter = RateLimiter(max_requests_per_second = 1000, burst = 1000),
+            retry_policy = SlowBackoff(),
+            scheduler = scheduler
+        ) as client:
+            request = asyncio.ensure_future(client.get(server.make_url('/efetch.fcgi')))
+            await asyncio.sleep(0.1)
+            assert calls['count'] == 1
+            assert scheduler.active(Priority.NORMAL) == 0
+            output = await request
+            assert await output.text() == 'ok'
+        await server.close()
+
+    async def test_non_idempotent_requests_are_not_retried(self):
+        server, calls = await make_flaky_server(1)
+        async with make_client() as client:
+            with pytest.raises(ClientResponseError):
+                await client.post(server.make_url('/efetch.fcgi'))
+            output = await client.post(server.make_url('/efetch.fcgi'), idempotent = True)
+            assert await output.text() == 'ok'
+        assert calls['count'] == 2
+        await server.close()
+
+    async def test_budget_limits_retries(self):
+        server, calls = await make_flaky_server(10)
+        async with make_client(budget = 1) as client:
+            with pytest.raises(ClientResponseError):
+                await client.get(server.make_url('/efetch.fcgi'))
+            assert client.retry_policy.remaining_budget('efetch') == 0
+        assert calls['count'] == 2
+        await server.close()
+
+    async def test_scopus_searches_are_retried(self):
+        pytest.importorskip('pybliometrics')
+        from pybliometrics.scopus.exception import Scopus500Error
+        calls = []
+        def search(term):
+            calls.append(term)
+            if len(calls) < 3:
+                raise Scopus500Error('Internal Server Error')
+            return term
+        async with make_client() as client:
+            assert await run_scopus_search(client, Endpoint.SCOPUS_SEARCH, search, 'TITLE(x)') == 'TITLE(x)'
+        assert len(calls) == 3
+
+    async def test_scopus_retries_show_in_native_query_budgets(self):
+        pytest.importorskip('pybliometrics')
+        from pybliometrics.scopus.exception import Scopus500Error
+        calls = []
+        def search():
+            calls.append(None)
+            if len(calls) < 2:
+                raise Scopus500Error('Internal Server Error')
+        async def make_coroutine(client):
+            return []
+        async with PaperSearchQueryEngine(
+            'key', 'token', rate_limiter = RateLimiter(max_requests_per_second = 1000, burst = 1000)
+        ) as engine:
+            client = await engine.session_manager.get_client()
+            client.retry_policy.base_delay = 0.001
+            before = engine._make_native_query(client, make_coroutine, {'scopus_search': 1})
+            await run_scopus_search(client, Endpoint.SCOPUS_SEARCH, search)
+            after = engine._make_native_query(client, make_coroutine, {'scopus_search': 1})
+        assert after.retry_budgets['scopus_search'] == before.retry_budgets['scopus_search'] - 1
@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from matchmaker.query_engine.backends import NewAsyncClient, RateLimiter, TokenBucket
+from matchmaker.query_engine.backends.scheduler import (
+    Priority,
+    RequestScheduler,
+    current_priority,
+    priority_scope,
+)
+
+@pytest.mark.asyncio
+class TestScheduler:
+    async def test_concurrency_is_capped_per_class(self):
+        scheduler = RequestScheduler({Priority.BACKGROUND: 2})
+        peak = {'active': 0}
+        async def request():
+            async with scheduler.slot(Priority.BACKGROUND):
+                peak['active'] = max(peak['active'], scheduler.active(Priority.BACKGROUND))
+                await asyncio.sleep(0.01)
+        await asyncio.gather(*[request() for _ in range(6)])
+        assert peak['active'] == 2
+        assert scheduler.active(Priority.BACKGROUND) == 0
+
+    async def test_queued_requests_can_be_cancelled(self):
+        scheduler = RequestScheduler({Priority.BACKGROUND: 1})
+        release = asyncio.Event()
+        async def request():
+            async with scheduler.slot(Priority.BACKGROUND):
+                await release.wait()
+        tasks = [asyncio.ensure_future(request()) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth(Priority.BACKGROUND) == 2
+        assert scheduler.cancel_queued(Priority.BACKGROUND) == 2
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions = True)
+        assert results[0] is None
+        assert all(isinstance(result, asyncio.CancelledError) for result in results[1:])
+        assert scheduler.active(Priority.BACKGROUND) == 0
+
+    async def test_streamed_response_holds_slot_until_read(self):
+        more = asyncio.Event()
+        async def handler(request):
+            response = web.StreamResponse()
+            await response.prepare(request)
+            await response.write(b'x' * 1000)
+            await more.wait()
+            await response.write(b'y' * 1000)
+            return response
+        app = web.Application()
+        app.router.add_get('/stream', handler)
+        server = TestServer(app)
+        await server.start_server()
+        scheduler = RequestScheduler()
+        async with NewAsyncClient(
+            rate_limiter = RateLimiter(max_requests_per_second = 100),
+            scheduler = scheduler
+        ) as client:
+            output = await client.get(server.make_url('/stream'), preload = False)
+            assert scheduler.active(Priority.NORMAL) == 1
+            more.set()
+            assert len(await output.read()) == 2000
+            assert scheduler.active(Priority.NORMAL) == 0
+        await server.close()
+
+    async def test_higher_priority_overtakes_queued_waiters(self):
+        bucket = TokenBucket(50, capacity = 1)
+        order = []
+        async def acquire(name, priority):
+            await bucket.acquire(priority = priority)
+            order.append(name)
+        background = [
+            asyncio.ensure_future(acquire(f'background{i}', Priority.BACKGROUND))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        await acquire('interactive', Priority.INTERACTIVE)
+        await asyncio.gather(*background)
+        assert order.index('interactive') <= 1
+        assert [name for name in order if name != 'interactive'] == \
+            ['background0', 'background1', 'background2']
+
+    async def test_priority_scope(self):
+        assert current_priority.get() == Priority.NORMAL
+        with priority_scope(Priority.BACKGROUND):
+            assert current_priority.get() == Priority.BACKGROUND
+            with priority_scope(None):
+                assert current_priority.get() == Priority.BACKGROUND
+        assert current_priority.get() == Priority.NORMAL